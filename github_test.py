@@ -13,13 +13,14 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from github import Github, Auth
 from src.codewise.core.static_analyzer import analyze_file_changes
+from src.codewise.github.http_cache import cached_github
 from src.codewise.review.llm_reviewer import get_review_for_code
 token = os.getenv("GITHUB_TOKEN")
 
 if not token:
     raise ValueError("Missing GITHUB_TOKEN in .env!")
 
-g = Github(auth=Auth.Token(token))
+g = cached_github(token)
 # Ensure the OPENAI_API_KEY is loaded for the reviewer module
 if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("Missing OPENAI_API_KEY in .env!")
@@ -1,7 +1,6 @@
 import argparse
+import json
 from codewise.logger import get_logger
-from codewise.github_client import GitHubClient
-from codewise.reviewer import Reviewer
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +9,9 @@ logger = get_logger()
 
 def run_review(repo: str, pr_number: int):
     logger.info(f"Starting review for {repo} PR #{pr_number}")
+    # Imported here: the reviewer needs OPENAI_API_KEY, the retrieval daemon doesn't.
+    from codewise.github_client import GitHubClient
+    from codewise.reviewer import Reviewer
 
     try:
         gh = GitHubClient()
@@ -30,6 +32,19 @@ def run_review(repo: str, pr_number: int):
     except Exception as e:
         logger.exception("Error in running review")
 
+def run_retrieval(args):
+    from codewise.retriever import daemon
+
+    if args.retrieval_command == "serve":
+        daemon.serve(args.host, args.port, args.code_store, args.comments_store)
+    elif args.retrieval_command == "status":
+        info = daemon.read_daemon_file()
+        if info is None:
+            print("No retrieval daemon running")
+            return
+        url = f"http://{info['host']}:{info['port']}"
+        print(f"{url} {json.dumps(daemon.health(url))}")
+
 def main():
     parser = argparse.ArgumentParser(description="CodeWise CLI")
 
@@ -40,10 +55,22 @@ def main():
     review_cmd.add_argument("--repo", required=True, help="Repo like pallets/flask")
     review_cmd.add_argument("--pr", required=True, type=int)
 
+    # retrieval daemon: keeps the vectorstores loaded across pipeline steps
+    retrieval_cmd = sub.add_parser("retrieval")
+    retrieval_sub = retrieval_cmd.add_subparsers(dest="retrieval_command", required=True)
+    serve_cmd = retrieval_sub.add_parser("serve")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    serve_cmd.add_argument("--code-store", help="default vectorstores/flask_store")
+    serve_cmd.add_argument("--comments-store", help="default vectorstores/pr_comments_store")
+    retrieval_sub.add_parser("status")
+
     args = parser.parse_args()
 
     if args.command == "review":
         run_review(args.repo, args.pr)
+    elif args.command == "retrieval":
+        run_retrieval(args)
     else:
         parser.print_help()
 
@@ -0,0 +1,225 @@
+# src/codewise/github/http_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import NamedTuple
+
+from github import Auth, Github
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+DEFAULT_CACHE_PATH = "vectorstores/github_http_cache.sqlite"
+DEFAULT_MAX_BYTES = int(os.environ.get("GITHUB_HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# Responses that can never change: contents / blobs / trees / commits
+# addressed by a full commit or object SHA. They are served without a request.
+_IMMUTABLE = re.compile(
+    r"[?&]ref=[0-9a-f]{40}(&|$)"
+    r"|/git/(blobs|trees|commits)/[0-9a-f]{40}(\?|$)"
+    r"|/commits/[0-9a-f]{40}(\?|$)"
+)
+# Per-response headers that must not be replayed from the cache.
+_VOLATILE_HEADERS = ("date", "x-github-request-id")
+
+
+def is_immutable(url: str) -> bool:
+    return _IMMUTABLE.search(url) is not None
+
+
+class CacheEntry(NamedTuple):
+    status: int
+    headers: dict
+    body: str
+
+
+class HTTPCache:
+    """
+    On-disk cache of GitHub GET responses, in one SQLite file shared by every
+    script (and process) that talks to the API.
+
+    Entries are keyed by (URL, Accept, sha256 of the Authorization header), so
+    tokens never see each other's responses. Each entry keeps the ETag /
+    Last-Modified validators. Past `max_bytes` of bodies, the least recently
+    used entries are evicted.
+
+    Counters: `hits` (served without a request), `revalidated` (304; free
+    against the rate limit) and `misses` (full responses fetched).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT, status INTEGER, "
+            "headers TEXT, body TEXT, size INTEGER, last_used INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(last_used) FROM responses").fetchone()
+        self._clock = row[0] or 0
+
+    @staticmethod
+    def key(url: str, headers: dict) -> str:
+        lower = {k.lower(): v for k, v in headers.items()}
+        auth = hashlib.sha256(lower.get("authorization", "").encode("utf-8")).hexdigest()[:16]
+        return hashlib.sha256(f"{url}\n{lower.get('accept', '')}\n{auth}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute("SELECT status, headers, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._clock += 1
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (self._clock, key))
+            self._conn.commit()
+        return CacheEntry(row[0], json.loads(row[1]), row[2])
+
+    def put(self, key: str, url: str, status: int, headers: dict, body: str) -> None:
+        headers = {k.lower(): v for k, v in headers.items() if k.lower() not in _VOLATILE_HEADERS}
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._clock += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), body, size, self._clock),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "entries": len(self), "bytes": self.size_bytes()}
+
+
+class CachedResponse:
+    """A cached body in the shape of PyGithub's `RequestsResponse`."""
+
+    def __init__(self, status: int, headers: dict, body: str):
+        self.status = status
+        self.headers = headers
+        self._body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self._body
+
+    def iter_content(self, chunk_size=1):
+        data = self._body.encode("utf-8")
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size or len(data) or 1))
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class CachingHTTPSConnection(HTTPSRequestsConnectionClass):
+    """
+    PyGithub HTTPS connection that answers GETs from `cache`.
+
+    Immutable resources (see `is_immutable`) come straight from the cache;
+    anything else cached is revalidated with If-None-Match / If-Modified-Since
+    and a 304 is turned back into the cached 200. Injected connection classes
+    are rebuilt by PyGithub for every request, so the requests session (and
+    its keep-alive pool) is shared per host instead.
+    """
+
+    cache: HTTPCache | None = None
+    _sessions: dict = {}
+
+    def __init__(self, host, *args, **kwargs):
+        super().__init__(host, *args, **kwargs)
+        shared = self._sessions.setdefault(host, self.session)
+        if shared is not self.session:
+            self.session.close()
+            self.session = shared
+
+    def getresponse(self):
+        cache = self.cache
+        if cache is None or self.verb != "GET" or self.stream:
+            return super().getresponse()
+        key = cache.key(self.url, self.headers)
+        entry = cache.get(key)
+        if entry is not None and is_immutable(self.url):
+            cache.hits += 1
+            return CachedResponse(entry.status, entry.headers, entry.body)
+        if entry is not None:
+            self.headers = dict(self.headers)
+            if entry.headers.get("etag"):
+                self.headers["If-None-Match"] = entry.headers["etag"]
+            if entry.headers.get("last-modified"):
+                self.headers["If-Modified-Since"] = entry.headers["last-modified"]
+
+        response = super().getresponse()
+        if response.status == 304 and entry is not None:
+            cache.revalidated += 1
+            # Fresh rate-limit headers, cached validators and body.
+            fresh = {k.lower(): v for k, v in response.headers.items() if not k.lower().startswith("content-")}
+            headers = dict(entry.headers, **fresh)
+            return CachedResponse(entry.status, headers, entry.body)
+        cache.misses += 1
+        if response.status == 200 and (
+            "etag" in response.headers or "last-modified" in response.headers or is_immutable(self.url)
+        ):
+            cache.put(key, self.url, 200, dict(response.headers), response.read())
+        return response
+
+    def close(self) -> None:
+        pass  # the session is shared across connections
+
+
+def install_http_cache(path: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES) -> HTTPCache | None:
+    """
+    Route every PyGithub request in this process through the on-disk cache
+    at `path` (default: the cache already installed, else DEFAULT_CACHE_PATH).
+    No-op (returns None) when DISABLE_GITHUB_CACHE is set.
+    """
+    if os.environ.get("DISABLE_GITHUB_CACHE", "0") in ("1", "true", "True"):
+        return None
+    current = CachingHTTPSConnection.cache
+    if current is not None and path in (None, current.path):
+        return current
+    CachingHTTPSConnection.cache = HTTPCache(path or DEFAULT_CACHE_PATH, max_bytes)
+    Requester.injectConnectionClasses(HTTPRequestsConnectionClass, CachingHTTPSConnection)
+    return CachingHTTPSConnection.cache
+
+
+def cached_github(token: str, **kwargs) -> Github:
+    """A `Github` client whose GET requests go through the shared HTTP cache."""
+    install_http_cache()
+    return Github(auth=Auth.Token(token), **kwargs)
+
+
+def http_cache_stats() -> dict | None:
+    cache = CachingHTTPSConnection.cache
+    return cache.stats() if cache is not None else None
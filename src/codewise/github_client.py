@@ -1,13 +1,126 @@
 # src/codewise/github_client.py
-from github import Github
+import base64
 import os
+from typing import NamedTuple
+
+from codewise.github.http_cache import cached_github
+
+# Blobs fetched per GraphQL query (one aliased `object(expression:)` each).
+BLOBS_PER_QUERY = 50
+
+_REVIEW_COMMENT_FIELDS = """
+fragment ReviewComment on PullRequestReviewComment {
+  databaseId
+  author { login }
+  body
+  path
+  position
+  originalPosition
+  createdAt
+  url
+}
+"""
+
+PR_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $reviewsAfter: String, $commentsAfter: String,
+      $withReviews: Boolean!, $withComments: Boolean!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      title
+      headRefOid
+      baseRefOid
+      reviews(first: 100, after: $reviewsAfter) @include(if: $withReviews) {
+        pageInfo { hasNextPage endCursor }
+        nodes {
+          id
+          author { login }
+          state
+          body
+          comments(first: 100) {
+            pageInfo { hasNextPage endCursor }
+            nodes { ...ReviewComment }
+          }
+        }
+      }
+      comments(first: 100, after: $commentsAfter) @include(if: $withComments) {
+        pageInfo { hasNextPage endCursor }
+        nodes { author { login } body createdAt url }
+      }
+    }
+  }
+}
+""" + _REVIEW_COMMENT_FIELDS
+
+REVIEW_COMMENTS_QUERY = """
+query($id: ID!, $after: String) {
+  node(id: $id) {
+    ... on PullRequestReview {
+      comments(first: 100, after: $after) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ...ReviewComment }
+      }
+    }
+  }
+}
+""" + _REVIEW_COMMENT_FIELDS
+
+
+class PRFile(NamedTuple):
+    filename: str
+    status: str
+    patch: str
+    content: str | None  # text at the head commit; None for removed or binary files
+
+
+class PRComment(NamedTuple):
+    body: str
+    author: str | None
+    path: str | None = None
+    position: int | None = None  # diff position (falls back to the original position on outdated comments)
+    created_at: str | None = None
+    url: str | None = None
+
+
+class PRReview(NamedTuple):
+    author: str | None
+    state: str
+    body: str
+    comments: list[PRComment]
+
+
+class PRSnapshot(NamedTuple):
+    """Everything the review pipeline reads about one PR, fetched up front by `GitHubClient.get_pr_snapshot`."""
+
+    repo: str
+    number: int
+    title: str
+    head_sha: str
+    base_sha: str
+    files: list[PRFile]
+    review_comments: list[PRComment]  # inline comments of all reviews, oldest first
+    issue_comments: list[PRComment]
+    reviews: list[PRReview]
+
+    @property
+    def diff(self) -> str:
+        return "\n".join(f.patch for f in self.files if f.patch)
+
+
+def _login(node):
+    return (node.get("author") or {}).get("login")
+
+
+def _review_comment(node) -> PRComment:
+    return PRComment(node["body"], _login(node), node["path"], node["position"] or node["originalPosition"],
+                     node["createdAt"], node["url"])
+
 
 class GitHubClient:
     def __init__(self):
         token = os.getenv("GITHUB_TOKEN")
         if not token:
             raise ValueError("Missing GITHUB_TOKEN")
-        self.client = Github(token)
+        self.client = cached_github(token)
 
     def get_pr(self, repo_name, pr_number: int):
         repo = self.client.get_repo(repo_name)
@@ -57,6 +170,109 @@ class GitHubClient:
 
         return comments
 
+    def get_pr_snapshot(self, repo_name, pr_number: int) -> PRSnapshot:
+        """
+        Fetch a PR's metadata, files with patches and head-commit contents,
+        reviews, inline review comments and discussion comments in a few
+        round-trips instead of one REST call per file / review.
+
+        One GraphQL query returns the PR, its reviews (with their inline
+        comments) and its discussion comments, paginated 100 at a time. The
+        patches come from the REST files listing (GraphQL has no patches), and
+        the files' blobs at the head SHA from aliased GraphQL
+        `object(expression:)` lookups, BLOBS_PER_QUERY per query.
+        """
+        owner, name = repo_name.split("/", 1)
+        requester = self.client.requester
+
+        variables = {"owner": owner, "name": name, "number": pr_number, "reviewsAfter": None,
+                     "commentsAfter": None, "withReviews": True, "withComments": True}
+        pr, review_nodes, comment_nodes = None, [], []
+        while variables["withReviews"] or variables["withComments"]:
+            _, data = requester.graphql_query(PR_QUERY, variables)
+            pr = data["data"]["repository"]["pullRequest"]
+            for key, nodes, after, flag in (("reviews", review_nodes, "reviewsAfter", "withReviews"),
+                                            ("comments", comment_nodes, "commentsAfter", "withComments")):
+                if variables[flag]:
+                    page = pr[key]
+                    nodes.extend(page["nodes"])
+                    variables[after] = page["pageInfo"]["endCursor"]
+                    variables[flag] = page["pageInfo"]["hasNextPage"]
+
+        reviews, review_comments = [], []
+        for node in review_nodes:
+            comment_page = node["comments"]
+            inline = list(comment_page["nodes"])
+            while comment_page["pageInfo"]["hasNextPage"]:
+                _, data = requester.graphql_query(
+                    REVIEW_COMMENTS_QUERY, {"id": node["id"], "after": comment_page["pageInfo"]["endCursor"]}
+                )
+                comment_page = data["data"]["node"]["comments"]
+                inline.extend(comment_page["nodes"])
+            reviews.append(PRReview(_login(node), node["state"], node["body"] or "",
+                                    [_review_comment(c) for c in inline]))
+            review_comments.extend(inline)
+        review_comments.sort(key=lambda c: c["databaseId"] or 0)
+
+        files = self._pr_files(requester, repo_name, pr_number)
+        contents = self._blobs(requester, owner, name, pr["headRefOid"],
+                               [f["filename"] for f in files if f["status"] != "removed"])
+        return PRSnapshot(
+            repo=repo_name,
+            number=pr_number,
+            title=pr["title"],
+            head_sha=pr["headRefOid"],
+            base_sha=pr["baseRefOid"],
+            files=[PRFile(f["filename"], f["status"], f.get("patch") or "", contents.get(f["filename"]))
+                   for f in files],
+            review_comments=[_review_comment(c) for c in review_comments],
+            issue_comments=[PRComment(c["body"], _login(c), created_at=c["createdAt"], url=c["url"])
+                            for c in comment_nodes],
+            reviews=reviews,
+        )
+
+    @staticmethod
+    def _pr_files(requester, repo_name, pr_number):
+        files, page = [], 1
+        while True:
+            _, batch = requester.requestJsonAndCheck(
+                "GET", f"/repos/{repo_name}/pulls/{pr_number}/files", parameters={"per_page": 100, "page": page}
+            )
+            files.extend(batch)
+            if len(batch) < 100:
+                return files
+            page += 1
+
+    @staticmethod
+    def _blobs(requester, owner, name, sha, paths) -> dict:
+        """{path: text} of `paths` at commit `sha` (binary files are left out)."""
+        contents = {}
+        for start in range(0, len(paths), BLOBS_PER_QUERY):
+            chunk = paths[start:start + BLOBS_PER_QUERY]
+            params = "".join(f", $e{i}: String!" for i in range(len(chunk)))
+            fields = "\n".join(f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text isBinary isTruncated }} }}"
+                               for i in range(len(chunk)))
+            query = (f"query($owner: String!, $name: String!{params}) {{\n"
+                     f"  repository(owner: $owner, name: $name) {{\n{fields}\n  }}\n}}")
+            variables = {"owner": owner, "name": name}
+            variables.update({f"e{i}": f"{sha}:{path}" for i, path in enumerate(chunk)})
+            _, data = requester.graphql_query(query, variables)
+            repo = data["data"]["repository"]
+            for i, path in enumerate(chunk):
+                blob = repo.get(f"f{i}")
+                if not blob or blob.get("isBinary"):
+                    continue
+                if blob.get("isTruncated") or blob.get("text") is None:
+                    # Very large blobs are truncated in GraphQL; the contents API
+                    # at a SHA is immutable and comes from the HTTP cache next time.
+                    _, data = requester.requestJsonAndCheck(
+                        "GET", f"/repos/{owner}/{name}/contents/{path}", parameters={"ref": sha}
+                    )
+                    contents[path] = base64.b64decode(data["content"]).decode("utf-8", errors="replace")
+                else:
+                    contents[path] = blob["text"]
+        return contents
+
     def get_diff(self, pr):
         diffs = []
         for file in pr.get_files():
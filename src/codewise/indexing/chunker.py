@@ -0,0 +1,127 @@
+# src/codewise/indexing/chunker.py
+import ast
+
+DEF_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def _start_line(node):
+    """First line of a definition, including its decorators."""
+    if node.decorator_list:
+        return min(node.lineno, *(d.lineno for d in node.decorator_list))
+    return node.lineno
+
+
+def _guarded_defs(stmt):
+    """`stmt` if it is a function, else the functions in the if/try blocks it opens."""
+    if isinstance(stmt, DEF_NODES):
+        yield stmt
+    elif isinstance(stmt, (ast.If, ast.Try)):
+        for block in (stmt.body, stmt.orelse, getattr(stmt, "finalbody", []),
+                      *(h.body for h in getattr(stmt, "handlers", []))):
+            for child in block:
+                yield from _guarded_defs(child)
+
+
+def _body_below(node, lines):
+    """Whether `node`'s body starts on a line of its own, after the (possibly multi-line) signature."""
+    first = node.body[0]
+    return not lines[first.lineno - 1][:first.col_offset].strip()
+
+
+def _collapsed(stmt, lines):
+    """
+    The lines of a class-level statement, decorators included, with the body
+    of every method it defines (directly or under `if`/`try`) replaced by a
+    `...` stub. Methods whose body is on the signature's last line are kept whole.
+    """
+    bodies = {}
+    for fn in _guarded_defs(stmt):
+        if _body_below(fn, lines):
+            bodies[fn.body[0].lineno - 1] = fn
+    out, i = [], _start_line(stmt) - 1 if isinstance(stmt, DEF_NODES) else stmt.lineno - 1
+    while i < stmt.end_lineno:
+        fn = bodies.get(i)
+        if fn is None:
+            out.append(lines[i])
+            i += 1
+        else:
+            out.append(" " * (fn.col_offset + 4) + "...")
+            i = fn.end_lineno
+    return out
+
+
+def _class_header(node, lines):
+    """
+    Compact summary of a class: decorators + signature, docstring, class-level
+    statements and a one-line stub per method. Method bodies are left out since
+    every method is emitted as its own chunk.
+    """
+    out = lines[_start_line(node) - 1:max(node.body[0].lineno - 1, node.lineno)]
+    for stmt in node.body:
+        if stmt.lineno <= node.lineno:
+            continue  # `class A: x = 1` is all on the signature line
+        if isinstance(stmt, ast.ClassDef):
+            below = _body_below(stmt, lines)
+            out.extend(lines[_start_line(stmt) - 1:stmt.body[0].lineno - below])
+            if below:
+                out.append(" " * (stmt.col_offset + 4) + "...")
+        else:
+            out.extend(_collapsed(stmt, lines))
+    return "\n".join(out)
+
+
+def chunk_source(source_code: str) -> list[dict]:
+    """
+    Split Python source into embedding chunks in a single pass over the AST.
+
+    - top-level functions become one chunk each (nested helpers stay inside
+      their enclosing function's chunk);
+    - methods become one chunk each, with `parent` set to the class;
+    - classes only contribute a compact "header" chunk (see `_class_header`),
+      so method bodies are never embedded twice.
+
+    Each chunk is a dict: {'name', 'qualname', 'kind', 'parent', 'code',
+    'lineno', 'end_lineno'}. Returns [] if the source does not parse.
+    """
+    try:
+        tree = ast.parse(source_code)
+    except SyntaxError:
+        return []
+
+    lines = source_code.splitlines()
+    chunks = []
+
+    def visit(body, parent):
+        for node in body:
+            if isinstance(node, DEF_NODES):
+                start = _start_line(node)
+                chunks.append({
+                    "name": node.name,
+                    "qualname": f"{parent}.{node.name}" if parent else node.name,
+                    "kind": "method" if parent else "function",
+                    "parent": parent,
+                    "code": "\n".join(lines[start - 1:node.end_lineno]),
+                    "lineno": start,
+                    "end_lineno": node.end_lineno,
+                })
+            elif isinstance(node, ast.ClassDef):
+                qualname = f"{parent}.{node.name}" if parent else node.name
+                chunks.append({
+                    "name": node.name,
+                    "qualname": qualname,
+                    "kind": "class",
+                    "parent": parent,
+                    "code": _class_header(node, lines),
+                    "lineno": _start_line(node),
+                    "end_lineno": node.end_lineno,
+                })
+                visit(node.body, qualname)
+            elif isinstance(node, (ast.If, ast.Try)):
+                # definitions guarded by `if TYPE_CHECKING:` / `try: import ...`
+                for block in (node.body, node.orelse, getattr(node, "finalbody", [])):
+                    visit(block, parent)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, parent)
+
+    visit(tree.body, None)
+    return chunks
@@ -0,0 +1,205 @@
+# src/codewise/indexing/comment_dedup.py
+import os
+import re
+import zlib
+
+import numpy as np
+
+MINHASH_FILE = "comment_minhash.npz"
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+THRESHOLD = 0.7  # estimated Jaccard needed to merge a bucket candidate
+SHINGLE = 3  # words per shingle; shorter comments are one shingle ("LGTM!" == "lgtm")
+_BATCH_SHINGLES = 20_000
+
+# Logins whose comments are never review signal. Anything ending in "[bot]"
+# (GitHub Apps) is dropped as well; COMMENT_BOT_AUTHORS adds more (comma-separated).
+BOT_AUTHORS = {
+    "allcontributors", "codecov-commenter", "codecov-io", "coveralls", "dependabot", "github-actions",
+    "mergify", "netlify", "pre-commit-ci", "readthedocs", "sonarcloud", "stale",
+} | {a.strip().lower() for a in os.environ.get("COMMENT_BOT_AUTHORS", "").split(",") if a.strip()}
+
+_URL = re.compile(r"https?://\S+")
+_NUMBER = re.compile(r"\d+")
+_WORD = re.compile(r"\w+")
+
+
+def is_bot(author: str | None) -> bool:
+    if not author:
+        return False
+    login = author.lower()
+    return login.endswith("[bot]") or login in BOT_AUTHORS
+
+
+def drop_bot_comments(records: list[dict]) -> tuple[list[dict], int]:
+    """`records` without comments by bot authors, and how many were dropped."""
+    kept = [r for r in records if not is_bot(r.get("author"))]
+    return kept, len(records) - len(kept)
+
+
+def shingles(text: str) -> np.ndarray:
+    """crc32 hashes of the word 3-grams of normalised `text` (URLs and numbers masked)."""
+    words = _WORD.findall(_NUMBER.sub("0", _URL.sub("url", text.lower())))
+    if len(words) <= SHINGLE:
+        grams = [" ".join(words)]
+    else:
+        grams = {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64)
+
+
+def _permutations(num_perm: int):
+    """Multiply-shift hash functions h(x) = ((a*x + b) mod 2**64) >> 32, a odd."""
+    rng = np.random.default_rng(1)
+    a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(texts: list[str], num_perm: int = NUM_PERM) -> np.ndarray:
+    """(n, num_perm) uint32 MinHash signatures, computed a batch of documents at a time."""
+    a, b = _permutations(num_perm)
+    sigs = np.empty((len(texts), num_perm), dtype=np.uint32)
+    start = 0
+    while start < len(texts):
+        parts, total, end = [], 0, start
+        while end < len(texts) and (not parts or total < _BATCH_SHINGLES):
+            parts.append(shingles(texts[end]))
+            total += len(parts[-1])
+            end += 1
+        flat = np.concatenate(parts)
+        offsets = np.cumsum([0] + [len(p) for p in parts[:-1]])
+        hashed = (flat[:, None] * a + b) >> np.uint64(32)
+        sigs[start:end] = np.minimum.reduceat(hashed, offsets, axis=0)
+        start = end
+    return sigs
+
+
+def lsh_clusters(sigs: np.ndarray, bands: int = BANDS, threshold: float = THRESHOLD) -> np.ndarray:
+    """
+    Cluster label per row: rows whose signatures share a band bucket and agree
+    on at least `threshold` of their MinHash values end up in one cluster.
+
+    Each bucket is checked against its first member only, so a band costs one
+    sort plus a vectorised comparison and the whole pass stays O(n log n).
+    """
+    n, num_perm = sigs.shape
+    rows = num_perm // bands
+    parent = np.arange(n)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    mult = np.random.default_rng(2).integers(1, 1 << 63, rows, dtype=np.uint64)
+    for band in range(bands):
+        keys = (sigs[:, band * rows:(band + 1) * rows].astype(np.uint64) * mult).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.r_[0, np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1]
+        leaders = order[np.repeat(starts, np.diff(np.r_[starts, n]))]
+        candidates = np.flatnonzero(leaders != order)
+        if not len(candidates):
+            continue
+        members, heads = order[candidates], leaders[candidates]
+        similar = (sigs[members] == sigs[heads]).mean(axis=1) >= threshold
+        for i, j in zip(members[similar].tolist(), heads[similar].tolist()):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+    return np.array([find(i) for i in range(n)])
+
+
+class MinHashIndex:
+    """
+    MinHash signatures and occurrence counts of the comments already in a
+    store (one per representative), kept as `comment_minhash.npz` so later
+    harvests are deduplicated against them as well.
+
+    Every clustered comment id is remembered as a member of its cluster, so a
+    comment harvested again after an edit is not counted twice.
+    """
+
+    def __init__(self, ids=None, signatures=None, counts=None, members=None):
+        self.ids = list(ids) if ids is not None else []
+        self.signatures = signatures if signatures is not None else np.empty((0, NUM_PERM), dtype=np.uint32)
+        self.counts = np.asarray(counts if counts is not None else [], dtype=np.int64)
+        # comment id -> id of its cluster's representative
+        self.members = dict(members) if members is not None else {i: i for i in self.ids}
+
+    @classmethod
+    def load(cls, store_dir: str) -> "MinHashIndex":
+        path = os.path.join(store_dir, MINHASH_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            members = None
+            if "member_ids" in data:  # files written before members were tracked only know representatives
+                members = zip(data["member_ids"].tolist(), data["member_reps"].tolist())
+            return cls(data["ids"].tolist(), data["signatures"], data["counts"], members)
+
+    def save(self, store_dir: str) -> None:
+        path = os.path.join(store_dir, MINHASH_FILE)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, ids=np.array(self.ids, dtype=str), signatures=self.signatures, counts=self.counts,
+                     member_ids=np.array(list(self.members), dtype=str),
+                     member_reps=np.array(list(self.members.values()), dtype=str))
+        os.replace(path + ".tmp", path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, records: list[dict]) -> tuple[list[dict], dict[str, int]]:
+        """
+        Cluster `records` (dicts with "id" and "text") with each other and
+        with the stored representatives.
+
+        Returns the records to embed (one per new cluster, the longest text,
+        with its cluster size as "occurrences"; plus edited representatives
+        with their current count) and {stored id: new count} for stored
+        representatives that absorbed new duplicates. Records of known
+        comments (edits) never change a count: an edited representative gets
+        its new text and signature, an edited duplicate is ignored.
+        """
+        rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        edited = [r for r in records if self.members.get(r["id"]) == r["id"] and r["id"] in rows]
+        records = [r for r in records if r["id"] not in self.members]
+        if edited:
+            self.signatures[[rows[r["id"]] for r in edited]] = minhash_signatures([r["text"] for r in edited])
+        if not records:
+            return [dict(r, occurrences=int(self.counts[rows[r["id"]]])) for r in edited], {}
+        sigs = minhash_signatures([r["text"] for r in records])
+        old = len(self.ids)
+        labels = lsh_clusters(np.vstack([self.signatures, sigs]))
+
+        clusters = {}
+        for row, label in enumerate(labels.tolist()):
+            clusters.setdefault(label, []).append(row)
+
+        representatives, bumped, new_rows = [], {}, []
+        for rows_in_cluster in clusters.values():
+            stored = [r for r in rows_in_cluster if r < old]
+            fresh = [r - old for r in rows_in_cluster if r >= old]
+            if not fresh:
+                continue
+            if stored:
+                rep = self.ids[stored[0]]
+                self.counts[stored[0]] += len(fresh)
+                bumped[rep] = int(self.counts[stored[0]])
+                self.members.update((records[r]["id"], rep) for r in fresh)
+                continue
+            best = max(fresh, key=lambda r: (len(records[r]["text"]), -r))
+            representatives.append(dict(records[best], occurrences=len(fresh)))
+            self.members.update((records[r]["id"], records[best]["id"]) for r in fresh)
+            new_rows.append(best)
+
+        self.ids.extend(r["id"] for r in representatives)
+        self.signatures = np.vstack([self.signatures, sigs[new_rows]]) if new_rows else self.signatures
+        self.counts = np.concatenate([self.counts, [r["occurrences"] for r in representatives]]).astype(np.int64)
+        # Edited representatives are re-embedded with their (possibly bumped) count.
+        edited = [dict(r, occurrences=int(self.counts[rows[r["id"]]])) for r in edited]
+        for r in edited:
+            bumped.pop(r["id"], None)
+        return edited + representatives, bumped
@@ -0,0 +1,78 @@
+# src/codewise/indexing/comment_harvester.py
+from datetime import datetime
+
+# kind -> repo-level PyGithub listing. Both endpoints take `since` and
+# `sort=updated`, so one paged walk per kind covers the whole history.
+ENDPOINTS = {
+    "review_comment": "get_pulls_review_comments",
+    "issue_comment": "get_issues_comments",
+}
+
+
+def comment_id(kind: str, github_id: int) -> str:
+    """Stable vectorstore id of a comment, so a re-harvested (edited) comment replaces its old vector."""
+    return f"{kind}:{github_id}"
+
+
+def _number(url: str | None) -> int | None:
+    tail = (url or "").rstrip("/").rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
+def comment_record(kind: str, comment, repo_name: str) -> dict | None:
+    """Store document for one comment, or None if it has no text or is not on a PR."""
+    if not comment.body or not comment.body.strip():
+        return None
+    if kind == "issue_comment":
+        # The issue-comments endpoint covers issues and PRs alike.
+        if "/pull/" not in (comment.html_url or ""):
+            return None
+        pr_number = _number(comment.issue_url)
+        path = None
+    else:
+        pr_number = _number(comment.pull_request_url)
+        path = comment.path
+    return {
+        "id": comment_id(kind, comment.id),
+        "text": comment.body,
+        "type": kind,
+        "file": path,
+        "repo": repo_name,
+        "pr": pr_number,
+        "author": comment.user.login if comment.user else None,
+        "updated_at": comment.updated_at.isoformat(),
+    }
+
+
+def harvest_comments(repo, cursors: dict | None = None) -> tuple[list[dict], dict]:
+    """
+    Fetch every PR review / issue comment created or edited since `cursors`.
+
+    `cursors` maps kind -> {"since": ISO updated_at high-water mark, "ids":
+    comment ids seen at exactly that timestamp}. GitHub's `since` is
+    inclusive, so those ids are skipped instead of being fetched twice on the
+    next run. With no cursor the full history is paged through (oldest
+    first). Returns the new records (one per comment id) and the
+    advanced cursors; persist the cursors only once the records are stored.
+    """
+    cursors = dict(cursors or {})
+    records = {}
+    for kind, method in ENDPOINTS.items():
+        cursor = cursors.get(kind) or {}
+        since, ids = cursor.get("since"), list(cursor.get("ids", []))
+        seen = set(ids)
+        kwargs = {"sort": "updated", "direction": "asc"}
+        if since:
+            kwargs["since"] = datetime.fromisoformat(since)
+        for comment in getattr(repo, method)(**kwargs):
+            updated = comment.updated_at.isoformat()
+            if updated == cursor.get("since") and comment.id in seen:
+                continue
+            record = comment_record(kind, comment, repo.full_name)
+            if record:
+                records[record["id"]] = record
+            if updated != since:
+                since, ids = updated, []
+            ids.append(comment.id)
+        cursors[kind] = {"since": since, "ids": ids}
+    return list(records.values()), cursors
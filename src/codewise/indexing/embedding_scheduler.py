@@ -0,0 +1,177 @@
+# src/codewise/indexing/embedding_scheduler.py
+import asyncio
+import hashlib
+import os
+import random
+import shutil
+
+import numpy as np
+
+# OpenAI accepts up to 2048 inputs and ~300k tokens per embeddings request;
+# stay well below so a single batch never gets rejected outright.
+DEFAULT_BATCH_TOKENS = 100_000
+MAX_BATCH_INPUTS = 2048
+DEFAULT_CONCURRENCY = 8
+
+
+def _token_counter():
+    """Return a text -> token count function (tiktoken if usable, else ~4 chars/token)."""
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except Exception:
+        return lambda text: len(text) // 4 + 1
+
+
+def make_batches(texts: list[str], max_tokens: int = DEFAULT_BATCH_TOKENS,
+                 max_inputs: int = MAX_BATCH_INPUTS, count_tokens=None) -> list[tuple[int, int]]:
+    """Greedily split `texts` into [start, end) ranges bounded by tokens and inputs."""
+    count_tokens = count_tokens or _token_counter()
+    batches = []
+    start, used = 0, 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text)
+        if i > start and (used + n > max_tokens or i - start >= max_inputs):
+            batches.append((start, i))
+            start, used = i, 0
+        used += n
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True if an exception from an embeddings client is an HTTP 429."""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that halves on rate limiting and grows back by one after
+    every `grow_after` consecutive successes (AIMD).
+    """
+
+    def __init__(self, limit: int, minimum: int = 1, grow_after: int = 4):
+        self.maximum = limit
+        self.minimum = minimum
+        self.limit = limit
+        self.grow_after = grow_after
+        self.in_flight = 0
+        self._streak = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, rate_limited: bool = False):
+        async with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(self.minimum, self.limit // 2)
+                self._streak = 0
+            else:
+                self._streak += 1
+                if self._streak >= self.grow_after and self.limit < self.maximum:
+                    self.limit += 1
+                    self._streak = 0
+            self._cond.notify_all()
+
+
+class EmbeddingScheduler:
+    """
+    Embed many texts with token-bounded batches sent concurrently via asyncio.
+
+    - batches are cut by estimated tokens (`max_batch_tokens`) and input count;
+    - concurrency starts at `concurrency` and is halved whenever the client
+      raises a 429, then slowly grows back; rate-limited batches are retried
+      with exponential backoff (or the server's Retry-After);
+    - with `checkpoint_dir` set, every finished batch is written to
+      `<checkpoint_dir>/<batch hash>.npy`, so an interrupted build resumes
+      from the batches it already has. Call `clear_checkpoints()` once the
+      results are safely persisted.
+
+    `embeddings` is any LangChain Embeddings object (its `aembed_documents` is
+    used), e.g. OpenAIEmbeddings(max_retries=0) or a CachedEmbeddings around it.
+    """
+
+    def __init__(self, embeddings, max_batch_tokens: int = DEFAULT_BATCH_TOKENS,
+                 concurrency: int = DEFAULT_CONCURRENCY, checkpoint_dir: str | None = None,
+                 max_retries: int = 8, base_delay: float = 1.0):
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.checkpoint_dir = checkpoint_dir
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.rate_limited = 0
+        self.resumed_batches = 0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Blocking wrapper around `aembed` for the (synchronous) build scripts."""
+        return asyncio.run(self.aembed(texts))
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        """Embed `texts` and return an (n, dim) float32 matrix in input order."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.checkpoint_dir:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+        batches = make_batches(texts, self.max_batch_tokens)
+        limiter = AdaptiveLimiter(self.concurrency)
+        results = await asyncio.gather(*(self._run_batch(texts[s:e], limiter) for s, e in batches))
+        return np.vstack(results).astype(np.float32, copy=False)
+
+    async def _run_batch(self, batch: list[str], limiter: AdaptiveLimiter) -> np.ndarray:
+        path = self._checkpoint_path(batch)
+        if path and os.path.exists(path):
+            self.resumed_batches += 1
+            return np.load(path)
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            try:
+                vectors = await self.embeddings.aembed_documents(batch)
+            except Exception as e:
+                await limiter.release(rate_limited=is_rate_limited(e))
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self.rate_limited += 1
+                delay = _retry_after(e) or self.base_delay * (2 ** attempt)
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+                continue
+            await limiter.release()
+            matrix = np.asarray(vectors, dtype=np.float32)
+            if path:
+                tmp_path = path + ".tmp.npy"
+                np.save(tmp_path, matrix)
+                os.replace(tmp_path, path)
+            return matrix
+
+    def _checkpoint_path(self, batch: list[str]) -> str | None:
+        if not self.checkpoint_dir:
+            return None
+        h = hashlib.sha256()
+        for text in batch:
+            h.update(hashlib.sha256(text.encode("utf-8")).digest())
+        return os.path.join(self.checkpoint_dir, h.hexdigest() + ".npy")
+
+    def clear_checkpoints(self) -> None:
+        if self.checkpoint_dir and os.path.isdir(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir)
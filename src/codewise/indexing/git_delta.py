@@ -0,0 +1,70 @@
+# src/codewise/indexing/git_delta.py
+import os
+
+
+def _open_repo(path):
+    try:
+        import git
+        return git.Repo(path, search_parent_directories=True)
+    except Exception:
+        # GitPython missing, or `path` is not inside a git checkout
+        return None
+
+
+def head_commit(repo_root: str) -> str | None:
+    """SHA of HEAD for the checkout containing `repo_root`, or None outside git."""
+    repo = _open_repo(repo_root)
+    if repo is None:
+        return None
+    try:
+        return repo.head.commit.hexsha
+    except ValueError:
+        return None  # repository without commits
+
+
+def is_dirty(repo_root: str) -> bool:
+    repo = _open_repo(repo_root)
+    return bool(repo and repo.is_dirty(untracked_files=True, path=os.path.abspath(repo_root)))
+
+
+def changed_python_files(repo_root: str, since: str) -> tuple[list[str], list[str]] | None:
+    """
+    Python files under `repo_root` touched between commit `since` and HEAD.
+
+    Runs `git diff --name-status <since>..HEAD` and returns
+    (changed, deleted) absolute paths: `changed` are added/modified files and
+    rename targets, `deleted` are deleted files and rename sources. Returns None
+    if the diff can't be computed (no git, unknown commit, shallow history).
+    """
+    repo = _open_repo(repo_root)
+    if repo is None:
+        return None
+    try:
+        output = repo.git.diff("--name-status", f"{since}..HEAD")
+    except Exception:
+        return None
+
+    root = os.path.abspath(repo_root)
+    top = repo.working_tree_dir
+
+    def under_root(rel):
+        path = os.path.join(top, rel)
+        inside = os.path.commonpath([root, os.path.abspath(path)]) == root
+        return path if inside and path.endswith(".py") else None
+
+    changed, deleted = [], []
+    for line in output.splitlines():
+        parts = line.split("\t")
+        status = parts[0][:1]
+        if status in ("R", "C"):
+            old, new = under_root(parts[1]), under_root(parts[2])
+            if old and status == "R":
+                deleted.append(old)
+            if new:
+                changed.append(new)
+        elif status == "D":
+            if under_root(parts[1]):
+                deleted.append(under_root(parts[1]))
+        elif under_root(parts[1]):
+            changed.append(under_root(parts[1]))
+    return sorted(set(changed)), sorted(set(deleted))
@@ -0,0 +1,104 @@
+# src/codewise/indexing/manifest.py
+import hashlib
+import json
+import os
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    """Return the sha256 hex digest of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_key(path: str, name, digest: str) -> str:
+    """Build the manifest key for a chunk: (file path, chunk name, content hash)."""
+    return f"{path}::{name or '<module>'}::{digest}"
+
+
+def key_path(key: str) -> str:
+    """File path component of a manifest key."""
+    return key.split("::", 1)[0]
+
+
+def vector_id(key: str) -> str:
+    """Deterministic docstore id for a manifest key."""
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class ChunkManifest:
+    """
+    Maps (file path, chunk name, content hash) -> vector id for a persisted store.
+
+    The manifest lives next to the vectorstore files and lets a rebuild work out
+    which chunks are new or changed (must be embedded), which were removed
+    (their vectors must be deleted) and which can be left untouched.
+    """
+
+    def __init__(self, entries: dict | None = None):
+        self.entries: dict[str, str] = dict(entries or {})
+
+    # ---------- persistence ----------
+
+    @classmethod
+    def load(cls, store_dir: str) -> "ChunkManifest | None":
+        """Load the manifest stored in `store_dir`, or None if there is none."""
+        path = os.path.join(store_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data.get("entries", {}))
+
+    def save(self, store_dir: str) -> None:
+        os.makedirs(store_dir, exist_ok=True)
+        path = os.path.join(store_dir, MANIFEST_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    # ---------- diffing ----------
+
+    @staticmethod
+    def keys_for(documents: list[dict], repo_root: str, seen: dict | None = None) -> list[str]:
+        """
+        Compute the manifest key of every document.
+
+        Paths are stored relative to `repo_root` so the manifest survives the
+        checkout being moved. Identical chunks in the same file get a "#n"
+        suffix so every document keeps its own key. Pass the same `seen` dict
+        when computing keys batch by batch.
+        """
+        keys = []
+        seen = {} if seen is None else seen
+        for doc in documents:
+            path = os.path.relpath(doc["source"], repo_root)
+            name = doc.get("qualname") or doc.get("name")
+            key = chunk_key(path, name, content_hash(doc["text"]))
+            n = seen.get(key, 0)
+            seen[key] = n + 1
+            keys.append(key if n == 0 else f"{key}#{n}")
+        return keys
+
+    def plan(self, keys: list[str], paths: set[str] | None = None) -> tuple[list[str], list[str], list[str]]:
+        """
+        Compare the current chunk keys against the manifest.
+
+        Returns (added, removed, unchanged) lists of keys. A changed chunk shows
+        up as one added plus one removed key, since its hash differs.
+
+        If `paths` (relative to the repo root) is given, `keys` only cover
+        those files, and manifest entries of other files are left alone.
+        """
+        current = set(keys)
+        added = [k for k in keys if k not in self.entries]
+        unchanged = [k for k in keys if k in self.entries]
+        removed = [
+            k for k in self.entries
+            if k not in current and (paths is None or key_path(k) in paths)
+        ]
+        return added, removed, unchanged
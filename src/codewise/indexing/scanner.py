@@ -0,0 +1,62 @@
+# src/codewise/indexing/scanner.py
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from codewise.indexing.chunker import chunk_source
+
+
+def list_python_files(repo_root: str) -> list[str]:
+    """All .py files under `repo_root`, sorted so every scan sees the same order."""
+    return sorted(glob.glob(f"{repo_root}/**/*.py", recursive=True))
+
+
+def chunk_file(path: str) -> list[dict]:
+    """Read and chunk one file into vectorstore documents."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    funcs = chunk_source(text)
+    if not funcs:
+        # fallback: use full file if no functions/classes
+        return [{"text": text, "source": path, "name": None}]
+    return [
+        {
+            "text": func["code"],
+            "source": path,
+            "name": func["name"],
+            "qualname": func["qualname"],
+            "kind": func["kind"],
+            "parent": func["parent"],
+        }
+        for func in funcs
+    ]
+
+
+def iter_documents(paths: list[str], workers: int = 1):
+    """
+    Yield the documents of every file in `paths`, in `paths` order.
+
+    With `workers > 1` reading, parsing and chunking run in a process pool;
+    `Executor.map` hands results back in submission order, so the output is
+    identical to a serial scan.
+    """
+    if workers <= 1 or len(paths) < 2:
+        for path in paths:
+            yield from chunk_file(path)
+        return
+
+    # Large chunks keep IPC overhead low; small enough to balance the load.
+    chunksize = max(1, min(64, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for docs in pool.map(chunk_file, paths, chunksize=chunksize):
+            yield from docs
+
+
+def scan_repo(repo_root: str, workers: int = 1) -> list[dict]:
+    """Chunk every Python file under `repo_root` (see `iter_documents`)."""
+    return list(iter_documents(list_python_files(repo_root), workers=workers))
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
@@ -0,0 +1,117 @@
+# src/codewise/indexing/shards.py
+import json
+import os
+import shutil
+import struct
+
+import faiss
+import numpy as np
+
+from codewise.retriever.docstore import DOCSTORE_FILE, SQLiteDocstore
+
+SHARD_DIR = "shards"
+DEFAULT_SHARD_SIZE = 2000
+
+
+class ShardWriter:
+    """
+    Accumulates (document, vector) pairs and spills them to disk in fixed-size
+    shards: `shard_NNNNN.faiss` (flat L2 index) + `shard_NNNNN.jsonl` (one
+    {"id", "page_content", "metadata"} record per vector, same order).
+
+    At most `shard_size` documents and vectors are held in memory at a time.
+    """
+
+    def __init__(self, shard_dir: str, shard_size: int = DEFAULT_SHARD_SIZE):
+        self.shard_dir = shard_dir
+        self.shard_size = shard_size
+        self.shards: list[str] = []
+        self.total = 0
+        self.dim = None
+        self._records = []
+        self._vectors = []
+        if os.path.isdir(shard_dir):
+            shutil.rmtree(shard_dir)
+        os.makedirs(shard_dir)
+
+    def add(self, records: list[dict], vectors: np.ndarray) -> None:
+        for record, vec in zip(records, vectors):
+            self._records.append(record)
+            self._vectors.append(vec)
+            if len(self._records) >= self.shard_size:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self._records:
+            return
+        matrix = np.asarray(self._vectors, dtype=np.float32)
+        self.dim = self.dim or matrix.shape[1]
+        base = os.path.join(self.shard_dir, f"shard_{len(self.shards):05d}")
+        index = faiss.IndexFlatL2(self.dim)
+        index.add(matrix)
+        faiss.write_index(index, base + ".faiss")
+        with open(base + ".jsonl", "w", encoding="utf-8") as f:
+            for record in self._records:
+                f.write(json.dumps(record) + "\n")
+        self.shards.append(base)
+        self.total += len(self._records)
+        self._records, self._vectors = [], []
+
+    def close(self) -> list[str]:
+        self.flush()
+        return self.shards
+
+
+def write_flat_index(path: str, dim: int, ntotal: int, vector_chunks) -> None:
+    """
+    Write an IndexFlatL2 file from an iterable of (n, dim) float32 arrays
+    without ever holding the whole matrix in memory.
+
+    Produces exactly the bytes `faiss.write_index(IndexFlatL2)` would: the
+    "IxF2" fourcc, the index header, then the codes vector (length in floats,
+    then raw data).
+    """
+    with open(path, "wb") as f:
+        f.write(b"IxF2")
+        f.write(struct.pack("<iqqq?i", dim, ntotal, 1 << 20, 1 << 20, True, faiss.METRIC_L2))
+        f.write(struct.pack("<Q", ntotal * dim))
+        written = 0
+        for chunk in vector_chunks:
+            chunk = np.ascontiguousarray(chunk, dtype=np.float32)
+            f.write(chunk.tobytes())
+            written += chunk.shape[0]
+    if written != ntotal:
+        raise ValueError(f"Expected {ntotal} vectors, wrote {written}")
+
+
+def merge_shards(shards: list[str], store_dir: str, dim: int, total: int) -> None:
+    """
+    Merge shards into a store (`index.faiss` + `docstore.sqlite`).
+
+    Vectors are streamed one shard at a time straight into `index.faiss` and
+    documents are streamed into the SQLite docstore, so memory stays bounded
+    by the shard size.
+    """
+    from langchain_core.documents import Document
+
+    def shard_vectors():
+        for base in shards:
+            index = faiss.read_index(base + ".faiss")
+            yield index.reconstruct_n(0, index.ntotal)
+
+    def shard_records():
+        for base in shards:
+            with open(base + ".jsonl", "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    yield record["id"], Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    os.makedirs(store_dir, exist_ok=True)
+    # Written aside and renamed: readers may have the old index memory-mapped.
+    index_path = os.path.join(store_dir, "index.faiss")
+    write_flat_index(index_path + ".tmp", dim, total, shard_vectors())
+    os.replace(index_path + ".tmp", index_path)
+    SQLiteDocstore.write(os.path.join(store_dir, DOCSTORE_FILE), shard_records())
+    legacy = os.path.join(store_dir, "index.pkl")
+    if os.path.exists(legacy):
+        os.remove(legacy)
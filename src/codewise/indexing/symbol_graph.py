@@ -0,0 +1,317 @@
+# src/codewise/indexing/symbol_graph.py
+import ast
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from codewise.indexing.chunker import DEF_NODES
+from codewise.indexing.scanner import list_python_files
+
+SYMBOLS_FILE = "symbols.json"
+SYMBOLS_VERSION = 1
+
+# Re-exports are followed this many hops (`flask.send_file` -> `flask.helpers.send_file`).
+MAX_ALIAS_HOPS = 5
+
+
+def module_name(path: str, repo_root: str) -> str:
+    """
+    Dotted module name of `path`. When `repo_root` is itself a package (has an
+    `__init__.py`) its directory name is the top-level package, so `from
+    flask import x` inside `src/flask` resolves to the indexed files.
+    """
+    rel = os.path.relpath(path, repo_root)
+    parts = rel[:-3].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    if os.path.exists(os.path.join(repo_root, "__init__.py")):
+        parts = [os.path.basename(os.path.abspath(repo_root))] + parts
+    return ".".join(p for p in parts if p)
+
+
+def _dotted(node) -> str | None:
+    """'a.b.c' for a Name/Attribute chain, else None (calls on call results, subscripts, ...)."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _call_target(call: ast.Call) -> str | None:
+    """Dotted callee of `call`; `super().name(...)` is recorded as 'super.name'."""
+    func = call.func
+    if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Call)
+            and isinstance(func.value.func, ast.Name) and func.value.func.id == "super"):
+        return f"super.{func.attr}"
+    return _dotted(func)
+
+
+def _signature(node) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _import_base(module: str, is_package: bool, node: ast.ImportFrom) -> str:
+    if not node.level:
+        return node.module or ""
+    package = module.split(".") if is_package else module.split(".")[:-1]
+    package = package[:len(package) - (node.level - 1)]
+    return ".".join(package + ([node.module] if node.module else []))
+
+
+def file_symbols(path: str, module: str) -> dict | None:
+    """
+    Definitions, import aliases and call sites of one file (None if it does not parse).
+
+    Calls are recorded as written (`self.open`, `os.path.join`, `send_file`)
+    against the enclosing top-level function or method, the same granularity
+    as the chunks; they are resolved repo-wide by `build_symbol_graph`.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except (SyntaxError, UnicodeDecodeError, ValueError):
+        return None
+
+    is_package = os.path.basename(path) == "__init__.py"
+    defs, aliases, calls = {}, {}, []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for a in node.names:
+                if a.asname:
+                    aliases[a.asname] = a.name
+                else:
+                    head = a.name.split(".")[0]
+                    aliases[head] = head
+        elif isinstance(node, ast.ImportFrom):
+            base = _import_base(module, is_package, node)
+            for a in node.names:
+                if a.name != "*":
+                    aliases[a.asname or a.name] = f"{base}.{a.name}" if base else a.name
+
+    def visit(body, prefix, cls):
+        for node in body:
+            if isinstance(node, DEF_NODES + (ast.ClassDef,)):
+                qualname = f"{prefix}.{node.name}"
+                defs[qualname] = {
+                    "name": node.name,
+                    "kind": "class" if isinstance(node, ast.ClassDef) else ("method" if cls else "function"),
+                    "line": node.lineno,
+                    "end_line": node.end_lineno,
+                    "signature": _signature(node),
+                }
+                if isinstance(node, ast.ClassDef):
+                    defs[qualname]["bases"] = [b for b in map(_dotted, node.bases) if b]
+                    visit(node.body, qualname, qualname)
+                    continue
+                for sub in ast.walk(node):
+                    if isinstance(sub, ast.Call):
+                        target = _call_target(sub)
+                        if target:
+                            calls.append((qualname, target, sub.lineno, cls))
+
+    visit(tree.body, module, None)
+    return {"module": module, "is_package": is_package, "defs": defs, "aliases": aliases, "calls": calls}
+
+
+def _scan(args):
+    return file_symbols(*args)
+
+
+class _Resolver:
+    def __init__(self, files):
+        self.defs = {}
+        self.aliases = {}
+        for info in files:
+            for qualname in info["defs"]:
+                self.defs[qualname] = info
+            self.aliases[info["module"]] = info["aliases"]
+
+    def canonical(self, dotted: str) -> str | None:
+        """The definition `dotted` refers to, following re-exports through package `__init__`s."""
+        for _ in range(MAX_ALIAS_HOPS):
+            if dotted in self.defs:
+                return dotted
+            parts = dotted.split(".")
+            for cut in range(len(parts) - 1, 0, -1):
+                module = ".".join(parts[:cut])
+                if module in self.aliases:
+                    target = self.aliases[module].get(parts[cut])
+                    if target is None:
+                        return None
+                    dotted = ".".join([target] + parts[cut + 1:])
+                    break
+            else:
+                return None
+        return None
+
+    def method(self, cls: str, name: str, seen=None, inherited_only=False) -> str | None:
+        """`cls.name`, looked up through the in-repo base classes."""
+        seen = seen or set()
+        if cls in seen:
+            return None
+        seen.add(cls)
+        if f"{cls}.{name}" in self.defs and not inherited_only:
+            return f"{cls}.{name}"
+        info = self.defs.get(cls)
+        if info is None:
+            return None
+        module = info["module"]
+        for base in info["defs"][cls].get("bases", []):
+            base_qn = self.name(module, base, None)
+            if base_qn:
+                found = self.method(base_qn, name, seen)
+                if found:
+                    return found
+        return None
+
+    def name(self, module: str, dotted: str, cls: str | None) -> str | None:
+        head, _, rest = dotted.partition(".")
+        if head in ("self", "cls") and cls:
+            if not rest or "." in rest:
+                return None
+            return self.method(cls, rest)
+        if head == "super" and cls:
+            return self.method(cls, rest, inherited_only=True)
+        aliases = self.aliases.get(module, {})
+        if f"{module}.{head}" in self.defs:
+            base = f"{module}.{head}"
+        elif head in aliases:
+            base = aliases[head]
+        else:
+            return None  # builtins, locals, parameters
+        return self.canonical(f"{base}.{rest}" if rest else base)
+
+
+def build_symbol_graph(repo_root: str, workers: int = 1) -> dict:
+    """
+    Walk every Python file under `repo_root` and return the symbol graph.
+
+    Symbols are keyed by qualified name (`flask.helpers.send_file`,
+    `flask.app.Flask.make_response`). Call sites are resolved through local
+    definitions, import aliases (including relative imports and package
+    re-exports) and `self.` / `cls.` / `super().` method calls up the in-repo
+    class hierarchy; calls that don't resolve to an indexed definition (builtins,
+    third-party code, methods of unknown objects) are dropped. Edges are stored in
+    both directions so callers and callees are single dict lookups.
+    """
+    paths = list_python_files(repo_root)
+    jobs = [(p, module_name(p, repo_root)) for p in paths]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scanned = list(pool.map(_scan, jobs, chunksize=max(1, min(64, len(jobs) // (workers * 4)))))
+    else:
+        scanned = [file_symbols(*job) for job in jobs]
+
+    files = [info for info in scanned if info is not None]
+    rel_paths = {info["module"]: os.path.relpath(p, repo_root) for (p, _), info in zip(jobs, scanned) if info}
+    resolver = _Resolver(files)
+
+    symbols, callees, callers = {}, defaultdict(set), defaultdict(set)
+    for info in files:
+        module = info["module"]
+        for qualname, entry in info["defs"].items():
+            symbols[qualname] = dict(entry, file=rel_paths[module])
+        for caller, target, _, cls in info["calls"]:
+            callee = resolver.name(module, target, cls)
+            if callee and callee != caller:
+                callees[caller].add(callee)
+                callers[callee].add(caller)
+
+    return {
+        "version": SYMBOLS_VERSION,
+        "symbols": symbols,
+        "aliases": {info["module"]: info["aliases"] for info in files if info["aliases"]},
+        "callers": {k: sorted(v) for k, v in callers.items()},
+        "callees": {k: sorted(v) for k, v in callees.items()},
+    }
+
+
+def save_symbol_graph(repo_root: str, store_dir: str, workers: int = 1) -> dict:
+    """Build the graph for `repo_root` and write it to `<store_dir>/symbols.json`."""
+    graph = build_symbol_graph(repo_root, workers=workers)
+    path = os.path.join(store_dir, SYMBOLS_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(graph, f, separators=(",", ":"), sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return graph
+
+
+class SymbolGraph:
+    """
+    Read side of `symbols.json`: symbol table plus caller/callee edges.
+
+    Affected nodes from `analyze_file_changes` are identified by (file path,
+    name); `lookup` maps them to qualified names through dicts keyed by name
+    and by (file basename, name), and `callers` / `callees` are dict lookups,
+    so no search is involved.
+    """
+
+    def __init__(self, graph: dict):
+        self.symbols = graph["symbols"]
+        self._callers = graph["callers"]
+        self._callees = graph["callees"]
+        self._by_name = defaultdict(list)
+        self._by_basename = defaultdict(list)  # (basename, name) -> [(path, qualname)]
+        for qualname, entry in self.symbols.items():
+            path = entry["file"].replace(os.sep, "/")
+            self._by_name[entry["name"]].append(qualname)
+            self._by_basename[(path.rsplit("/", 1)[-1], entry["name"])].append((path, qualname))
+
+    @classmethod
+    def load(cls, store_dir: str) -> "SymbolGraph | None":
+        path = os.path.join(store_dir, SYMBOLS_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def lookup(self, name: str, file_path: str | None = None) -> list[str]:
+        """
+        Qualified names of the definitions called `name`, restricted to
+        `file_path` when given. Paths are matched by suffix, so the PR path
+        `src/flask/helpers.py` finds `helpers.py` of a store indexed at `src/flask`.
+        """
+        if file_path is None:
+            return sorted(self._by_name.get(name, ()))
+        file_path = file_path.replace(os.sep, "/")
+        # Only files with the same basename can match by suffix.
+        candidates = self._by_basename.get((file_path.rsplit("/", 1)[-1], name), ())
+        return sorted(q for rel, q in candidates
+                      if file_path == rel or file_path.endswith("/" + rel) or rel.endswith("/" + file_path))
+
+    def callers(self, qualname: str) -> list[str]:
+        return self._callers.get(qualname, [])
+
+    def callees(self, qualname: str) -> list[str]:
+        return self._callees.get(qualname, [])
+
+    def describe(self, qualname: str) -> str:
+        """One line per symbol: signature and location."""
+        entry = self.symbols[qualname]
+        return f"{qualname}: {entry['signature']}  ({entry['file']}:{entry['line']})"
+
+    def context_for(self, name: str, file_path: str | None = None, limit: int = 10) -> str:
+        """
+        Callers and callees of the node `name` (in `file_path`) as compact
+        signature lines for a prompt; "" when the node is unknown or isolated.
+        """
+        blocks = []
+        for qualname in self.lookup(name, file_path):
+            for title, neighbours in (("Called by", self.callers(qualname)), ("Calls", self.callees(qualname))):
+                if neighbours:
+                    lines = [self.describe(q) for q in neighbours[:limit]]
+                    if len(neighbours) > limit:
+                        lines.append(f"... and {len(neighbours) - limit} more")
+                    blocks.append(f"# {title} ({qualname}):\n" + "\n".join(lines))
+        return "\n\n".join(blocks)
@@ -0,0 +1,174 @@
+# src/codewise/retrieval.py
+"""
+Retrieval for the affected nodes of a PR, as an importable API:
+
+    pipeline = RetrievalPipeline()                # nothing is loaded yet
+    result = pipeline.run(5853)                   # GitHub client, embeddings and stores built here
+    result = pipeline.run(5854)                   # ... and reused
+    json.dump(result.to_json(), f)
+
+Importing this module has no side effects. The GitHub client, the embeddings
+and both vectorstores are created on first use and can be injected
+(`RetrievalPipeline(stores=RetrievalStores(code_store=..., ...), gh=client)`),
+so batch jobs, the daemon and tests pay the setup once. Retrieval itself is
+`retriever_client.get_retrieval_matches`, the same path the review takes.
+"""
+import ast
+import os
+from typing import NamedTuple
+
+from codewise.core.static_analyzer import find_enclosing_node, parse_patch
+
+DEFAULT_REPO = "pallets/flask"
+CODE_STORE_PATH = "vectorstores/flask_store"
+COMMENTS_STORE_PATH = "vectorstores/pr_comments_store"
+TOP_K = 5
+
+
+class NodeRetrieval(NamedTuple):
+    filename: str
+    node_name: str
+    added_lines: list[tuple[int, str]]  # (line number, code) of the node's added lines
+    code_matches: list  # LangChain Documents, best first
+    comment_matches: list
+
+    @property
+    def start_line(self) -> int:
+        return self.added_lines[0][0]
+
+    @property
+    def end_line(self) -> int:
+        return self.added_lines[-1][0]
+
+    def to_json(self) -> dict:
+        return {
+            "node_name": self.node_name,
+            "start_line": self.start_line,
+            "end_line": self.end_line,
+            "added_lines": [f"+{ln}: {code}" for ln, code in self.added_lines],
+            "top_code_matches": [{"rank": i, "content": d.page_content, "metadata": d.metadata}
+                                 for i, d in enumerate(self.code_matches, 1)],
+            "top_pr_comments": [{"rank": i, "content": d.page_content, "metadata": d.metadata}
+                                for i, d in enumerate(self.comment_matches, 1)],
+        }
+
+
+class PRRetrieval(NamedTuple):
+    pr_number: int
+    pr_title: str
+    files: dict[str, list[NodeRetrieval]]  # every analysed .py file, in PR order
+
+    @property
+    def nodes(self) -> list[NodeRetrieval]:
+        return [node for nodes in self.files.values() for node in nodes]
+
+    def to_json(self) -> dict:
+        """The `pr_retrieval_output.json` layout used by the evaluation scripts."""
+        return {
+            "pr_number": self.pr_number,
+            "pr_title": self.pr_title,
+            "files": [{"filename": name, "nodes": [n.to_json() for n in nodes]} for name, nodes in self.files.items()],
+        }
+
+
+def affected_nodes(file_content: str, patch: str | None) -> dict[str, list[tuple[int, str]]]:
+    """
+    {function/class name: [(line number, code), ...]} for the lines `patch`
+    adds inside a function or class of `file_content`. Raises SyntaxError.
+    """
+    tree = ast.parse(file_content)
+    nodes = {}
+    for line_num, line_content in parse_patch(patch):
+        node = find_enclosing_node(tree, line_num)
+        if node is not None:
+            nodes.setdefault(node.name, []).append((line_num, line_content))
+    return nodes
+
+
+class RetrievalStores:
+    """
+    The code and PR comment vectorstores plus the embeddings that query them,
+    each created on first use unless passed in. They are searched by
+    `retriever_client` (daemon, neighbour graph, retrieval cache, hybrid
+    search, partitions and context packing), which holds one set of stores
+    per process: `search` installs these in it.
+    """
+
+    def __init__(self, code_store_path: str = CODE_STORE_PATH, comments_store_path: str = COMMENTS_STORE_PATH,
+                 embeddings=None, code_store=None, comments_store=None):
+        self.code_store_path = code_store_path
+        self.comments_store_path = comments_store_path
+        self._embeddings = embeddings
+        self._code_store = code_store
+        self._comments_store = comments_store
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from codewise.retriever.embeddings import get_embeddings
+            self._embeddings = get_embeddings()
+        return self._embeddings
+
+    def _install(self, client) -> None:
+        if (client.CODE_STORE_PATH, client.COMMENTS_STORE_PATH) != (self.code_store_path, self.comments_store_path):
+            client.CODE_STORE_PATH, client.COMMENTS_STORE_PATH = self.code_store_path, self.comments_store_path
+            client.unload()
+        if self._code_store is not None and self._comments_store is not None and \
+                (client.code_store, client.comments_store) != (self._code_store, self._comments_store):
+            client.unload()
+            client.code_store, client.comments_store = self._code_store, self._comments_store
+            client.embeddings = self.embeddings
+
+    def search(self, code_snippets: list[str], top_k: int = TOP_K, node_names: list | None = None,
+               file_paths: list | None = None) -> list[tuple[list, list]]:
+        """
+        (code matches, comment matches) per snippet, from
+        `retriever_client.get_retrieval_matches`: one embedding call for the
+        snippets that need a dense search and one batched search per store.
+        """
+        from codewise.retriever import retriever_client
+
+        self._install(retriever_client)
+        return retriever_client.get_retrieval_matches(code_snippets, top_k, node_names, file_paths)
+
+
+class RetrievalPipeline:
+    """
+    Code and PR comment context for every function/class a PR's Python
+    changes touch. `gh` is a `GitHubClient` (created from GITHUB_TOKEN on
+    first use); the PR is read with one `get_pr_snapshot` and all of its nodes
+    are retrieved in one batch.
+    """
+
+    def __init__(self, stores: RetrievalStores | None = None, gh=None, repo_name: str = DEFAULT_REPO,
+                 top_k: int = TOP_K):
+        self.stores = stores or RetrievalStores()
+        self._gh = gh
+        self.repo_name = repo_name
+        self.top_k = top_k
+
+    @property
+    def gh(self):
+        if self._gh is None:
+            from codewise.github_client import GitHubClient
+            self._gh = GitHubClient()
+        return self._gh
+
+    def run(self, pr_number: int) -> PRRetrieval:
+        snapshot = self.gh.get_pr_snapshot(self.repo_name, pr_number)
+        files = {}
+        for file in snapshot.files:
+            if not file.filename.endswith(".py") or file.content is None:
+                continue
+            try:
+                files[file.filename] = affected_nodes(file.content, file.patch)
+            except SyntaxError:
+                continue  # not parseable at the head commit; nothing to anchor nodes to
+
+        pending = [(name, node, lines) for name, nodes in files.items() for node, lines in nodes.items()]
+        matches = self.stores.search(["\n".join(code for _, code in lines) for _, _, lines in pending], self.top_k,
+                                     [node for _, node, _ in pending], [name for name, _, _ in pending])
+        result = {name: [] for name in files}
+        for (name, node, lines), (code_matches, comment_matches) in zip(pending, matches):
+            result[name].append(NodeRetrieval(name, node, lines, code_matches, comment_matches))
+        return PRRetrieval(snapshot.number, snapshot.title, result)
@@ -0,0 +1,38 @@
+# src/codewise/retriever/code_tokens.py
+import re
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Python keywords and ubiquitous names that say little about what code does.
+STOPWORDS = frozenset(
+    "self cls def return if else elif for in is not and or none true false import from as class "
+    "with try except finally raise pass while break continue lambda yield the a an to of".split()
+)
+
+
+def identifier_parts(identifier: str) -> list[str]:
+    """Lower-cased snake_case / camelCase parts: `sendFile_async` -> ['send', 'file', 'async']."""
+    return [p.lower() for p in _PART.findall(identifier)]
+
+
+def identifiers(text: str) -> list[str]:
+    """Identifiers and numbers in `text`, as written."""
+    return _IDENTIFIER.findall(text)
+
+
+def code_tokens(text: str) -> list[str]:
+    """
+    Identifier-aware tokens of source code or prose.
+
+    Every identifier is emitted whole (lower-cased) and, if it is compound,
+    followed by its parts, so `url_for` yields 'url_for', 'url', 'for'.
+    """
+    tokens = []
+    for word in identifiers(text):
+        whole = word.lower()
+        tokens.append(whole)
+        parts = identifier_parts(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
@@ -0,0 +1,189 @@
+# src/codewise/retriever/context_packer.py
+"""
+Fit the retrieved code and PR comments for a node into a token budget before
+they go into the review prompt.
+
+Per node, the candidates (top-k code matches and top-k comments) are
+
+1. scored by cosine similarity to the node's snippet; hits below `min_score`
+   are dropped,
+2. ordered by maximal marginal relevance (MMR), so a near copy of an
+   already chosen hit moves to the back (and one above DUPLICATE_SIMILARITY is
+   dropped),
+3. admitted alternately from the code and the comment ranking while they fit
+   in `budget` tokens. A code match that doesn't fit is cut at a line boundary
+   when at least MIN_TRUNCATED_TOKENS remain, otherwise skipped.
+
+Nothing is embedded here: the hits' vectors are the ones stored in the
+indexes, and the snippet's is the query vector its search already computed
+(see `retriever_client._pack`). A snippet answered by BM25 alone has none;
+its hits keep the retrieval order and only near copies are dropped.
+
+Tokens are counted with tiktoken's encoding for gpt-4o, or estimated at four
+characters per token when tiktoken (or its encoding file) isn't available.
+"""
+import functools
+import os
+from collections import Counter
+
+import numpy as np
+from langchain_core.documents import Document
+
+TOKEN_BUDGET = int(os.environ.get("RETRIEVAL_TOKEN_BUDGET", "2000"))
+# Cosine similarity between snippet and hit; depends on the embeddings
+# backend (ada-002 rarely scores unrelated text below 0.7, the local hash
+# embeddings rarely above 0.5).
+MIN_SCORE = float(os.environ.get("RETRIEVAL_MIN_SCORE", "0.2"))
+MMR_LAMBDA = float(os.environ.get("RETRIEVAL_MMR_LAMBDA", "0.7"))
+DUPLICATE_SIMILARITY = 0.95
+MIN_TRUNCATED_TOKENS = 64
+TOKENIZER_MODEL = "gpt-4o"
+TRUNCATION_MARKER = "\n# ... (truncated)"
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # tiktoken missing, or its encoding file can't be downloaded
+        return None
+
+
+def count_tokens(text: str, model: str = TOKENIZER_MODEL) -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = TOKENIZER_MODEL) -> str:
+    """The longest prefix of whole lines of `text` within `max_tokens`, marker included."""
+    limit = max(max_tokens - count_tokens(TRUNCATION_MARKER, model), 0)
+    enc = _encoding(model)
+    if enc is None:
+        cut = text[:limit * 4]
+    else:
+        cut = enc.decode(enc.encode(text, disallowed_special=())[:limit])
+    if "\n" in cut:
+        cut = cut[:cut.rindex("\n")]
+    return cut + TRUNCATION_MARKER
+
+
+def mmr(query: np.ndarray, candidates: np.ndarray, lambda_mult: float = MMR_LAMBDA,
+        duplicate_similarity: float = DUPLICATE_SIMILARITY) -> tuple[list[int], list[int]]:
+    """
+    Maximal marginal relevance order of the rows of `candidates` (unit
+    vectors) for the unit vector `query`: each step picks the row maximising
+    `lambda_mult * sim(query, row) - (1 - lambda_mult) * max sim(row, picked)`.
+    Returns (order, duplicates), the rows that were dropped as near copies.
+    """
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+    redundancy = np.zeros(len(candidates))
+    remaining = list(range(len(candidates)))
+    order, duplicates = [], []
+    while remaining:
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy[remaining]
+        best = remaining.pop(int(np.argmax(scores)))
+        if order and redundancy[best] >= duplicate_similarity:
+            duplicates.append(best)
+            continue
+        order.append(best)
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return order, duplicates
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _distinct(vectors: np.ndarray, duplicate_similarity: float = DUPLICATE_SIMILARITY) -> list[int]:
+    """Rows of `vectors` (unit vectors, in rank order) that aren't near copies of an earlier kept row."""
+    keep = []
+    for row in range(len(vectors)):
+        if not keep or float(np.max(vectors[keep] @ vectors[row])) < duplicate_similarity:
+            keep.append(row)
+    return keep
+
+
+class ContextPacker:
+    """
+    Applies the score cut-off, MMR and token budget to retrieval results.
+
+    `stats` accumulates over calls: "nodes" ("unscored": without a query
+    vector), "retrieved_tokens" (all hits as retrieved), "packed_tokens" (what
+    was kept) and the number of hits dropped as "below_min_score", "duplicate"
+    and "over_budget", plus "truncated" and "missing_vectors" (hits without a
+    stored vector; their ranking is kept unscored).
+    """
+
+    def __init__(self, budget: int | None = None, min_score: float | None = None,
+                 lambda_mult: float | None = None, model: str = TOKENIZER_MODEL):
+        self.budget = TOKEN_BUDGET if budget is None else budget
+        self.min_score = MIN_SCORE if min_score is None else min_score
+        self.lambda_mult = MMR_LAMBDA if lambda_mult is None else lambda_mult
+        self.model = model
+        self.stats = Counter()
+
+    def pack(self, matches: list[tuple[list, list]], query_vectors: list,
+             hit_vectors: dict) -> list[tuple[list, list]]:
+        """
+        (code matches, comment matches) per snippet, reduced to fit the
+        budget. `query_vectors` holds each snippet's embedding (None when its
+        search didn't need one), `hit_vectors` the stored vector per hit id.
+        """
+        packed = []
+        for query, (code, comments) in zip(query_vectors, matches):
+            if query is not None:
+                query = _unit(np.asarray(query, dtype=np.float32)[None])[0]
+            else:
+                self.stats["unscored"] += 1
+            ranked = [self._rank(query, docs, hit_vectors) for docs in (code, comments)]
+            packed.append(self._fill(*ranked))
+            self.stats["nodes"] += 1
+            self.stats["retrieved_tokens"] += sum(count_tokens(d.page_content, self.model) for d in (*code, *comments))
+        return packed
+
+    def _rank(self, query, docs, hit_vectors) -> list:
+        missing = sum(d.id not in hit_vectors for d in docs)
+        if missing:
+            self.stats["missing_vectors"] += missing
+        if not docs or missing:
+            return list(docs)
+        vectors = _unit(np.asarray([hit_vectors[d.id] for d in docs], dtype=np.float32))
+        if query is None:
+            keep = _distinct(vectors)
+            self.stats["duplicate"] += len(docs) - len(keep)
+            return [docs[i] for i in keep]
+        scored = [i for i in range(len(docs)) if float(vectors[i] @ query) >= self.min_score]
+        self.stats["below_min_score"] += len(docs) - len(scored)
+        if not scored:
+            return []
+        order, duplicates = mmr(query, vectors[scored], self.lambda_mult)
+        self.stats["duplicate"] += len(duplicates)
+        return [docs[scored[i]] for i in order]
+
+    def _fill(self, code: list, comments: list) -> tuple[list, list]:
+        """Admit code and comments alternately, best first, while they fit."""
+        kept = {"code": [], "comments": []}
+        remaining = self.budget
+        turns = [("code", d) for d in code], [("comments", d) for d in comments]
+        interleaved = [item for pair in zip(*turns) for item in pair]
+        interleaved += turns[0][len(comments):] + turns[1][len(code):]
+        for kind, doc in interleaved:
+            tokens = count_tokens(doc.page_content, self.model)
+            if tokens > remaining and kind == "code" and remaining >= MIN_TRUNCATED_TOKENS:
+                doc = Document(id=doc.id, page_content=truncate_tokens(doc.page_content, remaining, self.model),
+                               metadata={**doc.metadata, "truncated": True})
+                tokens = count_tokens(doc.page_content, self.model)
+                self.stats["truncated"] += 1
+            if tokens > remaining:
+                self.stats["over_budget"] += 1
+                continue
+            kept[kind].append(doc)
+            remaining -= tokens
+            self.stats["packed_tokens"] += tokens
+        return kept["code"], kept["comments"]
@@ -0,0 +1,216 @@
+# src/codewise/retriever/daemon.py
+import json
+import logging
+import os
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Where a running daemon advertises its address; clients only use a daemon
+# serving the same store directories they would load themselves.
+DAEMON_FILE = os.environ.get("RETRIEVAL_DAEMON_FILE", "vectorstores/retrieval_daemon.json")
+TIMEOUT = float(os.environ.get("RETRIEVAL_DAEMON_TIMEOUT", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_daemon_file(path: str | None = None) -> dict | None:
+    """The running daemon's {pid, host, port, code_store, comments_store}, or None."""
+    try:
+        with open(path or DAEMON_FILE, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return info if _alive(info.get("pid", -1)) else None
+
+
+def daemon_url(code_store: str, comments_store: str, path: str | None = None) -> str | None:
+    """Base URL of a daemon serving these stores, or None when none is running."""
+    info = read_daemon_file(path)
+    if info is None:
+        return None
+    if (info["code_store"], info["comments_store"]) != (os.path.abspath(code_store), os.path.abspath(comments_store)):
+        return None
+    return f"http://{info['host']}:{info['port']}"
+
+
+def _post_retrieve(url: str, request: dict, stats=None) -> dict:
+    body = json.dumps(request).encode("utf-8")
+    request = urllib.request.Request(f"{url}/retrieve", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+        payload = json.loads(response.read())
+    if stats is not None:
+        stats.update(payload.get("pack_stats", {}))
+    return payload
+
+
+def request_contexts(url: str, code_snippets: list[str], top_k: int = 5, node_names=None,
+                     file_paths=None, stats=None, path_prefixes=None, comment_type=None) -> list[str]:
+    """
+    `get_retrieval_contexts` answered by the daemon at `url`. The request's
+    context packing stats are added to the Counter `stats`, if given.
+    """
+    return _post_retrieve(url, {"snippets": code_snippets, "top_k": top_k,
+                                "node_names": node_names, "file_paths": file_paths,
+                                "path_prefixes": path_prefixes, "comment_type": comment_type}, stats)["contexts"]
+
+
+def request_matches(url: str, code_snippets: list[str], top_k: int = 5, node_names=None,
+                    file_paths=None, stats=None, path_prefixes=None, comment_type=None) -> list[tuple[list, list]]:
+    """`get_retrieval_matches` answered by the daemon at `url`, like `request_contexts`."""
+    from langchain_core.documents import Document
+
+    payload = _post_retrieve(url, {"snippets": code_snippets, "top_k": top_k, "documents": True,
+                                   "node_names": node_names, "file_paths": file_paths,
+                                   "path_prefixes": path_prefixes, "comment_type": comment_type}, stats)
+    return [tuple([Document(page_content=d["content"], metadata=d["metadata"], id=d["id"]) for d in docs]
+                  for docs in match) for match in payload["matches"]]
+
+
+def health(url: str, timeout: float = 5) -> dict:
+    """The daemon's /health payload: pid, request count, store version and stats."""
+    with urllib.request.urlopen(f"{url}/health", timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _documents_json(matches: list[tuple[list, list]]) -> list:
+    return [[[{"content": d.page_content, "metadata": d.metadata, "id": d.id} for d in docs] for docs in match]
+            for match in matches]
+
+
+class RetrievalServer(HTTPServer):
+    """
+    Keeps the retriever's stores, lexical indexes and symbol graph loaded and
+    answers batched retrieval requests. When a build writes a new store
+    version (`store_meta.store_version`), the stores are reloaded before the
+    next request.
+
+    Requests are served one at a time: `retriever_client` keeps its stores,
+    SQLite caches and stats in module globals, and each request is a single
+    batch that is CPU-bound under the GIL anyway.
+    """
+
+    def __init__(self, address):
+        super().__init__(address, RetrievalHandler)
+        from codewise.retriever import retriever_client
+
+        self.client = retriever_client
+        self.requests = 0
+        self.version = None
+        self.load()
+
+    def _store_version(self):
+        from codewise.retriever.store_meta import store_version
+        return store_version(self.client.CODE_STORE_PATH), store_version(self.client.COMMENTS_STORE_PATH)
+
+    def load(self):
+        client = self.client
+        client.unload()
+        client._ensure_stores_loaded()
+        if client.code_store is None or client.comments_store is None:
+            raise RuntimeError(f"could not load {client.CODE_STORE_PATH} and {client.COMMENTS_STORE_PATH}")
+        client._ensure_graph_loaded()
+        self.version = self._store_version()
+
+    def retrieve(self, request: dict) -> tuple[dict, dict]:
+        """
+        The request's {"contexts": ...} (with "documents", {"matches": ...})
+        and the context packing stats it added.
+        """
+        if self._store_version() != self.version:
+            logger.info("Stores were rebuilt; reloading")
+            self.load()
+        self.requests += 1
+        before = self.client.pack_stats.copy()
+        retrieve = self.client.get_retrieval_matches if request.get("documents") else \
+            self.client.get_retrieval_contexts
+        result = retrieve(
+            request["snippets"], request.get("top_k", 5),
+            node_names=request.get("node_names"), file_paths=request.get("file_paths"),
+            path_prefixes=request.get("path_prefixes"), comment_type=request.get("comment_type"),
+        )
+        result = {"matches": _documents_json(result)} if request.get("documents") else {"contexts": result}
+        return result, dict(self.client.pack_stats - before)
+
+
+class RetrievalHandler(BaseHTTPRequestHandler):
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send(404, {"error": "not found"})
+        server = self.server
+        self._send(200, {"pid": os.getpid(), "requests": server.requests, "version": server.version,
+                         "search_stats": dict(server.client.search_stats),
+                         "pack_stats": dict(server.client.pack_stats)})
+
+    def do_POST(self):
+        if self.path != "/retrieve":
+            return self._send(404, {"error": "not found"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            result, pack_stats = self.server.retrieve(request)
+        except Exception as e:
+            logger.exception("Retrieval request failed")
+            return self._send(500, {"error": str(e)})
+        self._send(200, {**result, "pack_stats": pack_stats})
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, code_store: str | None = None,
+          comments_store: str | None = None, daemon_file: str | None = None) -> None:
+    """
+    Load the stores once and answer retrieval requests until interrupted.
+    The address is written to `daemon_file` (removed on exit) so that
+    `retriever_client` finds the daemon.
+    """
+    from codewise.retriever import retriever_client
+
+    retriever_client.USE_DAEMON = False  # answer locally, never forward to ourselves
+    if code_store:
+        retriever_client.CODE_STORE_PATH = code_store
+    if comments_store:
+        retriever_client.COMMENTS_STORE_PATH = comments_store
+
+    start = time.perf_counter()
+    server = RetrievalServer((host, port))
+    path = daemon_file or DAEMON_FILE
+    info = {"pid": os.getpid(), "host": host, "port": server.server_address[1],
+            "code_store": os.path.abspath(retriever_client.CODE_STORE_PATH),
+            "comments_store": os.path.abspath(retriever_client.COMMENTS_STORE_PATH)}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(path + ".tmp", path)
+    print(f"Retrieval daemon on http://{host}:{info['port']} (stores loaded in "
+          f"{time.perf_counter() - start:.2f}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        current = read_daemon_file(path)
+        if current is not None and current["pid"] == os.getpid():
+            os.remove(path)
@@ -0,0 +1,209 @@
+# src/codewise/retriever/docstore.py
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_FILE = "docstore.sqlite"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS positions (pos INTEGER PRIMARY KEY, id TEXT NOT NULL)",
+)
+
+
+def _clean_metadata(doc: Document) -> dict:
+    """Metadata without the legacy `text` copy of the page content."""
+    meta = dict(doc.metadata or {})
+    if meta.get("text") == doc.page_content:
+        del meta["text"]
+    return meta
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore kept in a SQLite file instead of the pickled `index.pkl`.
+
+    Opening it only opens the file; documents are fetched by id when a search
+    hit needs them. The `positions` table maps FAISS row -> document id (see
+    `PositionMap`). Writes are batched in one transaction until `commit()`, so
+    an interrupted update leaves the previous store intact.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            self._conn.execute("PRAGMA mmap_size = 268435456")
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            for stmt in _SCHEMA:
+                self._conn.execute(stmt)
+
+    # ---------- Docstore interface ----------
+
+    def search(self, search: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM docs WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def mget(self, ids: list[str]) -> list[Document | None]:
+        """Fetch several documents in one query, in `ids` order."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for doc_id, content, meta in self._conn.execute(
+                    f"SELECT id, page_content, metadata FROM docs WHERE id IN ({marks})", chunk
+                ):
+                    found[doc_id] = Document(id=doc_id, page_content=content, metadata=json.loads(meta))
+        return [found.get(i) for i in ids]
+
+    def add(self, texts: dict[str, Document]) -> None:
+        rows = [(doc_id, doc.page_content, json.dumps(_clean_metadata(doc))) for doc_id, doc in texts.items()]
+        with self._lock:
+            try:
+                self._conn.executemany("INSERT INTO docs VALUES (?, ?, ?)", rows)
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"Tried to add ids that already exist: {e}")
+
+    def delete(self, ids: list) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+
+    def update_metadata(self, updates: dict[str, dict]) -> None:
+        """Merge `updates` ({id: fields}) into the metadata of stored documents."""
+        ids = list(updates)
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT id, metadata FROM docs WHERE id IN ({marks})", chunk).fetchall()
+                self._conn.executemany(
+                    "UPDATE docs SET metadata = ? WHERE id = ?",
+                    [(json.dumps({**json.loads(meta), **updates[doc_id]}), doc_id) for doc_id, meta in rows],
+                )
+
+    # ---------- persistence ----------
+
+    def set_positions(self, index_to_docstore_id) -> None:
+        """Replace the FAISS row -> id table (rows shift after deletions)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM positions")
+            self._conn.executemany("INSERT INTO positions VALUES (?, ?)", index_to_docstore_id.items())
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def load_positions(self) -> dict[int, str]:
+        """The full row -> id map as a dict (needed when the store is going to be modified)."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT pos, id FROM positions"))
+
+    def rows_of(self, ids: list[str]) -> dict[str, int]:
+        """{id: FAISS row} for the given document ids that have a row."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(f"SELECT id, pos FROM positions WHERE id IN ({marks})", chunk))
+        return found
+
+    def iter_rows(self):
+        """Yield (id, page_content, metadata) for every document, in FAISS row order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT docs.id, docs.page_content, docs.metadata FROM positions "
+                "JOIN docs ON docs.id = positions.id ORDER BY positions.pos"
+            )
+        while True:
+            with self._lock:
+                batch = rows.fetchmany(1000)
+            if not batch:
+                return
+            for doc_id, content, meta in batch:
+                yield doc_id, content, json.loads(meta)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @classmethod
+    def write(cls, path: str, records) -> int:
+        """
+        Create a fresh docstore at `path` from an iterable of
+        (doc_id, Document) in FAISS row order. Streams; returns the row count.
+        """
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        store = cls(tmp_path)
+        n = 0
+        batch = []
+        for doc_id, doc in records:
+            batch.append((doc_id, doc))
+            if len(batch) >= 1000:
+                n = store._append(batch, n)
+                batch = []
+        n = store._append(batch, n)
+        store.commit()
+        store.close()
+        os.replace(tmp_path, path)
+        return n
+
+    def _append(self, batch, start):
+        self.add({doc_id: doc for doc_id, doc in batch})
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO positions VALUES (?, ?)",
+                [(start + j, doc_id) for j, (doc_id, _) in enumerate(batch)],
+            )
+        return start + len(batch)
+
+
+class PositionMap(Mapping):
+    """Read-only, lazily queried FAISS row -> document id mapping."""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+
+    def __getitem__(self, pos):
+        with self.docstore._lock:
+            row = self.docstore._conn.execute("SELECT id FROM positions WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def get_many(self, positions) -> list[str | None]:
+        positions = [int(p) for p in positions]
+        with self.docstore._lock:
+            marks = ",".join("?" * len(positions))
+            found = dict(self.docstore._conn.execute(
+                f"SELECT pos, id FROM positions WHERE pos IN ({marks})", positions
+            ))
+        return [found.get(p) for p in positions]
+
+    def __iter__(self):
+        with self.docstore._lock:
+            rows = self.docstore._conn.execute("SELECT pos FROM positions ORDER BY pos").fetchall()
+        return iter(r[0] for r in rows)
+
+    def __len__(self):
+        with self.docstore._lock:
+            return self.docstore._conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
@@ -0,0 +1,223 @@
+# src/codewise/retriever/embedding_cache.py
+import contextlib
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_DIR = "vectorstores/embedding_cache"
+DEFAULT_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_name(embeddings) -> str:
+    """Best-effort model identifier for an embeddings client."""
+    name = getattr(embeddings, "model", None) or type(embeddings).__name__
+    dims = getattr(embeddings, "dimensions", None)
+    return f"{name}-{dims}" if dims else str(name)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in wrapper that caches another LangChain `Embeddings` on disk.
+
+    Vectors are keyed by (model, sha256(text)). Each model gets its own
+    directory holding a raw float32 matrix (`vectors.f32`, one row per entry)
+    and a SQLite key index (`index.sqlite`: key -> row, last use). Once the
+    cache holds more than `max_entries` vectors the least recently used ones are
+    evicted and their rows are reused by later inserts.
+
+    Several processes (the retrieval daemon, a build, CLI runs) may share one
+    cache: lookups and inserts run in a `BEGIN IMMEDIATE` transaction, so row
+    allocation, the vector writes and the key updates of one process never
+    interleave with another's.
+
+    `hits` / `misses` count texts served from the cache versus sent to the
+    wrapped client, so `misses` is the number of texts actually embedded.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, model: str | None = None):
+        self.embeddings = embeddings
+        self.model = model or model_name(embeddings)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.cache_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), timeout=60,
+                                     check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER, last_used INTEGER)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        row = self._conn.execute("SELECT MAX(last_used) FROM entries").fetchone()
+        self._clock = row[0] or 0
+
+    # ---------- Embeddings interface ----------
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        found, missing = self._lookup(texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(missing)
+            found.update(self._store(missing, vectors))
+        return [found[text_key(t)] for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        found, missing = self._lookup([text])
+        if missing:
+            found.update(self._store(missing, [self.embeddings.embed_query(text)]))
+        return found[text_key(text)]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        found, missing = self._lookup(texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(missing)
+            found.update(self._store(missing, vectors))
+        return [found[text_key(t)] for t in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        found, missing = self._lookup([text])
+        if missing:
+            found.update(self._store(missing, [await self.embeddings.aembed_query(text)]))
+        return found[text_key(text)]
+
+    # ---------- cache internals ----------
+
+    def _lookup(self, texts):
+        """Return ({key: vector} for cached texts, [unique texts that must be embedded])."""
+        unique = {}
+        for t in texts:
+            unique.setdefault(text_key(t), t)
+
+        found = {}
+        with self._transaction():
+            self._refresh_dim()
+            rows = {}
+            keys = list(unique)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows.update(self._conn.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({marks})", chunk
+                ).fetchall())
+            if rows:
+                matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dim)
+                for key, row in rows.items():
+                    found[key] = matrix[row].tolist()
+                clock = self._tick()
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?", [(clock, k) for k in rows]
+                )
+
+        missing = [t for k, t in unique.items() if k not in found]
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return found, missing
+
+    def _store(self, texts, vectors):
+        """Write freshly embedded vectors to the cache and return them keyed by text hash."""
+        out = {text_key(t): list(v) for t, v in zip(texts, vectors)}
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._transaction():
+            self._refresh_dim()
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+            elif matrix.shape[1] != self.dim:
+                # Never mix dimensions in one matrix; just skip caching.
+                return out
+
+            rows = self._allocate_rows(len(texts))
+            size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+            with open(self._vectors_path, "r+b" if size else "wb") as f:
+                for row, vec in zip(rows, matrix):
+                    f.seek(row * self.dim * 4)
+                    f.write(vec.tobytes())
+            clock = self._tick()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                [(k, row, clock) for k, row in zip(out, rows)],
+            )
+        return out
+
+    def _refresh_dim(self) -> None:
+        # Another process may have stored the first vectors since this one opened the cache.
+        if self.dim is None:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            self.dim = int(row[0]) if row else None
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Hold SQLite's write lock (shared by all processes using the cache) for the block."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def _tick(self) -> int:
+        """Next LRU timestamp, after any written by other processes."""
+        latest = self._conn.execute("SELECT MAX(last_used) FROM entries").fetchone()[0] or 0
+        self._clock = max(self._clock, latest) + 1
+        return self._clock
+
+    def _allocate_rows(self, n):
+        """
+        Pick `n` matrix rows for new entries, evicting LRU entries beyond the
+        cap. Call inside `_transaction` and write the rows before it ends: the
+        end of the file is only a free row while no other process can append.
+        """
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count + n - self.max_entries
+        reused = []
+        if overflow > 0:
+            victims = self._conn.execute(
+                "SELECT key, row FROM entries ORDER BY last_used LIMIT ?", (min(overflow, count),)
+            ).fetchall()
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+            reused = [row for _, row in victims]
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        next_row = size // (self.dim * 4)
+        return reused + list(range(next_row, next_row + n - len(reused)))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": entries,
+        }
+
+
+def with_cache(embeddings: Embeddings, cache_dir: str = DEFAULT_CACHE_DIR) -> Embeddings:
+    """Wrap `embeddings` in a CachedEmbeddings unless DISABLE_EMBEDDING_CACHE is set."""
+    if os.environ.get("DISABLE_EMBEDDING_CACHE", "0") in ("1", "true", "True"):
+        return embeddings
+    return CachedEmbeddings(embeddings, cache_dir=cache_dir)
+
+
+def cache_stats(embeddings) -> dict | None:
+    """Hit/miss counters of a cached embeddings client, or None if it isn't cached."""
+    return embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None
@@ -0,0 +1,134 @@
+# src/codewise/retriever/embeddings.py
+import math
+import os
+import zlib
+from collections import Counter
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from codewise.retriever.code_tokens import STOPWORDS, identifier_parts, identifiers
+from codewise.retriever.embedding_cache import CachedEmbeddings, model_name, with_cache
+
+
+class EmbeddingsMismatchError(ValueError):
+    """A store is being queried or updated with a different embeddings backend than it was built with."""
+
+
+class LocalHashEmbeddings(Embeddings):
+    """
+    Fully local embeddings: hashed, identifier-aware bag of code tokens.
+
+    Each text is split into identifiers, their snake/camel-case parts and
+    bigrams of consecutive identifiers. Features are hashed (crc32, so stable
+    across processes) into `dimensions` signed buckets with log(1 + tf)
+    weights, keywords and other stopwords down-weighted, and the vector is
+    L2-normalised so L2 search ranks by cosine similarity.
+
+    No model, no network and no fitted state: the same text always maps to
+    the same vector, so stores can be built and queried offline.
+    """
+
+    model = "local-hash-v1"
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self._buckets: dict[str, tuple[int, float]] = {}
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        hit = self._buckets.get(feature)
+        if hit is None:
+            h = zlib.crc32(feature.encode("utf-8"))
+            hit = (h % self.dimensions, 1.0 if h & 0x80000000 else -1.0)
+            if len(self._buckets) > 500_000:
+                self._buckets.clear()
+            self._buckets[feature] = hit
+        return hit
+
+    def _features(self, text: str) -> Counter:
+        features = Counter()
+        previous = None
+        for identifier in identifiers(text):
+            word = identifier.lower()
+            weight = 0.2 if word in STOPWORDS else 1.0
+            features[word] += weight
+            parts = identifier_parts(identifier)
+            if len(parts) > 1:
+                for part in parts:
+                    features["~" + part] += 0.5 * weight
+            if previous is not None:
+                features[previous + " " + word] += 0.5 * weight
+            previous = word
+        return features
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_matrix(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_matrix([text])[0].tolist()
+
+    def embed_matrix(self, texts: list[str]) -> np.ndarray:
+        """Embed `texts` into an (n, dimensions) float32 matrix."""
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                col, sign = self._bucket(feature)
+                matrix[row, col] += sign * math.log1p(weight)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def _openai_embeddings() -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings
+    return with_cache(OpenAIEmbeddings())  # make sure OPENAI_API_KEY is set
+
+
+# name -> zero-argument factory; extend with `register_backend`.
+BACKENDS = {
+    "openai": _openai_embeddings,
+    "local": LocalHashEmbeddings,  # fast enough that caching on disk wouldn't pay off
+}
+
+
+def register_backend(name: str, factory) -> None:
+    BACKENDS[name] = factory
+
+
+def get_embeddings(backend: str | None = None) -> Embeddings:
+    """
+    Embeddings client for `backend` (default: the EMBEDDINGS_BACKEND
+    environment variable, else "openai").
+    """
+    name = backend or os.environ.get("EMBEDDINGS_BACKEND", "openai")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embeddings backend {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def backend_id(embeddings) -> str:
+    """Identifier recorded with a store, e.g. 'text-embedding-ada-002' or 'local-hash-v1-512'."""
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.model
+    return model_name(embeddings)
+
+
+def check_backend(recorded: str | None, embeddings, dim: int | None = None) -> None:
+    """
+    Refuse to use `embeddings` with a store built by a different backend.
+
+    `recorded` is the store's backend id (None for stores built before it was
+    recorded; then only the vector dimension is checked, when known).
+    """
+    current = backend_id(embeddings)
+    if recorded and recorded != current:
+        raise EmbeddingsMismatchError(
+            f"Store was built with embeddings {recorded!r} but {current!r} is configured; "
+            "use the same EMBEDDINGS_BACKEND or rebuild the store."
+        )
+    dimensions = getattr(embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings,
+                         "dimensions", None)
+    if not recorded and dim and dimensions and dimensions != dim:
+        raise EmbeddingsMismatchError(
+            f"Store holds {dim}-dimensional vectors but {current!r} produces {dimensions}; rebuild the store."
+        )
@@ -0,0 +1,193 @@
+# src/codewise/retriever/index_factory.py
+import math
+import struct
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("auto", "flat", "ivf-flat", "ivf-pq", "hnsw")
+COMPRESSIONS = ("none", "fp16", "sq8", "pq")
+
+# Exact search is cheap below this size; above it HNSW gives the best
+# recall/latency trade-off until memory forces compressed IVF-PQ codes.
+FLAT_MAX_VECTORS = 20_000
+HNSW_MAX_VECTORS = 1_000_000
+
+DEFAULT_HNSW_M = 32
+DEFAULT_EF_CONSTRUCTION = 80
+DEFAULT_EF_SEARCH = 64
+ADD_CHUNK = 65_536
+
+_SQ_TYPES = {"fp16": faiss.ScalarQuantizer.QT_fp16, "sq8": faiss.ScalarQuantizer.QT_8bit}
+
+# IndexFlatL2 file layout: fourcc, header (d, ntotal, 2 dummies, is_trained,
+# metric), then the float count and the raw vectors.
+_FLAT_HEADER = struct.Struct("<iqqq?i")
+_FLAT_DATA_OFFSET = 4 + _FLAT_HEADER.size + 8
+
+
+def choose_index_type(n: int) -> str:
+    """Heuristic default index type for a corpus of `n` vectors."""
+    if n < FLAT_MAX_VECTORS:
+        return "flat"
+    if n < HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivf-pq"
+
+
+def default_nlist(n: int) -> int:
+    """~4*sqrt(n) inverted lists, with at least ~39 training points per list."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39 or 1))
+
+
+def default_nprobe(nlist: int) -> int:
+    return max(1, min(nlist, max(8, nlist // 16)))
+
+
+def default_pq_m(dim: int) -> int:
+    """Largest sub-quantizer count <= 64 that divides `dim` (8-bit codes)."""
+    for m in range(min(64, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(vectors, index_type: str = "auto", compression: str | None = None, nlist: int | None = None,
+                pq_m: int | None = None, hnsw_m: int = DEFAULT_HNSW_M) -> tuple[faiss.Index, dict]:
+    """
+    Build a FAISS index of the requested type over `vectors` (an (n, d)
+    float32 array or memmap, added in chunks so a memmap is never fully read).
+
+    `compression` stores the vectors as "fp16" (2 bytes/dim), "sq8" (8-bit
+    scalar quantized, 1 byte/dim) or "pq" (`pq_m` bytes per vector) instead
+    of float32; "ivf-pq" always uses PQ codes.
+
+    Returns (index, params) where `params` records the type, compression and
+    build / default search parameters, to be stored in the store's metadata.
+    """
+    n, dim = vectors.shape
+    kind = choose_index_type(n) if index_type == "auto" else index_type
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    compression = None if compression in (None, "none") else compression
+    if compression not in (None, *COMPRESSIONS):
+        raise ValueError(f"Unknown compression {compression!r}; expected one of {COMPRESSIONS}")
+    if kind == "ivf-flat" and compression == "pq":
+        kind = "ivf-pq"
+    if kind == "ivf-pq":
+        if compression not in (None, "pq"):
+            raise ValueError(f"ivf-pq can't be combined with {compression} compression")
+        compression = "pq"
+    if compression == "pq":
+        pq_m = pq_m or default_pq_m(dim)
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} does not divide the dimension {dim}")
+        # 8-bit codebooks need ~10k training points; small stores get fewer bits.
+        pq_nbits = min(8, max(1, int(math.log2(max(n // 39, 2)))))
+    sq_type = _SQ_TYPES.get(compression)
+    params = {"index_type": kind, "compression": compression}
+    if compression == "pq":
+        params.update(pq_m=pq_m, pq_nbits=pq_nbits)
+
+    if kind == "flat":
+        if compression == "pq":
+            index = faiss.IndexPQ(dim, pq_m, pq_nbits)
+        elif sq_type is not None:
+            index = faiss.IndexScalarQuantizer(dim, sq_type, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexFlatL2(dim)
+    elif kind == "hnsw":
+        if compression == "pq":
+            index = faiss.IndexHNSWPQ(dim, pq_m, hnsw_m, pq_nbits)
+        elif sq_type is not None:
+            index = faiss.IndexHNSWSQ(dim, sq_type, hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = DEFAULT_EF_CONSTRUCTION
+        params.update(hnsw_m=hnsw_m, ef_search=DEFAULT_EF_SEARCH)
+    else:
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == "ivf-pq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+        elif sq_type is not None:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, sq_type, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        params.update(nlist=nlist, nprobe=default_nprobe(nlist))
+
+    if not index.is_trained:
+        # Train on a sample: faiss wants at least ~39 points per IVF centroid
+        # (and per PQ code); more barely changes the centroids but makes
+        # k-means much slower.
+        sample = min(n, max(params.get("nlist", 0) * 64, 256 * 64 if compression else 0))
+        rows = np.sort(np.random.default_rng(0).choice(n, size=sample, replace=False))
+        index.train(np.ascontiguousarray(vectors[rows], dtype=np.float32))
+
+    for start in range(0, n, ADD_CHUNK):
+        index.add(np.ascontiguousarray(vectors[start:start + ADD_CHUNK], dtype=np.float32))
+    set_search_params(index, nprobe=params.get("nprobe"), ef_search=params.get("ef_search"))
+    return index, params
+
+
+def set_search_params(index, nprobe: int | None = None, ef_search: int | None = None) -> None:
+    """Apply query-time knobs: `nprobe` for IVF indexes, `efSearch` for HNSW."""
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index).nprobe = int(nprobe)
+        except RuntimeError:
+            pass  # not an IVF index
+    if ef_search and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(ef_search)
+
+
+def filtered_search_params(index, selector) -> faiss.SearchParameters:
+    """
+    Search parameters restricting `index.search` to `selector`, with the
+    index's own `nprobe` / `efSearch` (the parameter object would otherwise
+    reset them to faiss defaults). Keep `selector` alive during the search.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = index.hnsw.efSearch
+    else:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+        except RuntimeError:
+            ivf = None  # not an IVF index
+        params = faiss.SearchParameters() if ivf is None else faiss.SearchParametersIVF()
+        if ivf is not None:
+            params.nprobe = ivf.nprobe
+    params.sel = selector
+    return params
+
+
+def is_exact(index) -> bool:
+    """True for an uncompressed flat index (the only kind updated in place)."""
+    return isinstance(index, faiss.IndexFlat)
+
+
+def index_type_of(index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf-pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf-flat"
+    return "flat"
+
+
+def flat_vectors(path: str):
+    """
+    Memory-map the vectors of an IndexFlatL2 file as an (ntotal, d) float32
+    array, or return None if `path` holds some other index type.
+    """
+    with open(path, "rb") as f:
+        if f.read(4) != b"IxF2":
+            return None
+        dim, ntotal, _, _, _, metric = _FLAT_HEADER.unpack(f.read(_FLAT_HEADER.size))
+    if metric != faiss.METRIC_L2:
+        return None
+    if ntotal == 0:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r", offset=_FLAT_DATA_OFFSET, shape=(ntotal, dim))
@@ -0,0 +1,284 @@
+# src/codewise/retriever/lexical.py
+import os
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+import numpy as np
+
+from codewise.retriever.code_tokens import STOPWORDS, code_tokens
+from codewise.retriever.docstore import DOCSTORE_FILE, SQLiteDocstore
+
+LEXICAL_FILE = "lexical.npz"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+# A query identifier that is a chunk's own (function / class) name adds this
+# many times the term's maximal BM25 contribution to that chunk.
+NAME_BOOST = 1.0
+
+# The lexical ranking alone answers a query (no embedding call) when its best
+# hit scores at least CONFIDENT_SCORE and either beats the runner-up by
+# CONFIDENT_MARGIN, or the query is a short lookup (at most
+# NAME_LOOKUP_TERMS terms) and the hit defines an identifier it names, e.g.
+# `send_file` or "url_for with external=True".
+CONFIDENT_SCORE = float(os.environ.get("LEXICAL_CONFIDENT_SCORE", "8.0"))
+CONFIDENT_MARGIN = float(os.environ.get("LEXICAL_CONFIDENT_MARGIN", "2.0"))
+NAME_LOOKUP_TERMS = 8
+
+
+class LexicalHit(NamedTuple):
+    doc_id: str
+    score: float
+    name_match: bool  # the document defines an identifier named in a short query
+
+
+def index_tokens(text: str) -> list[str]:
+    """Identifier-aware tokens (whole identifiers plus snake/camel parts, comment words) minus stopwords."""
+    return [t for t in code_tokens(text) if t not in STOPWORDS and len(t) > 1]
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over a store's documents, saved as `lexical.npz`
+    next to `index.faiss`.
+
+    Terms are kept sorted so lookups are a binary search; postings are CSR
+    arrays (document row, term frequency) and rows map to docstore ids. The
+    name each chunk defines is kept too, so `send_file` ranks the definition
+    of `send_file` above long functions that merely call it.
+    """
+
+    def __init__(self, terms, offsets, postings, tfs, doc_len, doc_ids, names):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.doc_ids = doc_ids
+        self.names = names
+        self.avg_len = float(doc_len.mean()) if len(doc_len) else 0.0
+        n = len(doc_ids)
+        df = np.diff(offsets)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._name_rows = defaultdict(list)
+        for row, name in enumerate(names):
+            if name:
+                self._name_rows[str(name)].append(row)
+
+    @classmethod
+    def build(cls, records) -> "LexicalIndex":
+        """Index an iterable of (doc_id, text, name); `name` is the defined function/class (or None)."""
+        postings = defaultdict(list)
+        doc_ids, doc_len, names = [], [], []
+        for row, (doc_id, text, name) in enumerate(records):
+            tokens = index_tokens(text)
+            for term, tf in Counter(tokens).items():
+                postings[term].append((row, tf))
+            doc_ids.append(doc_id)
+            doc_len.append(len(tokens))
+            names.append((name or "").rsplit(".", 1)[-1].lower())
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t]) for t in terms], out=offsets[1:])
+        flat = [p for t in terms for p in postings[t]]
+        pairs = np.array(flat, dtype=np.int64).reshape(-1, 2)
+        return cls(
+            np.array(terms, dtype=str),
+            offsets,
+            pairs[:, 0].astype(np.int32),
+            pairs[:, 1].astype(np.float32),
+            np.array(doc_len, dtype=np.float32),
+            np.array(doc_ids, dtype=str),
+            np.array(names, dtype=str),
+        )
+
+    def save(self, store_dir: str) -> None:
+        path = os.path.join(store_dir, LEXICAL_FILE)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, terms=self.terms, offsets=self.offsets, postings=self.postings, tfs=self.tfs,
+                     doc_len=self.doc_len, doc_ids=self.doc_ids, names=self.names)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, store_dir: str) -> "LexicalIndex | None":
+        path = os.path.join(store_dir, LEXICAL_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["terms"], data["offsets"], data["postings"], data["tfs"], data["doc_len"],
+                       data["doc_ids"], data["names"])
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query: str, k: int = 5, rows: tuple | None = None) -> list[LexicalHit]:
+        """
+        Top-`k` hits for `query` by BM25 score (plus the name bonus), best
+        first; only documents in the row ranges `rows` (see `partitions`) if given.
+        """
+        if not len(self.doc_ids):
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        named = set()
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / (self.avg_len or 1.0))
+        terms = set(index_tokens(query))
+        for term in terms:
+            i = int(np.searchsorted(self.terms, term))
+            if i == len(self.terms) or self.terms[i] != term:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            matched, tf = self.postings[start:end], self.tfs[start:end]
+            scores[matched] += self.idf[i] * tf * (BM25_K1 + 1) / (tf + norm[matched])
+            if term in self._name_rows:
+                scores[self._name_rows[term]] += NAME_BOOST * self.idf[i] * (BM25_K1 + 1)
+                named.update(self._name_rows[term])
+        if rows is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            for start, end in rows:
+                allowed[start:end] = True
+            scores[~allowed] = 0
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        lookup = len(terms) <= NAME_LOOKUP_TERMS
+        return [LexicalHit(str(self.doc_ids[r]), float(scores[r]), lookup and int(r) in named)
+                for r in top if scores[r] > 0]
+
+
+def build_lexical_index(store_dir: str) -> LexicalIndex | None:
+    """(Re)build `lexical.npz` from the store's SQLite docstore; no-op for legacy pickled stores."""
+    docstore_path = os.path.join(store_dir, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        return None
+    docstore = SQLiteDocstore(docstore_path, readonly=True)
+    try:
+        index = LexicalIndex.build(
+            (doc_id, text, meta.get("name")) for doc_id, text, meta in docstore.iter_rows()
+        )
+    finally:
+        docstore.close()
+    index.save(store_dir)
+    return index
+
+
+def is_confident(hits: list[LexicalHit]) -> bool:
+    """Whether the lexical ranking is decisive enough to skip the dense search."""
+    if not hits or hits[0].score < CONFIDENT_SCORE:
+        return False
+    return hits[0].name_match or len(hits) == 1 or hits[0].score >= CONFIDENT_MARGIN * hits[1].score
+
+
+def rrf_fuse(rankings: list[list[str]], k: int = RRF_K) -> list[str]:
+    """Reciprocal-rank fusion: ids ordered by sum(1 / (k + rank)) over the rankings."""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return sorted(fused, key=lambda d: -fused[d])
+
+
+def needs_dense(hits: list[LexicalHit] | None, k: int) -> bool:
+    """Whether a query with these BM25 hits (None: no lexical index) needs its embedding."""
+    return hits is None or not (len(hits) >= k and is_confident(hits))
+
+
+def lexical_hits_batch(lexical: LexicalIndex | None, queries: list[str], k: int = 5, rows_per_query=None):
+    """
+    BM25 hits (2k per query) for every query, or None per query without a
+    lexical index. `rows_per_query` restricts each query to its row ranges.
+    """
+    if lexical is None or not len(lexical):
+        return [None] * len(queries)
+    rows_per_query = rows_per_query or [None] * len(queries)
+    return [lexical.search(q, k=2 * k, rows=rows) for q, rows in zip(queries, rows_per_query)]
+
+
+def dense_search_batch(vectorstore, vectors, k: int = 5, rows: tuple | None = None) -> list[list]:
+    """
+    Top-`k` documents for each row of `vectors` with one `index.search` call;
+    the hits of all queries are fetched from the docstore together. `rows`
+    restricts the search to those FAISS row ranges (`partitions.search_rows`).
+    """
+    import faiss
+
+    from codewise.retriever.partitions import search_rows
+
+    if not len(vectors):
+        return []
+    queries = np.ascontiguousarray(vectors, dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        faiss.normalize_L2(queries)
+    _, labels = search_rows(vectorstore.index, queries, k, rows)
+    mapping = vectorstore.index_to_docstore_id
+    flat = sorted({int(r) for r in labels.ravel() if r >= 0})
+    ids = mapping.get_many(flat) if hasattr(mapping, "get_many") else [mapping.get(r) for r in flat]
+    by_row = dict(zip(flat, ids))
+    wanted = sorted({i for i in ids if i is not None})
+    docs = dict(zip(wanted, _fetch(vectorstore.docstore, wanted)))
+    return [[docs[by_row[int(r)]] for r in row if r >= 0 and docs.get(by_row.get(int(r)))] for row in labels]
+
+
+def hybrid_search_batch(vectorstore, hits_per_query, query_vectors: dict, k: int = 5,
+                        stats: Counter | None = None, rows_per_query=None) -> list[list]:
+    """
+    Top-`k` documents per query from BM25 and dense search fused with RRF.
+
+    `hits_per_query` comes from `lexical_hits_batch`. A query whose BM25
+    ranking is confident (see `is_confident`) and has `k` hits is answered
+    from it alone; a query without a lexical index (None) is a plain dense
+    search. `query_vectors` maps the index of every query that `needs_dense`
+    in this store to its embedding (the caller embeds them in one batch,
+    shared between stores). The dense side is a single matrix search over
+    those vectors, one per distinct set of row ranges when `rows_per_query`
+    restricts the queries. `stats` (a Counter) receives "lexical_only" /
+    "hybrid" / "dense_only" counts.
+    """
+    stats = stats if stats is not None else Counter()
+    rows_per_query = rows_per_query or [None] * len(hits_per_query)
+    groups = defaultdict(list)
+    for i, hits in enumerate(hits_per_query):
+        if needs_dense(hits, k):
+            groups[rows_per_query[i]].append(i)
+    dense = {}
+    for rows, queries in groups.items():
+        matrix = np.array([query_vectors[i] for i in queries], dtype=np.float32)
+        dense.update(zip(queries, dense_search_batch(vectorstore, matrix, 2 * k, rows)))
+
+    results = []
+    for i, hits in enumerate(hits_per_query):
+        if hits is None:
+            stats["dense_only"] += 1
+            results.append(dense[i][:k])
+        elif i not in dense:
+            stats["lexical_only"] += 1
+            results.append(_lexical_docs(vectorstore, hits, k))
+        else:
+            stats["hybrid"] += 1
+            results.append(_fuse(vectorstore, dense[i], hits, k))
+    return results
+
+
+def _lexical_docs(vectorstore, hits, k):
+    ids = [hit.doc_id for hit in hits[:k]]
+    return [d for d in _fetch(vectorstore.docstore, ids) if d is not None]
+
+
+def _fuse(vectorstore, dense, hits, k):
+    by_id = {_doc_key(d): d for d in dense}
+    ranked = rrf_fuse([[_doc_key(d) for d in dense], [hit.doc_id for hit in hits]])[:k]
+    missing = [i for i in ranked if i not in by_id]
+    by_id.update(zip(missing, _fetch(vectorstore.docstore, missing)))
+    return [by_id[i] for i in ranked if by_id.get(i) is not None]
+
+
+def _doc_key(doc):
+    return doc.id or doc.page_content
+
+
+def _fetch(docstore, ids):
+    if hasattr(docstore, "mget"):
+        return docstore.mget(ids)
+    docs = [docstore.search(i) for i in ids]
+    return [d if not isinstance(d, str) else None for d in docs]
@@ -0,0 +1,267 @@
+# src/codewise/retriever/neighbours.py
+"""
+Precomputed retrieval results for the chunks already in the code store.
+
+Most PRs modify functions that are already indexed. `build_neighbour_graph`
+runs every code chunk through the search a review runs (hybrid BM25 + dense,
+with the chunk's stored vector in place of an embedding call) and saves the
+top-k code and PR comment ids per chunk in `neighbours.npz` next to the code
+store. At review time `NeighbourGraph.lookup` finds the chunk with the
+changed node's name in its file; when the node's source is near-identical to
+it (line similarity >= MIN_SIMILARITY) its precomputed hits are reused, and
+only new or heavily modified nodes are embedded and searched. Both sides are
+compared as `ast.unparse` output, since the review pipeline's node source is
+unparsed (quotes, comments and line wrapping differ from the raw chunk). The
+review pipeline sends a changed method as its whole class, while the store
+holds one chunk per method: such a class node is matched through the one
+method it edits, when its other methods are unchanged.
+
+The file records the build ids of both stores and the settings it was
+computed with, and is ignored once either store is rebuilt.
+"""
+import ast
+import json
+import os
+import textwrap
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from codewise.retriever.docstore import DOCSTORE_FILE
+
+NEIGHBOURS_FILE = "neighbours.npz"
+NEIGHBOURS_K = int(os.environ.get("RETRIEVAL_NEIGHBOURS_K", "5"))
+# Share of matching (whitespace-stripped) lines between the changed node and
+# the indexed chunk; one edited line in a five-line function is 0.8.
+MIN_SIMILARITY = float(os.environ.get("RETRIEVAL_NEIGHBOUR_SIMILARITY", "0.8"))
+BATCH_SIZE = 1024
+
+
+def _normalize(path: str) -> str:
+    return path.replace(os.sep, "/").strip("/")
+
+
+def _lines(text: str) -> list[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def normalize_source(source: str) -> str:
+    """`source` as `ast.unparse` prints it (unchanged if it doesn't parse)."""
+    try:
+        return ast.unparse(ast.parse(textwrap.dedent(source)))
+    except (SyntaxError, ValueError):
+        return source
+
+
+def _methods(source: str, name: str) -> list[tuple[str, str]] | None:
+    """
+    (name, source lines) of each method when `source` is the class `name`,
+    else None. The class comes from `ast.unparse` already, so its lines are
+    sliced rather than unparsed again.
+    """
+    try:
+        source = textwrap.dedent(source)
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.ClassDef) or tree.body[0].name != name:
+        return None
+    lines = source.splitlines()
+    return [(node.name, "\n".join(lines[min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1:
+                                         node.end_lineno]))
+            for node in tree.body[0].body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+
+def similarity(a: str, b: str) -> float:
+    """Line-level similarity of two sources, ignoring indentation and blank lines."""
+    return SequenceMatcher(None, _lines(a), _lines(b), autojunk=False).ratio()
+
+
+def _same_file(indexed: str, file_path: str) -> bool:
+    # The code store records paths under the scanned root, PRs repository paths.
+    return indexed == file_path or indexed.endswith("/" + file_path) or file_path.endswith("/" + indexed)
+
+
+def stored_vectors(store_dir: str):
+    """The store's raw vectors, memory-mapped (None for legacy or compressed flat stores)."""
+    from codewise.retriever.index_factory import flat_vectors
+    from codewise.retriever.store import VECTORS_FILE
+
+    vectors = flat_vectors(os.path.join(store_dir, "index.faiss"))
+    if vectors is None and os.path.exists(os.path.join(store_dir, VECTORS_FILE)):
+        vectors = np.load(os.path.join(store_dir, VECTORS_FILE), mmap_mode="r")
+    return vectors
+
+
+class NeighbourGraph:
+    """
+    Per code chunk (row of the code store): its docstore id, name and file,
+    and the ids of its top-k code and comment hits ("" pads short rows).
+    """
+
+    def __init__(self, doc_ids, names, sources, code, comments, meta: dict):
+        self.doc_ids = doc_ids
+        self.names = names
+        self.sources = sources
+        self.code = code
+        self.comments = comments
+        self.meta = meta
+        self.k = int(meta.get("k", 0))
+        self._texts = {}  # row -> (normalized chunk source, parent), filled by `lookup`
+        self._by_name = defaultdict(list)
+        for row, name in enumerate(names):
+            if name:
+                self._by_name[str(name)].append(row)
+
+    def save(self, store_dir: str) -> None:
+        path = os.path.join(store_dir, NEIGHBOURS_FILE)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, doc_ids=self.doc_ids, names=self.names, sources=self.sources, code=self.code,
+                     comments=self.comments, meta=np.array(json.dumps(self.meta)))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, store_dir: str) -> "NeighbourGraph | None":
+        path = os.path.join(store_dir, NEIGHBOURS_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["doc_ids"], data["names"], data["sources"], data["code"], data["comments"],
+                       json.loads(str(data["meta"])))
+
+    def is_current(self, code_version: str, comments_version: str, hybrid: bool) -> bool:
+        """Whether the graph was computed from these store builds with the same search."""
+        return (self.meta.get("code_version"), self.meta.get("comments_version"), self.meta.get("hybrid")) == \
+            (code_version, comments_version, hybrid)
+
+    def candidates(self, name: str, file_path: str | None) -> list[int]:
+        """Rows of the chunks defining `name` (in `file_path`, matched by suffix)."""
+        rows = self._by_name.get(name, [])
+        if file_path is None:
+            return rows
+        file_path = _normalize(file_path)
+        return [r for r in rows if _same_file(str(self.sources[r]), file_path)]
+
+    def lookup(self, docstore, snippets: list[str], node_names: list, file_paths: list) -> dict[int, int]:
+        """
+        {snippet index: row} for the snippets whose node is indexed with
+        near-identical source (the most similar chunk of that name and file).
+        A class snippet maps to the row of the one method it edits, when all
+        its other methods match their chunks exactly. Chunk texts are fetched
+        from the code store's `docstore` in one call and kept normalized.
+        """
+        wanted = {}  # (snippet index, method name or None) -> candidate rows
+        methods = {}
+        for i, (name, path) in enumerate(zip(node_names, file_paths)):
+            if not name:
+                continue
+            methods[i] = _methods(snippets[i], name)
+            if methods[i] is None:
+                wanted[i, None] = self.candidates(name, path)
+            for method, _ in methods[i] or ():
+                wanted[i, method] = self.candidates(method, path)
+        rows = sorted({r for rs in wanted.values() for r in rs} - set(self._texts))
+        if rows:
+            docs = docstore.mget([str(self.doc_ids[r]) for r in rows])
+            self._texts.update((r, (normalize_source(d.page_content), d.metadata.get("parent")))
+                               for r, d in zip(rows, docs) if d is not None)
+        texts = {r: text for r, (text, _) in self._texts.items()}
+
+        found = {}
+        for i, class_methods in methods.items():
+            if class_methods is None:
+                snippet = normalize_source(snippets[i])
+                scored = [(similarity(snippet, texts[r]), r) for r in wanted[i, None] if r in texts]
+            else:
+                scored = []
+                for method, source in class_methods:
+                    own = [(similarity(source, texts[r]), r) for r in wanted[i, method]
+                           if r in texts and self._texts[r][1] == node_names[i]]
+                    scored.append(max(own) if own else (0.0, None))
+                scored = [s for s in scored if s[0] < 1.0]
+                if len(scored) != 1:  # no method edited, or several
+                    continue
+            if scored:
+                score, row = max(scored)
+                if score >= MIN_SIMILARITY:
+                    found[i] = row
+        return found
+
+    def results(self, code_store, comments_store, rows: list[int], k: int) -> list[tuple[list, list]]:
+        """(code matches, comment matches) of each row, at most `k` each, fetched in two docstore calls."""
+        from codewise.retriever.lexical import _fetch
+
+        out = []
+        for store, ids in ((code_store, self.code), (comments_store, self.comments)):
+            per_row = [[str(i) for i in ids[r][:k] if i] for r in rows]
+            wanted = sorted({i for row in per_row for i in row})
+            docs = dict(zip(wanted, _fetch(store.docstore, wanted)))
+            out.append([[docs[i] for i in row if docs.get(i) is not None] for row in per_row])
+        return list(zip(*out))
+
+
+def build_neighbour_graph(code_dir: str, comments_dir: str, embeddings, k: int = NEIGHBOURS_K,
+                          hybrid: bool = True) -> NeighbourGraph | None:
+    """
+    (Re)write `<code_dir>/neighbours.npz`: for every code chunk the hits that
+    `retriever_client` would retrieve for its text with `top_k=k`. Dense
+    queries use the stored vectors, so nothing is embedded; `embeddings` only
+    has to match the stores' backend. Returns None (and writes nothing) when
+    either store is missing or the code store has no SQLite docstore or raw
+    vectors to read.
+    """
+    from codewise.retriever.lexical import LexicalIndex, hybrid_search_batch, lexical_hits_batch, needs_dense
+    from codewise.retriever.store import has_store, load_store
+    from codewise.retriever.store_meta import store_version
+
+    if not (has_store(code_dir) and has_store(comments_dir)) or \
+            not os.path.exists(os.path.join(code_dir, DOCSTORE_FILE)):
+        return None
+    vectors = stored_vectors(code_dir)
+    if vectors is None:
+        return None
+    code_store = load_store(code_dir, embeddings)
+    comments_store = load_store(comments_dir, embeddings)
+    code_lexical = LexicalIndex.load(code_dir) if hybrid else None
+    comments_lexical = LexicalIndex.load(comments_dir) if hybrid else None
+
+    doc_ids, names, sources, code, comments = [], [], [], [], []
+    rows = code_store.docstore.iter_rows()
+    while True:
+        batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+        if not batch:
+            break
+        start = len(doc_ids)
+        texts = [text for _, text, _ in batch]
+        code_hits = lexical_hits_batch(code_lexical, texts, k)
+        comment_hits = lexical_hits_batch(comments_lexical, texts, k)
+        query_vectors = {i: vectors[start + i] for i in range(len(batch))
+                         if needs_dense(code_hits[i], k) or needs_dense(comment_hits[i], k)}
+        for matches, store, hits in ((code, code_store, code_hits), (comments, comments_store, comment_hits)):
+            found = hybrid_search_batch(store, hits, query_vectors, k)
+            matches.extend([d.id for d in docs] + [""] * (k - len(docs)) for docs in found)
+        for doc_id, _, meta in batch:
+            doc_ids.append(doc_id)
+            names.append(meta.get("name") or "")
+            sources.append(_normalize(meta.get("source") or ""))
+
+    meta = {"k": k, "hybrid": hybrid, "code_version": store_version(code_dir),
+            "comments_version": store_version(comments_dir)}
+    graph = NeighbourGraph(np.array(doc_ids, dtype=str), np.array(names, dtype=str), np.array(sources, dtype=str),
+                           np.array(code, dtype=str).reshape(-1, k), np.array(comments, dtype=str).reshape(-1, k),
+                           meta)
+    graph.save(code_dir)
+    return graph
+
+
+def refresh_neighbour_graph(code_dir: str, comments_dir: str, embeddings, k: int = NEIGHBOURS_K,
+                            hybrid: bool = True) -> NeighbourGraph | None:
+    """`build_neighbour_graph` unless the saved graph is still current for both stores."""
+    from codewise.retriever.store_meta import store_version
+
+    graph = NeighbourGraph.load(code_dir)
+    if graph is not None and graph.k == k and \
+            graph.is_current(store_version(code_dir), store_version(comments_dir), hybrid):
+        return graph
+    return build_neighbour_graph(code_dir, comments_dir, embeddings, k, hybrid)
@@ -0,0 +1,221 @@
+# src/codewise/retriever/partitions.py
+"""
+Metadata partitions of a store: retrieval restricted to the chunks under a
+directory (code `source`, comment `file`) or to one comment `type`.
+
+`save_store` orders a store's rows by (type, source, file), so every comment
+type, file and directory is one contiguous run of FAISS rows (code stores
+built from a sorted scan already are). `partitions.json` records the row
+ranges of every value. A filtered search is then `index.search` with an
+`IDSelectorRange` per range, which a flat index answers by scanning only
+those rows: it costs what a search over a separate partition index would.
+Approximate indexes get the same rows as a selector (an `IDSelectorBatch`
+when the filter spans many ranges).
+"""
+import json
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from codewise.retriever.docstore import DOCSTORE_FILE, SQLiteDocstore
+
+PARTITIONS_FILE = "partitions.json"
+# Row order of a saved store; the path fields are also matched by directory.
+PARTITION_FIELDS = ("type", "source", "file")
+PATH_FIELDS = ("source", "file")
+# Above this many ranges one selector over all rows beats a search per range.
+MAX_RANGE_SEARCHES = 8
+
+
+class RetrievalFilter(NamedTuple):
+    """
+    Restrict retrieval to chunks/comments whose path lies under `path_prefix`
+    (a repository-relative directory such as "src/flask/json") and to
+    comments of `comment_type` ("review_comment", "issue_comment", ...).
+    A store without the field is searched unrestricted.
+    """
+    path_prefix: str | None = None
+    comment_type: str | None = None
+
+
+def _normalize(path: str) -> str:
+    return path.replace(os.sep, "/").strip("/")
+
+
+def in_directory(path: str, directory: str) -> bool:
+    """
+    Whether `path` lies under `directory`, matched on whole path components
+    anywhere in `path`: the code store records paths under the scanned repo
+    root ("data/flask/src/flask/json/tag.py"), PRs and comments repository
+    paths ("src/flask/json/tag.py").
+    """
+    return f"/{_normalize(directory)}/" in f"/{_normalize(path)}"
+
+
+def partition_key(metadata: dict) -> tuple:
+    return tuple(_normalize(str(metadata.get(field) or "")) for field in PARTITION_FIELDS)
+
+
+def _merge(ranges) -> list[tuple[int, int]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _intersect(a, b) -> list[tuple[int, int]]:
+    out, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if start < end:
+            out.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+class PartitionTable:
+    """{field: {value: [(start, end), ...]}} row ranges of a store."""
+
+    def __init__(self, fields: dict[str, dict[str, list]]):
+        self.fields = {field: {value: [tuple(r) for r in ranges] for value, ranges in values.items()}
+                       for field, values in fields.items()}
+
+    @classmethod
+    def build(cls, metadatas) -> "PartitionTable":
+        """From the documents' metadata in row order."""
+        fields = {}
+        for row, metadata in enumerate(metadatas):
+            for field in PARTITION_FIELDS:
+                value = metadata.get(field)
+                if not value:
+                    continue
+                ranges = fields.setdefault(field, {}).setdefault(_normalize(str(value)), [])
+                if ranges and ranges[-1][1] == row:
+                    ranges[-1][1] = row + 1
+                else:
+                    ranges.append([row, row + 1])
+        return cls(fields)
+
+    def save(self, store_dir: str) -> None:
+        path = os.path.join(store_dir, PARTITIONS_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.fields, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, store_dir: str) -> "PartitionTable | None":
+        path = os.path.join(store_dir, PARTITIONS_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def rows(self, retrieval_filter: RetrievalFilter | None) -> tuple | None:
+        """
+        The sorted, disjoint row ranges matching `retrieval_filter`: () when
+        nothing matches, None when the filter doesn't restrict this store.
+        """
+        if retrieval_filter is None:
+            return None
+        constraints = []
+        if retrieval_filter.path_prefix:
+            for field in PATH_FIELDS:
+                if field in self.fields:
+                    constraints.append(_merge(r for value, ranges in self.fields[field].items()
+                                              if in_directory(value, retrieval_filter.path_prefix) for r in ranges))
+        if retrieval_filter.comment_type and "type" in self.fields:
+            constraints.append(self.fields["type"].get(retrieval_filter.comment_type, []))
+        if not constraints:
+            return None
+        rows = constraints[0]
+        for other in constraints[1:]:
+            rows = _intersect(rows, other)
+        return tuple(rows)
+
+
+def build_partitions(store_dir: str) -> PartitionTable | None:
+    """(Re)write `partitions.json` from the store's SQLite docstore; no-op for legacy pickled stores."""
+    docstore_path = os.path.join(store_dir, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        return None
+    docstore = SQLiteDocstore(docstore_path, readonly=True)
+    try:
+        table = PartitionTable.build(meta for _, _, meta in docstore.iter_rows())
+    finally:
+        docstore.close()
+    table.save(store_dir)
+    return table
+
+
+def cluster_rows(vectorstore) -> bool:
+    """
+    Reorder the rows of a vectorstore with an in-memory flat index by
+    `partition_key` (stable, so chunks keep their order within a file).
+    Returns whether anything moved.
+    """
+    import faiss
+
+    index = vectorstore.index
+    if not isinstance(index, faiss.IndexFlat) or index.ntotal < 2:
+        return False
+    mapping = vectorstore.index_to_docstore_id
+    ids = [mapping[row] for row in range(index.ntotal)]
+    docstore = vectorstore.docstore
+    docs = docstore.mget(ids) if hasattr(docstore, "mget") else [docstore.search(i) for i in ids]
+    keys = [partition_key(getattr(doc, "metadata", None) or {}) for doc in docs]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    if order == list(range(len(keys))):
+        return False
+    clustered = faiss.IndexFlat(index.d, index.metric_type)
+    clustered.add(index.reconstruct_n(0, index.ntotal)[order])
+    vectorstore.index = clustered
+    vectorstore.index_to_docstore_id = {row: ids[old] for row, old in enumerate(order)}
+    return True
+
+
+def search_rows(index, queries: np.ndarray, k: int, rows: tuple | None):
+    """`index.search(queries, k)` over the row ranges `rows` only (None: every row)."""
+    import faiss
+
+    from codewise.retriever.index_factory import filtered_search_params
+
+    if rows is None:
+        return index.search(queries, k)
+    if not rows:
+        return np.full((len(queries), k), np.inf, dtype=np.float32), np.full((len(queries), k), -1, dtype=np.int64)
+    if isinstance(index, faiss.IndexFlat) and len(rows) <= MAX_RANGE_SEARCHES:
+        # A flat index scans just [start, end) for an IDSelectorRange.
+        parts = [index.search(queries, k, params=faiss.SearchParameters(sel=faiss.IDSelectorRange(start, end)))
+                 for start, end in rows]
+        if len(parts) == 1:
+            return parts[0]
+        distances = np.hstack([d for d, _ in parts])
+        labels = np.hstack([i for _, i in parts])
+        ranking = distances if index.metric_type == faiss.METRIC_L2 else -distances
+        best = np.argsort(ranking, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, best, axis=1), np.take_along_axis(labels, best, axis=1)
+    ids = np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in rows])
+    selector = faiss.IDSelectorRange(*rows[0]) if len(rows) == 1 else faiss.IDSelectorBatch(ids)
+    try:
+        return index.search(queries, k, params=filtered_search_params(index, selector))
+    except RuntimeError:
+        # No selector support (e.g. IndexPQ): exact search over the decoded rows.
+        return _search_decoded(index, queries, k, ids)
+
+
+def _search_decoded(index, queries, k, ids):
+    import faiss
+
+    distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+    labels = np.full((len(queries), k), -1, dtype=np.int64)
+    found, positions = faiss.knn(queries, index.reconstruct_batch(ids), min(k, len(ids)))
+    distances[:, :found.shape[1]] = found
+    labels[:, :found.shape[1]] = ids[positions]
+    return distances, labels
@@ -0,0 +1,120 @@
+# src/codewise/retriever/retrieval_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+DEFAULT_CACHE_PATH = "vectorstores/retrieval_cache.sqlite"
+DEFAULT_MAX_ENTRIES = int(os.environ.get("RETRIEVAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+def _to_json(docs: list[Document]) -> list:
+    return [[d.id, d.page_content, d.metadata] for d in docs]
+
+
+def _from_json(rows: list) -> list[Document]:
+    return [Document(id=doc_id, page_content=text, metadata=meta) for doc_id, text, meta in rows]
+
+
+class RetrievalCache:
+    """
+    On-disk cache of retrieval results (code matches, comment matches) per
+    snippet, shared by every process that retrieves from the same stores.
+
+    Entries are keyed by (sha256(snippet), top_k, search settings) and
+    tagged with `version`, the build ids of the stores they were retrieved from,
+    so a rebuilt store is never answered from stale results. Entries of other
+    versions are left alone (another process may still serve the old stores)
+    and evicted lazily: past `max_entries` they go first, then the least
+    recently used entries of this version.
+
+    An entry may also keep the snippet's query vector (float32), so results
+    served from the cache are packed exactly like fresh ones.
+    """
+
+    def __init__(self, version: str, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.version = version
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, version TEXT, value TEXT, last_used INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+        if "vector" not in columns:  # caches written before query vectors were kept
+            self._conn.execute("ALTER TABLE results ADD COLUMN vector BLOB")
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(last_used) FROM results").fetchone()
+        self._clock = row[0] or 0
+
+    def key(self, snippet: str, top_k: int, settings: str = "") -> str:
+        digest = hashlib.sha256(snippet.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{digest}\n{top_k}\n{settings}\n{self.version}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str], vectors: dict | None = None) -> dict:
+        """
+        {key: (code matches, comment matches)} for the cached keys. Their
+        stored query vectors are added to `vectors` ({key: vector}).
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, value, vector in self._conn.execute(
+                    f"SELECT key, value, vector FROM results WHERE key IN ({marks})", chunk
+                ):
+                    code, comments = json.loads(value)
+                    found[key] = (_from_json(code), _from_json(comments))
+                    if vector is not None and vectors is not None:
+                        vectors[key] = np.frombuffer(vector, dtype=np.float32)
+            if found:
+                self._clock += 1
+                self._conn.executemany("UPDATE results SET last_used = ? WHERE key = ?",
+                                       [(self._clock, key) for key in found])
+                self._conn.commit()
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: dict, vectors: dict | None = None) -> None:
+        """Store {key: (code matches, comment matches)}, with the query vectors in `vectors` ({key: vector})."""
+        if not items:
+            return
+        vectors = vectors or {}
+        with self._lock:
+            self._clock += 1
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, version, value, last_used, vector) VALUES (?, ?, ?, ?, ?)",
+                [(key, self.version, json.dumps([_to_json(code), _to_json(comments)], default=str), self._clock,
+                  np.asarray(vectors[key], dtype=np.float32).tobytes() if key in vectors else None)
+                 for key, (code, comments) in items.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY version = ?, last_used LIMIT ?)", (self.version, excess)
+            )
+
+    def __len__(self):
+        """Entries of this version."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results WHERE version = ?",
+                                      (self.version,)).fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
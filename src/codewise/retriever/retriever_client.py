@@ -1,6 +1,16 @@
+import logging
 import os
+import posixpath
+from collections import Counter
 from typing import Optional
 
+# Retrieval knobs from the environment (see retriever/settings.py); they are
+# module globals here, so callers and tests can override them per process.
+from codewise.retriever.settings import (
+    COMMENT_TYPE, CONTEXT_PACKING, EF_SEARCH, HYBRID, NEIGHBOUR_GRAPH, NPROBE, RETRIEVAL_CACHE,
+    RETRIEVAL_CACHE_PATH, SCOPE, USE_DAEMON,
+)
+
 # We import FAISS and embeddings lazily because FAISS is an optional
 # dependency that may not be available (especially on macOS/arm64).
 # Loading the vectorstores at import time caused import-time failures
@@ -13,7 +23,39 @@ COMMENTS_STORE_PATH = "vectorstores/pr_comments_store"
 # Globals populated on-demand
 code_store = None
 comments_store = None
+code_lexical = None
+comments_lexical = None
+code_partitions = None
+comments_partitions = None
+neighbour_graph = None
+symbol_graph = None
 embeddings = None
+retrieval_cache = None
+
+# How each query was answered: "precomputed" (neighbour graph lookup), then per store
+# "lexical_only" (no dense search), "hybrid", "dense_only". "queries" counts the snippets
+# searched, "embeddings_skipped" those never embedded and "code_dense_skipped" /
+# "comments_dense_skipped" the dense searches a store skipped on confident BM25 hits.
+search_stats = Counter()
+# Tokens retrieved vs packed into contexts, and why hits were dropped (ContextPacker.stats)
+pack_stats = Counter()
+
+
+def set_search_params(nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Set IVF `nprobe` / HNSW `efSearch` on the loaded stores (and for later loads)."""
+    global NPROBE, EF_SEARCH
+    NPROBE = nprobe or NPROBE
+    EF_SEARCH = ef_search or EF_SEARCH
+    _apply_search_params()
+
+
+def _apply_search_params() -> None:
+    if not (NPROBE or EF_SEARCH):
+        return
+    from codewise.retriever.index_factory import set_search_params as apply
+    for store in (code_store, comments_store):
+        if store is not None:
+            apply(store.index, nprobe=NPROBE, ef_search=EF_SEARCH)
 
 
 def _ensure_stores_loaded() -> None:
@@ -22,7 +64,8 @@ def _ensure_stores_loaded() -> None:
     If FAISS or the vectorstores can't be loaded, leave stores as None
     so callers can handle the missing retriever gracefully.
     """
-    global code_store, comments_store, embeddings
+    global code_store, comments_store, code_lexical, comments_lexical, embeddings, retrieval_cache
+    global code_partitions, comments_partitions, neighbour_graph
     if code_store is not None and comments_store is not None:
         return
 
@@ -31,24 +74,35 @@ def _ensure_stores_loaded() -> None:
         return
 
     try:
-        from langchain_community.vectorstores import FAISS
-        from langchain_openai import OpenAIEmbeddings
+        from codewise.retriever.embeddings import EmbeddingsMismatchError, get_embeddings
+        from codewise.retriever.lexical import LexicalIndex
+        from codewise.retriever.partitions import PartitionTable
+        from codewise.retriever.store import load_store
     except Exception:
         # faiss (or related libs) not available — leave stores as None
         return
 
     try:
-        embeddings = OpenAIEmbeddings()
-        code_store = FAISS.load_local(
-            CODE_STORE_PATH,
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True,
-        )
-        comments_store = FAISS.load_local(
-            COMMENTS_STORE_PATH,
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True,
-        )
+        # EMBEDDINGS_BACKEND selects the backend; it must match the one
+        # that built the stores or load_store refuses them. The indexes are
+        # memory-mapped (RETRIEVER_MMAP), so concurrent workers share one copy.
+        embeddings = get_embeddings()
+        code_store = load_store(CODE_STORE_PATH, embeddings)
+        comments_store = load_store(COMMENTS_STORE_PATH, embeddings)
+        _apply_search_params()
+        code_partitions = PartitionTable.load(CODE_STORE_PATH)
+        comments_partitions = PartitionTable.load(COMMENTS_STORE_PATH)
+        if HYBRID:
+            code_lexical = LexicalIndex.load(CODE_STORE_PATH)
+            comments_lexical = LexicalIndex.load(COMMENTS_STORE_PATH)
+        if RETRIEVAL_CACHE:
+            retrieval_cache = _open_cache()
+        if NEIGHBOUR_GRAPH:
+            neighbour_graph = _load_neighbours()
+    except EmbeddingsMismatchError as e:
+        logging.getLogger(__name__).warning("Retriever disabled: %s", e)
+        code_store = None
+        comments_store = None
     except Exception:
         # Loading vectorstores failed (corrupt files, incompatible FAISS),
         # keep stores as None and allow the application to continue.
@@ -56,20 +110,302 @@ def _ensure_stores_loaded() -> None:
         comments_store = None
 
 
-def get_retrieval_context(code_snippet: str, top_k: int = 5) -> str:
+def unload() -> None:
+    """Forget every loaded store, index and graph; the next retrieval loads them from the current paths."""
+    global code_store, comments_store, code_lexical, comments_lexical, embeddings, retrieval_cache
+    global code_partitions, comments_partitions, neighbour_graph, symbol_graph
+    code_store = comments_store = code_lexical = comments_lexical = embeddings = retrieval_cache = None
+    code_partitions = comments_partitions = neighbour_graph = symbol_graph = None
+
+
+def _open_cache():
+    """The retrieval cache for the loaded stores' build ids (None if it can't be opened)."""
+    from codewise.retriever.retrieval_cache import RetrievalCache
+    from codewise.retriever.store_meta import store_version
+
+    version = f"{store_version(CODE_STORE_PATH)}|{store_version(COMMENTS_STORE_PATH)}"
+    try:
+        return RetrievalCache(version, RETRIEVAL_CACHE_PATH)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Retrieval cache disabled: %s", e)
+        return None
+
+
+def _load_neighbours():
+    """The code store's neighbour graph if it was computed from the loaded stores, else None."""
+    from codewise.retriever.neighbours import NeighbourGraph
+    from codewise.retriever.store_meta import store_version
+
+    try:
+        graph = NeighbourGraph.load(CODE_STORE_PATH)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Neighbour graph ignored: %s", e)
+        return None
+    if graph is None or not graph.is_current(store_version(CODE_STORE_PATH), store_version(COMMENTS_STORE_PATH),
+                                             HYBRID):
+        return None
+    return graph
+
+
+def _retrieve(code_snippets: list[str], top_k: int, node_names: list, file_paths: list, filters: list,
+              search, query_vectors: dict) -> list[tuple]:
+    """
+    (code matches, comment matches) per snippet: precomputed ones for
+    unfiltered snippets whose node is indexed with near-identical source,
+    `_cached(..., search, ...)` for the rest. The indexed chunk's stored
+    vector stands in as the query vector ({snippet: vector}) of a precomputed
+    snippet.
+    """
+    from codewise.retriever.store import row_vectors
+
+    graph = neighbour_graph
+    found = {}
+    if graph is not None and top_k <= graph.k:
+        names = [name if f is None else None for name, f in zip(node_names, filters)]
+        rows = graph.lookup(code_store.docstore, code_snippets, names, file_paths)
+        found = dict(zip(rows, graph.results(code_store, comments_store, list(rows.values()), top_k)))
+        search_stats["precomputed"] += len(found)
+        vectors = row_vectors(code_store, CODE_STORE_PATH, list(rows.values()))
+        if vectors is not None:
+            query_vectors.update((code_snippets[i], v) for i, v in zip(rows, vectors))
+    rest = [i for i in range(len(code_snippets)) if i not in found]
+    if rest:
+        found.update(zip(rest, _cached([code_snippets[i] for i in rest], top_k, search, [filters[i] for i in rest],
+                                       query_vectors)))
+    return [found[i] for i in range(len(code_snippets))]
+
+
+def _cached(code_snippets: list[str], top_k: int, search, filters: list, query_vectors: dict) -> list[tuple]:
+    """
+    (code matches, comment matches) per snippet: from the retrieval cache
+    where possible, `search(snippets, filters)` for the rest (each distinct
+    snippet and filter once). The snippets' query vectors ({snippet: vector})
+    are cached with the results and restored into `query_vectors`.
+    """
+    cache = retrieval_cache
+    if cache is None:
+        return search(code_snippets, filters)
+    settings = f"hybrid={HYBRID};nprobe={NPROBE};ef_search={EF_SEARCH}"
+    keys = [cache.key(s, top_k, settings if f is None else f"{settings};filter={tuple(f)}")
+            for s, f in zip(code_snippets, filters)]
+    cached_vectors = {}
+    found = cache.get_many(keys, cached_vectors)
+    query_vectors.update((s, cached_vectors[k]) for k, s in zip(keys, code_snippets) if k in cached_vectors)
+    missing = {k: (s, f) for k, s, f in zip(keys, code_snippets, filters) if k not in found}
+    if missing:
+        snippets, missing_filters = zip(*missing.values())
+        fresh = dict(zip(missing, search(list(snippets), list(missing_filters))))
+        cache.put_many(fresh, {k: query_vectors[s] for k, (s, _) in missing.items() if s in query_vectors})
+        found.update(fresh)
+    return [found[k] for k in keys]
+
+
+def _filters(count: int, file_paths, path_prefixes, comment_type) -> list:
+    """
+    The `RetrievalFilter` (or None) per snippet: its `path_prefixes` entry,
+    else the file's directory with RETRIEVAL_SCOPE=directory.
+    """
+    from codewise.retriever.partitions import RetrievalFilter
+
+    file_paths = file_paths or [None] * count
+    path_prefixes = path_prefixes or [None] * count
+    comment_type = comment_type or COMMENT_TYPE
+    filters = []
+    for file_path, prefix in zip(file_paths, path_prefixes):
+        if prefix is None and SCOPE == "directory" and file_path:
+            prefix = posixpath.dirname(file_path.replace(os.sep, "/"))
+        filters.append(RetrievalFilter(prefix or None, comment_type) if prefix or comment_type else None)
+    return filters
+
+
+def _daemon_contexts(code_snippets, top_k, node_names, file_paths, filters, documents: bool = False):
+    """
+    Contexts (with `documents`, the matches) from the retrieval daemon, or
+    None when none is running (or it fails).
+    """
+    if not USE_DAEMON or os.environ.get("DISABLE_RETRIEVER", "0") in ("1", "true", "True"):
+        return None
+    from codewise.retriever.daemon import daemon_url, request_contexts, request_matches
+
+    url = daemon_url(CODE_STORE_PATH, COMMENTS_STORE_PATH)
+    if url is None:
+        return None
+    try:
+        request = request_matches if documents else request_contexts
+        return request(url, code_snippets, top_k, node_names, file_paths, stats=pack_stats,
+                       path_prefixes=[f.path_prefix if f else None for f in filters],
+                       comment_type=next((f.comment_type for f in filters if f), None))
+    except Exception as e:
+        logging.getLogger(__name__).warning("Retrieval daemon at %s failed (%s); retrieving in-process", url, e)
+        return None
+
+
+def _ensure_graph_loaded():
+    """The code store's symbol / call graph (`symbols.json`), or None if it wasn't built."""
+    global symbol_graph
+    if symbol_graph is None:
+        from codewise.indexing.symbol_graph import SymbolGraph
+        try:
+            symbol_graph = SymbolGraph.load(CODE_STORE_PATH)
+        except Exception:
+            symbol_graph = None
+    return symbol_graph
+
+
+def get_graph_context(node_name: str, file_path: Optional[str] = None) -> str:
+    """
+    Callers and callees of the function/class `node_name` (as flagged by
+    `analyze_file_changes`, optionally in `file_path`), one signature line each.
+    Pure lookups in the precomputed graph; "" when there is no graph or no match.
+    """
+    graph = _ensure_graph_loaded()
+    if graph is None:
+        return ""
+    return graph.context_for(node_name, file_path)
+
+
+def get_retrieval_context(code_snippet: str, top_k: int = 5, node_name: Optional[str] = None,
+                          file_path: Optional[str] = None, path_prefix: Optional[str] = None,
+                          comment_type: Optional[str] = None) -> str:
     """
     Returns combined code + PR comment retrieval context
     as a single formatted string suitable for LLM prompts.
+
+    With `node_name` (and `file_path`) the changed node's callers and callees
+    from the symbol graph are appended. `path_prefix` (a repository
+    directory) and `comment_type` restrict the search to those partitions of
+    the stores; see RETRIEVAL_SCOPE / RETRIEVAL_COMMENT_TYPE for defaults.
     """
+    filters = _filters(1, [file_path], [path_prefix], comment_type)
+    contexts = _daemon_contexts([code_snippet], top_k, [node_name], [file_path], filters)
+    if contexts is not None:
+        return contexts[0]
+
+    graph_context = get_graph_context(node_name, file_path) if node_name else ""
+
+    # If the stores are unavailable, return only the graph context.
+    matches = _local_matches([code_snippet], top_k, [node_name], [file_path], filters)
+    if matches is None:
+        return graph_context
+    code_matches, comment_matches = matches[0]
+    return _format_context(code_matches, comment_matches, graph_context)
+
+
+def get_retrieval_contexts(code_snippets: list[str], top_k: int = 5, node_names: Optional[list] = None,
+                           file_paths: Optional[list] = None, path_prefixes: Optional[list] = None,
+                           comment_type: Optional[str] = None) -> list[str]:
+    """
+    `get_retrieval_context` for every affected node of a PR at once.
+
+    The snippets that need a dense search are embedded in one
+    `embed_documents` call (shared by both stores) and each store is searched
+    with one matrix `index.search`, instead of an embedding request and two
+    searches per node; snippets in the retrieval cache, and nodes indexed
+    with near-identical source (see retriever/neighbours.py), skip both.
+    Returns one context string per snippet, in order. `path_prefixes` and `comment_type`
+    filter as in `get_retrieval_context`.
+    """
+    filters = _filters(len(code_snippets), file_paths, path_prefixes, comment_type)
+    contexts = _daemon_contexts(code_snippets, top_k, node_names, file_paths, filters) if code_snippets else None
+    if contexts is not None:
+        return contexts
+
+    node_names = node_names or [None] * len(code_snippets)
+    file_paths = file_paths or [None] * len(code_snippets)
+    graph_contexts = [get_graph_context(name, path) if name else "" for name, path in zip(node_names, file_paths)]
+
+    matches = _local_matches(code_snippets, top_k, node_names, file_paths, filters) if code_snippets else None
+    if matches is None:
+        return graph_contexts
+    return [_format_context(code, comments, graph) for (code, comments), graph in zip(matches, graph_contexts)]
 
-    # Ensure stores are loaded; if unavailable, return an empty context.
+
+def get_retrieval_matches(code_snippets: list[str], top_k: int = 5, node_names: Optional[list] = None,
+                          file_paths: Optional[list] = None, path_prefixes: Optional[list] = None,
+                          comment_type: Optional[str] = None) -> list[tuple[list, list]]:
+    """
+    (code matches, comment matches) per snippet, as LangChain Documents: the
+    hits `get_retrieval_contexts` formats, retrieved the same way (daemon,
+    neighbour graph, cache, hybrid search, partitions, packing). Empty lists
+    when the retriever is unavailable.
+    """
+    if not code_snippets:
+        return []
+    filters = _filters(len(code_snippets), file_paths, path_prefixes, comment_type)
+    matches = _daemon_contexts(code_snippets, top_k, node_names, file_paths, filters, documents=True)
+    if matches is not None:
+        return matches
+    matches = _local_matches(code_snippets, top_k, node_names or [None] * len(code_snippets),
+                             file_paths or [None] * len(code_snippets), filters)
+    return matches if matches is not None else [([], []) for _ in code_snippets]
+
+
+def _local_matches(code_snippets: list[str], top_k: int, node_names: list, file_paths: list,
+                   filters: list) -> Optional[list[tuple]]:
+    """Packed (code matches, comment matches) per snippet, retrieved in-process; None without stores."""
     _ensure_stores_loaded()
     if code_store is None or comments_store is None:
-        return ""
+        return None
+    query_vectors = {}
+    matches = _retrieve(code_snippets, top_k, node_names, file_paths, filters,
+                        lambda snippets, fs: _search_batch(snippets, top_k, fs, query_vectors), query_vectors)
+    return _pack(code_snippets, matches, query_vectors)
+
+
+def _search_batch(code_snippets: list[str], top_k: int, filters: list,
+                  query_vectors: dict | None = None) -> list[tuple]:
+    """
+    (code matches, comment matches) per snippet. Each store runs its dense
+    search only for the snippets whose BM25 hits in that store are weak; a
+    snippet is embedded when either store needs it. The embeddings are added
+    to `query_vectors` ({snippet: vector}) for the context packer.
+    """
+    from codewise.retriever.lexical import hybrid_search_batch, lexical_hits_batch, needs_dense
+
+    # FAISS row ranges per snippet (None: unrestricted, also for stores without partitions.json)
+    code_rows = [code_partitions.rows(f) if code_partitions else None for f in filters]
+    comment_rows = [comments_partitions.rows(f) if comments_partitions else None for f in filters]
+    code_hits = lexical_hits_batch(code_lexical, code_snippets, top_k, code_rows)
+    comment_hits = lexical_hits_batch(comments_lexical, code_snippets, top_k, comment_rows)
+    code_dense = {i for i, hits in enumerate(code_hits) if needs_dense(hits, top_k)}
+    comment_dense = {i for i, hits in enumerate(comment_hits) if needs_dense(hits, top_k)}
+    dense = sorted(code_dense | comment_dense)
+    vectors = dict(zip(dense, embeddings.embed_documents([code_snippets[i] for i in dense]))) if dense else {}
+    if query_vectors is not None:
+        query_vectors.update((code_snippets[i], v) for i, v in vectors.items())
+    search_stats["queries"] += len(code_snippets)
+    search_stats["embeddings_skipped"] += len(code_snippets) - len(dense)
+    search_stats["code_dense_skipped"] += len(code_snippets) - len(code_dense)
+    search_stats["comments_dense_skipped"] += len(code_snippets) - len(comment_dense)
+
+    code_matches = hybrid_search_batch(code_store, code_hits, {i: vectors[i] for i in code_dense}, top_k,
+                                       search_stats, code_rows)
+    comment_matches = hybrid_search_batch(comments_store, comment_hits, {i: vectors[i] for i in comment_dense},
+                                          top_k, search_stats, comment_rows)
+    return list(zip(code_matches, comment_matches))
 
-    code_matches = code_store.similarity_search(code_snippet, k=top_k)
-    comment_matches = comments_store.similarity_search(code_snippet, k=top_k)
 
+def _pack(code_snippets: list[str], matches: list[tuple], query_vectors: dict) -> list[tuple]:
+    """
+    Score cut-off, MMR and token budget per snippet (the cache keeps the
+    unpacked hits), with the hits' vectors read back from the stores.
+    """
+    if not CONTEXT_PACKING:
+        return matches
+    from codewise.retriever.context_packer import ContextPacker
+    from codewise.retriever.store import stored_vectors_by_id
+
+    hit_vectors = {}
+    for kind, store, store_dir in ((0, code_store, CODE_STORE_PATH), (1, comments_store, COMMENTS_STORE_PATH)):
+        ids = sorted({d.id for m in matches for d in m[kind] if d.id})
+        hit_vectors.update(stored_vectors_by_id(store, store_dir, ids))
+    packer = ContextPacker()
+    packed = packer.pack(matches, [query_vectors.get(s) for s in code_snippets], hit_vectors)
+    pack_stats.update(packer.stats)
+    return packed
+
+
+def _format_context(code_matches, comment_matches, graph_context: str) -> str:
     # Build readable context
     context_blocks = ["# Relevant Code Snippets:"]
     for m in code_matches:
@@ -77,6 +413,11 @@ def get_retrieval_context(code_snippet: str, top_k: int = 5) -> str:
 
     context_blocks.append("\n# Relevant PR Comments:")
     for c in comment_matches:
-        context_blocks.append(c.page_content)
+        # Near-duplicate comments are stored once with their count (see indexing/comment_dedup.py).
+        occurrences = c.metadata.get("occurrences", 1)
+        context_blocks.append(f"(raised {occurrences} times) {c.page_content}" if occurrences > 1 else c.page_content)
+
+    if graph_context:
+        context_blocks.append(graph_context)
 
-    return "\n\n---\n\n".join(context_blocks)
\ No newline at end of file
+    return "\n\n---\n\n".join(context_blocks)
@@ -0,0 +1,42 @@
+# src/codewise/retriever/settings.py
+"""
+Retrieval settings read from the environment. Shared by `retriever_client`
+(which re-exports them as module globals, so they can be overridden per
+process) and the build scripts, which must agree with it on how the
+precomputed results are searched.
+"""
+import os
+
+# Query-time accuracy/speed knobs for approximate indexes. Unset means the
+# defaults recorded when the store was built (see retriever/index_factory.py).
+NPROBE = os.environ.get("RETRIEVER_NPROBE")
+EF_SEARCH = os.environ.get("RETRIEVER_EF_SEARCH")
+
+# Fuse BM25 identifier matches with the dense hits (see retriever/lexical.py);
+# set RETRIEVER_HYBRID=0 for dense-only search.
+HYBRID = os.environ.get("RETRIEVER_HYBRID", "1") not in ("0", "false", "False")
+
+# Cache retrieval results on disk per (snippet, top_k, store build ids); see
+# retriever/retrieval_cache.py. DISABLE_RETRIEVAL_CACHE=1 turns it off.
+RETRIEVAL_CACHE_PATH = os.environ.get("RETRIEVAL_CACHE_PATH", "vectorstores/retrieval_cache.sqlite")
+RETRIEVAL_CACHE = os.environ.get("DISABLE_RETRIEVAL_CACHE", "0") not in ("1", "true", "True")
+
+# Forward retrieval to a running `codewise retrieval serve` daemon (see
+# retriever/daemon.py), which keeps the stores loaded between processes;
+# DISABLE_RETRIEVAL_DAEMON=1 always retrieves in-process.
+USE_DAEMON = os.environ.get("DISABLE_RETRIEVAL_DAEMON", "0") not in ("1", "true", "True")
+
+# Fit each node's retrieved hits into RETRIEVAL_TOKEN_BUDGET tokens (see
+# retriever/context_packer.py); DISABLE_CONTEXT_PACKING=1 keeps every hit.
+CONTEXT_PACKING = os.environ.get("DISABLE_CONTEXT_PACKING", "0") not in ("1", "true", "True")
+
+# Default retrieval filters (see retriever/partitions.py): RETRIEVAL_SCOPE=directory
+# searches only code and comments in the changed file's directory,
+# RETRIEVAL_COMMENT_TYPE=review_comment only that kind of comment.
+SCOPE = os.environ.get("RETRIEVAL_SCOPE", "global")
+COMMENT_TYPE = os.environ.get("RETRIEVAL_COMMENT_TYPE") or None
+
+# Reuse the hits precomputed at build time for changed nodes that are indexed
+# with near-identical source (see retriever/neighbours.py);
+# DISABLE_NEIGHBOUR_GRAPH=1 always searches live.
+NEIGHBOUR_GRAPH = os.environ.get("DISABLE_NEIGHBOUR_GRAPH", "0") not in ("1", "true", "True")
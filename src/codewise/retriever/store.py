@@ -0,0 +1,228 @@
+# src/codewise/retriever/store.py
+import os
+
+from codewise.retriever.docstore import DOCSTORE_FILE, PositionMap, SQLiteDocstore
+from codewise.retriever.embeddings import backend_id, check_backend
+from codewise.retriever.store_meta import load_meta, new_build_id, update_meta
+
+# Read-only loads memory-map the index's vectors/codes (FAISS IO_FLAG_MMAP_IFC)
+# instead of copying them into each process; RETRIEVER_MMAP=0 reads them into RAM.
+MMAP = os.environ.get("RETRIEVER_MMAP", "1") not in ("0", "false", "False")
+
+# Raw float32 vectors kept next to approximate (IVF / HNSW) indexes, whose
+# codes can't be updated in place or losslessly read back.
+VECTORS_FILE = "vectors.npy"
+
+
+def has_store(store_dir: str) -> bool:
+    return os.path.exists(os.path.join(store_dir, "index.faiss"))
+
+
+def read_index(path: str, mmap: bool = MMAP):
+    """
+    Read a FAISS index file. With `mmap` the stored vectors (flat, SQ, PQ,
+    HNSW storage, IVF lists) stay in the file and are paged in on demand, so
+    concurrent readers share one page-cache copy and opening is near-instant.
+    Such an index must not be modified.
+    """
+    import faiss
+
+    return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC) if mmap else faiss.read_index(path)
+
+
+def load_store(store_dir: str, embeddings, writable: bool = False, mmap: bool = MMAP):
+    """
+    Load a persisted FAISS vectorstore.
+
+    Stores with a `docstore.sqlite` open lazily: only the FAISS index is read,
+    documents are fetched by id per search hit. `writable=True` loads the row
+    -> id map into a dict so the store can be updated in place (see
+    `save_store`). Older stores with a pickled `index.pkl` are still loaded
+    with their pickled docstore.
+
+    Read-only loads memory-map the index (see `read_index`) unless `mmap` is
+    False.
+
+    Approximate indexes get the search parameters recorded at build time
+    (`nprobe` / `efSearch`); a writable load swaps approximate or compressed
+    indexes for an exact flat index over `vectors.npy`, which `save_store`
+    re-indexes.
+
+    Raises `EmbeddingsMismatchError` if `embeddings` is not the backend the
+    store was built with.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    from codewise.retriever.index_factory import is_exact, set_search_params
+
+    recorded = load_meta(store_dir).get("embeddings")
+    docstore_path = os.path.join(store_dir, DOCSTORE_FILE)
+    index = read_index(os.path.join(store_dir, "index.faiss"), mmap=mmap and not writable)
+    if not os.path.exists(docstore_path):
+        import pickle
+
+        with open(os.path.join(store_dir, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        check_backend(recorded, embeddings, index.d)
+        return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+    check_backend(recorded, embeddings, index.d)
+    if writable and not is_exact(index):
+        import numpy as np
+        vectors = np.load(os.path.join(store_dir, VECTORS_FILE))
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+    elif not writable:
+        params = load_meta(store_dir).get("index", {})
+        set_search_params(index, nprobe=params.get("nprobe"), ef_search=params.get("ef_search"))
+    if writable:
+        docstore = SQLiteDocstore(docstore_path)
+        index_to_docstore_id = docstore.load_positions()
+    else:
+        docstore = SQLiteDocstore(docstore_path, readonly=True)
+        index_to_docstore_id = PositionMap(docstore)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def save_store(vectorstore, store_dir: str, index_type: str | None = None, compression: str | None = None,
+               **index_params) -> None:
+    """
+    Persist a FAISS vectorstore as `index.faiss` + `docstore.sqlite`.
+
+    A store loaded with `load_store(writable=True)` commits its pending
+    SQLite changes in place; any other docstore (e.g. the InMemoryDocstore of a
+    fresh `FAISS.from_embeddings`) is written out to a new SQLite file. A
+    legacy `index.pkl` is removed once the new files are in place.
+
+    The vectorstore's (flat) index is then converted to `index_type` /
+    `compression` with `convert_index`; None keeps what the store was last
+    built with. The embeddings backend is recorded in the store metadata, the
+    BM25 index (`lexical.npz`) is rebuilt from the docstore, and the store gets
+    a new `build_id` (which invalidates cached retrieval results).
+
+    Rows are first ordered by comment type and path (`partitions.cluster_rows`)
+    and their ranges recorded in `partitions.json`, for filtered retrieval.
+    """
+    from codewise.retriever.lexical import build_lexical_index
+    from codewise.retriever.partitions import build_partitions, cluster_rows
+
+    import faiss
+
+    cluster_rows(vectorstore)
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_index = os.path.join(store_dir, "index.faiss.tmp")
+    faiss.write_index(vectorstore.index, tmp_index)
+
+    docstore_path = os.path.join(store_dir, DOCSTORE_FILE)
+    docstore = vectorstore.docstore
+    if isinstance(docstore, SQLiteDocstore) and os.path.abspath(docstore.path) == os.path.abspath(docstore_path):
+        docstore.set_positions(vectorstore.index_to_docstore_id)
+        docstore.commit()
+    else:
+        ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+        SQLiteDocstore.write(docstore_path, ((i, docstore.search(i)) for i in ids))
+    os.replace(tmp_index, os.path.join(store_dir, "index.faiss"))
+
+    legacy = os.path.join(store_dir, "index.pkl")
+    if os.path.exists(legacy):
+        os.remove(legacy)
+    convert_index(store_dir, index_type, compression, **index_params)
+    update_meta(store_dir, embeddings=backend_id(vectorstore.embeddings))
+    build_lexical_index(store_dir)
+    build_partitions(store_dir)
+    new_build_id(store_dir)
+
+
+def row_vectors(vectorstore, store_dir: str, rows: list[int]):
+    """
+    The stored vectors of FAISS `rows` as a (len(rows), d) float32 array:
+    reconstructed from the index, or read from `vectors.npy` for indexes that
+    can't reconstruct (IVF). None when neither works (PQ-compressed vectors
+    are returned approximately).
+    """
+    import numpy as np
+
+    if not rows:
+        return np.zeros((0, vectorstore.index.d), dtype=np.float32)
+    try:
+        return vectorstore.index.reconstruct_batch(np.asarray(rows, dtype=np.int64))
+    except RuntimeError:
+        path = os.path.join(store_dir, VECTORS_FILE)
+        if not os.path.exists(path):
+            return None
+        return np.asarray(np.load(path, mmap_mode="r")[rows], dtype=np.float32)
+
+
+def stored_vectors_by_id(vectorstore, store_dir: str, ids: list[str]) -> dict:
+    """{id: stored vector} for the given document ids of the store (see `row_vectors`)."""
+    docstore = vectorstore.docstore
+    if isinstance(docstore, SQLiteDocstore):
+        rows = docstore.rows_of(ids)
+    else:
+        wanted = set(ids)
+        rows = {doc_id: row for row, doc_id in vectorstore.index_to_docstore_id.items() if doc_id in wanted}
+    vectors = row_vectors(vectorstore, store_dir, list(rows.values()))
+    return {} if vectors is None else dict(zip(rows, vectors))
+
+
+def convert_index(store_dir: str, index_type: str | None = None, compression: str | None = None,
+                  **index_params) -> dict:
+    """
+    Rebuild a store's `index.faiss` as `index_type`, storing the vectors with
+    `compression` ("none", "fp16", "sq8", "pq"; see `index_factory`).
+
+    The source vectors are read from `index.faiss` when it is flat, otherwise
+    from `vectors.npy`; both are memory-mapped. Approximate or compressed
+    indexes keep the raw vectors in `vectors.npy` for later updates. The
+    resulting type, compression and parameters are recorded under "index" in
+    the store metadata, together with the requested type ("auto" is
+    re-evaluated on every rebuild). Returns them. With `index_type` None the
+    previous type and compression are kept unless `compression` is given.
+    """
+    import faiss
+    import numpy as np
+
+    from codewise.retriever.index_factory import build_index, choose_index_type, flat_vectors
+
+    previous = load_meta(store_dir).get("index", {})
+    requested = index_type or previous.get("requested", "flat")
+    if index_type is None:
+        compression = compression or previous.get("compression")
+    compression = compression or "none"
+    index_path = os.path.join(store_dir, "index.faiss")
+    raw_path = os.path.join(store_dir, VECTORS_FILE)
+
+    index_params = {k: v for k, v in index_params.items() if v is not None}
+
+    vectors = flat_vectors(index_path)
+    is_flat = vectors is not None
+    if not is_flat:
+        vectors = np.load(raw_path, mmap_mode="r")
+    kind = choose_index_type(len(vectors)) if requested == "auto" else requested
+
+    if kind == "flat" and compression == "none":
+        if not is_flat:
+            index, params = build_index(vectors, "flat")
+            faiss.write_index(index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+        else:
+            params = {"index_type": "flat", "compression": None}
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+    else:
+        raw = np.lib.format.open_memmap(raw_path + ".tmp", mode="w+", dtype=np.float32, shape=vectors.shape)
+        for start in range(0, len(vectors), 65_536):
+            raw[start:start + 65_536] = vectors[start:start + 65_536]
+        raw.flush()
+        index, params = build_index(raw, kind, compression, **index_params)
+        faiss.write_index(index, index_path + ".tmp")
+        del raw
+        os.replace(raw_path + ".tmp", raw_path)
+        os.replace(index_path + ".tmp", index_path)
+
+    params["requested"] = requested
+    params["index_bytes"] = os.path.getsize(index_path)
+    update_meta(store_dir, index=params)
+    new_build_id(store_dir)
+    return params
@@ -0,0 +1,50 @@
+# src/codewise/retriever/store_meta.py
+import json
+import os
+import uuid
+
+META_FILE = "store_meta.json"
+
+
+def load_meta(store_dir: str) -> dict:
+    """Build metadata recorded next to a vectorstore ({} for stores built before it existed)."""
+    path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def update_meta(store_dir: str, **fields) -> dict:
+    """Merge `fields` into the store's metadata file and return the result."""
+    meta = load_meta(store_dir)
+    meta.update(fields)
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, META_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return meta
+
+
+def new_build_id(store_dir: str) -> str:
+    """Record a fresh `build_id` for a store whose index or documents were rewritten."""
+    return update_meta(store_dir, build_id=uuid.uuid4().hex)["build_id"]
+
+
+def store_version(store_dir: str) -> str:
+    """
+    The store's `build_id`; for stores written before build ids were
+    recorded, a fingerprint of the index files' sizes and modification times.
+    """
+    build_id = load_meta(store_dir).get("build_id")
+    if build_id:
+        return build_id
+    parts = []
+    for name in ("index.faiss", "index.pkl", "docstore.sqlite"):
+        path = os.path.join(store_dir, name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{name}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
@@ -11,10 +11,10 @@ load_dotenv()
 # Add the project root to the Python path to allow imports from 'src'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from github import Github, Auth
 from codewise.core.static_analyzer import analyze_file_changes
+from codewise.github_client import GitHubClient
 from codewise.review.llm_reviewer import get_review_for_code
-from codewise.retriever.retriever_client import get_retrieval_context
+from codewise.retriever.retriever_client import get_retrieval_contexts, pack_stats
 from codewise.review.feedback_logger import FeedbackLogger
 from codewise.review.pr_comments import save_human_comments_to_json
 
@@ -48,9 +48,8 @@ def main():
         print(f"Error: {e}")
         sys.exit(1)
 
-    g = Github(auth=Auth.Token(token))
-    repo = g.get_repo(repo_name)
-    pr = repo.get_pull(pr_number)
+    # One snapshot (a few GraphQL / REST round-trips) instead of a call per file and review.
+    pr = GitHubClient().get_pr_snapshot(repo_name, pr_number)
     feedback_logger = FeedbackLogger()
     adaptation_params = feedback_logger.compute_adaptation_params(pr_number)
 
@@ -59,22 +58,45 @@ def main():
 
     save_human_comments_to_json(pr)
 
-    for file in pr.get_files():
-        if not file.filename.endswith(".py"):
+    # Analyse every file first so the retrieval for all affected nodes of the
+    # PR is one batched embedding call and one search per store.
+    analysed = []
+    for file in pr.files:
+        if not file.filename.endswith(".py") or file.content is None:
             continue
-
         try:
-            file_content = repo.get_contents(file.filename, ref=pr.head.sha).decoded_content.decode("utf-8")
-            patch_text = file.patch
-            affected_nodes = analyze_file_changes(file_content, patch_text)
+            analysed.append((file, analyze_file_changes(file.content, file.patch)))
+        except Exception as e:
+            print(f"Could not analyze file {file.filename}: {e}", file=sys.stderr)
 
+    nodes = [(file, node_name, node_data) for file, affected_nodes in analysed
+             for node_name, node_data in affected_nodes.items()]
+    try:
+        contexts = get_retrieval_contexts(
+            [node_data["source_code"] for _, _, node_data in nodes],
+            node_names=[node_name for _, node_name, _ in nodes],
+            file_paths=[file.filename for file, _, _ in nodes],
+        )
+    except Exception as e:
+        # Review without retrieved context rather than not at all.
+        print(f"Could not retrieve context for {len(nodes)} nodes: {e}", file=sys.stderr)
+        contexts = ["" for _ in nodes]
+    retrieval_contexts = {(file.filename, node_name): context
+                          for (file, node_name, _), context in zip(nodes, contexts)}
+    if pack_stats["retrieved_tokens"]:
+        saved = pack_stats["retrieved_tokens"] - pack_stats["packed_tokens"]
+        print(f"Retrieved context: {pack_stats['packed_tokens']} tokens for {len(nodes)} nodes, "
+              f"{saved} saved by packing ({saved / pack_stats['retrieved_tokens']:.0%})", file=sys.stderr)
+
+    for file, affected_nodes in analysed:
+        try:
             file_review = {"filename": file.filename, "reviews": []}
 
             for node_name, node_data in affected_nodes.items():
                 source_code = node_data["source_code"]
                 added_lines = node_data.get("added_lines", [])
                 
-                retrieval_context = get_retrieval_context(source_code)
+                retrieval_context = retrieval_contexts[(file.filename, node_name)]
 
                 review = get_review_for_code(
                     source_code,
@@ -107,7 +129,7 @@ def main():
                 full_review["files"].append(file_review)
 
         except Exception as e:
-            print(f"Could not analyze file {file.filename}: {e}", file=sys.stderr)
+            print(f"Could not review file {file.filename}: {e}", file=sys.stderr)
 
     # Print the final combined review as a single JSON string
     print(json.dumps(full_review, indent=2))
@@ -1,14 +1,33 @@
 import json
+
+from codewise.github_client import PRSnapshot
+
+
+def _snapshot_human_comments(snapshot):
+    """Same records as the REST walk below, from an already fetched PRSnapshot."""
+    inline = [{"path": c.path, "line": c.position or 0, "body": c.body, "severity": "Low"}
+              for c in snapshot.review_comments]
+    issue = [{"path": None, "line": None, "body": c.body, "severity": "Low"} for c in snapshot.issue_comments]
+    in_reviews = [{"path": c.path, "line": c.position or 0, "body": c.body, "severity": "Low"}
+                  for review in snapshot.reviews for c in review.comments]
+    return inline + issue + in_reviews
+
+
 def extract_all_human_comments(pr):
     """
     Extracts all human comments from a PR:
       - Inline review comments
       - Top-level issue comments
       - Comments inside reviews
+    `pr` is a PyGithub PullRequest or a PRSnapshot (no further API calls).
     Returns:
       dict: { PR_NUMBER: [ {path, line, body, severity} ] }
       int: number of comments
     """
+    if isinstance(pr, PRSnapshot):
+        comments = _snapshot_human_comments(pr)
+        return {str(pr.number): comments}, len(comments)
+
     results = {str(pr.number): []}
 
     # 1. Inline review comments
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Recall / latency / memory benchmark of the FAISS index types and vector
+compressions in `index_factory`.
+
+The corpus is built from a store's real embeddings, replicated with small
+Gaussian noise up to `--size` vectors (so it keeps the cluster structure of
+code embeddings). Queries are fresh noisy copies of random corpus vectors.
+For each index type (optionally "type/compression") and search setting we
+report the index size, recall@5 against exact search and p50 / p99 latency of
+single-query searches (one thread).
+
+Usage:
+  python src/codewise/scripts/bench_ann.py --store vectorstores/flask_store
+  python src/codewise/scripts/bench_ann.py --store vectorstores/flask_store --size 200000
+  python src/codewise/scripts/bench_ann.py --configs flat,flat/fp16,flat/sq8,flat/pq,hnsw,hnsw/sq8
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.retriever.index_factory import build_index, set_search_params
+from codewise.retriever.store import VECTORS_FILE
+
+K = 5
+SETTINGS = {
+    "flat": [{}],
+    "ivf-flat": [{"nprobe": 1}, {"nprobe": 8}, {"nprobe": 32}],
+    "ivf-pq": [{"nprobe": 8}, {"nprobe": 32}],
+    "hnsw": [{"ef_search": 16}, {"ef_search": 64}, {"ef_search": 128}],
+}
+
+
+def load_vectors(store_dir):
+    raw = os.path.join(store_dir, VECTORS_FILE)
+    if os.path.exists(raw):
+        return np.load(raw)
+    index = faiss.read_index(os.path.join(store_dir, "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthesize(base, size, noise, rng):
+    rows = rng.integers(0, len(base), size=size)
+    scale = noise * np.linalg.norm(base, axis=1).mean() / np.sqrt(base.shape[1])
+    vectors = base[rows] + rng.standard_normal((size, base.shape[1]), dtype=np.float32) * scale
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def timed_search(index, queries):
+    latencies = []
+    found = np.empty((len(queries), K), dtype=np.int64)
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], K)
+        latencies.append(time.perf_counter() - start)
+        found[i] = ids[0]
+    return found, np.array(latencies) * 1000
+
+
+def recall_at_k(found, truth):
+    return np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default="vectorstores/flask_store", help="Store whose vectors seed the corpus")
+    parser.add_argument("--size", type=int, default=100_000, help="Corpus size (vectors)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.3, help="Noise relative to the mean vector norm")
+    parser.add_argument("--configs", default="flat,ivf-flat,ivf-pq,hnsw",
+                        help="Comma-separated index types, each optionally with /fp16, /sq8 or /pq")
+    parser.add_argument("--pq-m", type=int, help="PQ bytes per vector (default: index_factory's choice)")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)
+    rng = np.random.default_rng(0)
+    base = load_vectors(args.store).astype(np.float32)
+    corpus = np.concatenate([base, synthesize(base, max(0, args.size - len(base)), args.noise, rng)])
+    queries = synthesize(base, args.queries, args.noise, rng)
+
+    exact = faiss.IndexFlatL2(corpus.shape[1])
+    exact.add(corpus)
+    _, truth = exact.search(queries, K)
+
+    print(f"{len(corpus)} vectors x {corpus.shape[1]} dims (seeded from {len(base)} in {args.store}), "
+          f"{len(queries)} queries, k={K}\n")
+    print(f"{'index':14}{'setting':16}{'size (MB)':>10}{'build (s)':>10}{'recall@5':>10}"
+          f"{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for config in args.configs.split(","):
+        kind, _, compression = config.partition("/")
+        start = time.perf_counter()
+        index, params = build_index(corpus, kind, compression or None, pq_m=args.pq_m)
+        build_s = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+        for setting in SETTINGS[kind]:
+            set_search_params(index, **setting)
+            found, ms = timed_search(index, queries)
+            label = ", ".join(f"{k}={v}" for k, v in setting.items()) or "exact"
+            print(f"{config:14}{label:16}{size_mb:>10.1f}{build_s:>10.1f}{recall_at_k(found, truth):>10.3f}"
+                  f"{np.percentile(ms, 50):>10.2f}{np.percentile(ms, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-node retrieval loop vs the batched `get_retrieval_contexts`.
+
+A code store is built from `--repo-root` and a comments store from the
+texts of `--comments` (a built or legacy store), both with the offline
+"local" embeddings in a temporary directory. A sample of `--nodes` chunks of
+the repo stands in for the affected nodes of a PR. Every embedding call sleeps
+`--latency-ms` to simulate an embeddings API round-trip (0 measures local CPU only).
+
+Reported per mode: wall time, embedding calls and `index.search` calls, and
+whether both modes returned identical contexts.
+
+Usage:
+  python src/codewise/scripts/bench_batch_retrieval.py --repo-root data/flask/src/flask
+  python src/codewise/scripts/bench_batch_retrieval.py --repo-root data/flask/src/flask --nodes 50 --latency-ms 0
+"""
+import argparse
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+
+from langchain_community.vectorstores import FAISS
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.indexing.scanner import scan_repo
+from codewise.retriever import retriever_client
+from codewise.retriever.docstore import DOCSTORE_FILE, SQLiteDocstore
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.lexical import LexicalIndex
+from codewise.retriever.store import load_store, save_store
+
+
+class SlowEmbeddings(LocalHashEmbeddings):
+    """Local embeddings that count calls and pay a fixed latency per call."""
+
+    latency = 0.0
+    calls = 0
+
+    def embed_documents(self, texts):
+        SlowEmbeddings.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        SlowEmbeddings.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class CountingIndex:
+    """Forwards to a FAISS index and counts `search` calls."""
+
+    searches = 0
+
+    def __init__(self, index):
+        self._index = index
+
+    def search(self, *args, **kwargs):
+        CountingIndex.searches += 1
+        return self._index.search(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+def comment_texts(store_dir):
+    sqlite_path = os.path.join(store_dir, DOCSTORE_FILE)
+    if os.path.exists(sqlite_path):
+        return [text for _, text, _ in SQLiteDocstore(sqlite_path, readonly=True).iter_rows()]
+    with open(os.path.join(store_dir, "index.pkl"), "rb") as f:
+        docstore, _ = pickle.load(f)
+    return [doc.page_content for doc in docstore._dict.values()]
+
+
+def build(path, texts, metadatas, embeddings):
+    save_store(FAISS.from_texts(texts, embeddings, metadatas=metadatas), path)
+    store = load_store(path, embeddings)
+    store.index = CountingIndex(store.index)
+    return store, LexicalIndex.load(path)
+
+
+def run(mode, snippets, top_k):
+    SlowEmbeddings.calls = CountingIndex.searches = 0
+    start = time.perf_counter()
+    if mode == "loop":
+        contexts = [retriever_client.get_retrieval_context(s, top_k) for s in snippets]
+    else:
+        contexts = retriever_client.get_retrieval_contexts(snippets, top_k)
+    return contexts, time.perf_counter() - start, SlowEmbeddings.calls, CountingIndex.searches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo-root", required=True, help="Python sources for the code store")
+    parser.add_argument("--comments", default="vectorstores/pr_comments_store", help="store to take comment texts from")
+    parser.add_argument("--nodes", type=int, default=20, help="affected nodes per simulated PR")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="simulated latency per embedding call")
+    args = parser.parse_args()
+
+    embeddings = SlowEmbeddings()
+    docs = scan_repo(args.repo_root)
+    comments = comment_texts(args.comments)
+    snippets = [d["text"] for d in random.Random(0).sample(docs, min(args.nodes, len(docs)))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code_store, code_lexical = build(os.path.join(tmp, "code"), [d["text"] for d in docs],
+                                         [{"name": d["name"]} for d in docs], embeddings)
+        comments_store, comments_lexical = build(os.path.join(tmp, "comments"), comments,
+                                                 [{} for _ in comments], embeddings)
+        retriever_client.embeddings = embeddings
+        retriever_client.code_store, retriever_client.code_lexical = code_store, code_lexical
+        retriever_client.comments_store, retriever_client.comments_lexical = comments_store, comments_lexical
+        retriever_client.symbol_graph = None
+        retriever_client.CONTEXT_PACKING = False  # measures the search only (see bench_context_packing.py)
+
+        print(f"{len(docs)} code chunks, {len(comments)} comments, {len(snippets)} nodes, "
+              f"top_k={args.top_k}, {args.latency_ms:g} ms per embedding call\n")
+        SlowEmbeddings.latency = 0.0
+        run("batch", snippets, args.top_k)  # warm-up (lexical postings, docstore pages)
+        SlowEmbeddings.latency = args.latency_ms / 1000
+
+        results = {}
+        print(f"{'mode':<6} {'wall ms':>9} {'embed calls':>12} {'searches':>9}")
+        for mode in ("loop", "batch"):
+            contexts, wall, calls, searches = run(mode, snippets, args.top_k)
+            results[mode] = contexts
+            print(f"{mode:<6} {wall * 1000:>9.1f} {calls:>12} {searches:>9}")
+        print(f"\nidentical contexts: {results['loop'] == results['batch']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Peak-memory comparison of the in-memory build and the streaming (--stream)
+build of the code vectorstore.
+
+Each build runs in a fresh child process with deterministic fake 1536-dim
+embeddings (no network, embedding cache disabled) and reports its peak RSS.
+
+Usage:
+  python src/codewise/scripts/bench_build_memory.py --repo-root data/flask/src/flask
+  python src/codewise/scripts/bench_build_memory.py --synthetic 60   # 60 copies of the tree
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def _build(mode, repo_root, out_dir, shard_size, queue):
+    os.environ["DISABLE_EMBEDDING_CACHE"] = "1"
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from codewise.scripts import build_vectorstore as bv
+
+    embeddings = DeterministicFakeEmbedding(size=1536)
+    start = time.perf_counter()
+    if mode == "stream":
+        bv.stream_build(repo_root, out_dir, shard_size=shard_size, embeddings=embeddings)
+    else:
+        documents = bv.collect_documents(repo_root)
+        bv.update_vectorstore(documents, repo_root, out_dir, full=True, embeddings=embeddings)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+    queue.put((rss_mb, time.perf_counter() - start))
+
+
+def measure(mode, repo_root, shard_size):
+    out_dir = tempfile.mkdtemp()
+    queue = mp.Queue()
+    proc = mp.Process(target=_build, args=(mode, repo_root, out_dir, shard_size, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo-root", default="data/flask/src/flask")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Index N copies of --repo-root instead of the tree itself.")
+    parser.add_argument("--shard-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    repo_root = args.repo_root
+    tmp_tree = None
+    if args.synthetic:
+        tmp_tree = tempfile.mkdtemp()
+        for i in range(args.synthetic):
+            shutil.copytree(args.repo_root, os.path.join(tmp_tree, f"copy{i:03d}"))
+        repo_root = tmp_tree
+
+    try:
+        print(f"Tree: {repo_root}" + (f" ({args.synthetic} copies)" if args.synthetic else ""))
+        for mode in ("in-memory", "stream"):
+            rss_mb, seconds = measure(mode, repo_root, args.shard_size)
+            print(f"{mode:10} peak RSS {rss_mb:8.1f} MB   {seconds:6.1f} s")
+    finally:
+        if tmp_tree:
+            shutil.rmtree(tmp_tree, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
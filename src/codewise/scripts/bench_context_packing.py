@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Prompt context size with and without the context packer
+(retriever/context_packer.py).
+
+Stores are built as in bench_batch_retrieval.py (code from `--repo-root`,
+comment texts from `--comments`, offline "local" embeddings) and a sample of
+`--nodes` chunks stands in for the affected nodes of a PR. For each mode the
+contexts come from `get_retrieval_contexts`; reported are the tokens of all
+contexts, the largest single context and the wall time. With packing on, the
+packer's stats show why hits were dropped.
+
+Usage:
+  python src/codewise/scripts/bench_context_packing.py --repo-root data/flask/src/flask
+  python src/codewise/scripts/bench_context_packing.py --repo-root data/flask/src/flask --budget 1000 --min-score 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.indexing.scanner import scan_repo
+from codewise.retriever import context_packer, retriever_client
+from codewise.retriever.context_packer import count_tokens
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.scripts.bench_batch_retrieval import build, comment_texts
+
+
+def run(snippets, top_k, packing):
+    retriever_client.CONTEXT_PACKING = packing
+    retriever_client.pack_stats.clear()
+    start = time.perf_counter()
+    contexts = retriever_client.get_retrieval_contexts(snippets, top_k)
+    wall = time.perf_counter() - start
+    tokens = [count_tokens(c) for c in contexts]
+    return sum(tokens), max(tokens), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo-root", required=True, help="Python sources for the code store")
+    parser.add_argument("--comments", default="vectorstores/pr_comments_store", help="store to take comment texts from")
+    parser.add_argument("--nodes", type=int, default=20, help="affected nodes per simulated PR")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=context_packer.TOKEN_BUDGET, help="tokens per node")
+    parser.add_argument("--min-score", type=float, default=context_packer.MIN_SCORE)
+    args = parser.parse_args()
+    context_packer.TOKEN_BUDGET, context_packer.MIN_SCORE = args.budget, args.min_score
+
+    embeddings = LocalHashEmbeddings()
+    docs = scan_repo(args.repo_root)
+    comments = comment_texts(args.comments)
+    snippets = [d["text"] for d in random.Random(0).sample(docs, min(args.nodes, len(docs)))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code_store, code_lexical = build(os.path.join(tmp, "code"), [d["text"] for d in docs],
+                                         [{"name": d["name"]} for d in docs], embeddings)
+        comments_store, comments_lexical = build(os.path.join(tmp, "comments"), comments,
+                                                 [{} for _ in comments], embeddings)
+        retriever_client.embeddings = embeddings
+        retriever_client.code_store, retriever_client.code_lexical = code_store, code_lexical
+        retriever_client.comments_store, retriever_client.comments_lexical = comments_store, comments_lexical
+        retriever_client.symbol_graph = None
+        retriever_client.retrieval_cache = None
+
+        tokenizer = "tiktoken" if context_packer._encoding(context_packer.TOKENIZER_MODEL) else "4 chars/token estimate"
+        print(f"{len(docs)} code chunks, {len(comments)} comments, {len(snippets)} nodes, top_k={args.top_k}, "
+              f"budget={args.budget}, min_score={args.min_score:g}, tokens: {tokenizer}\n")
+        run(snippets, args.top_k, True)  # warm-up
+
+        print(f"{'packing':<8} {'tokens':>8} {'max/node':>9} {'wall ms':>8}")
+        for packing in (False, True):
+            total, largest, wall = run(snippets, args.top_k, packing)
+            print(f"{'on' if packing else 'off':<8} {total:>8} {largest:>9} {wall * 1000:>8.1f}")
+        stats = retriever_client.pack_stats
+        print(f"\nhits dropped: {stats['below_min_score']} below min score, {stats['duplicate']} duplicates, "
+              f"{stats['over_budget']} over budget; {stats['truncated']} truncated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Startup-time and RSS benchmark: pickled docstore (`index.pkl`) vs the lazily
+opened SQLite docstore (`docstore.sqlite`).
+
+Only the docstore is measured (the FAISS index is read the same way in both
+cases). Each variant runs in a fresh child process: open the docstore, then
+fetch 5 documents as a search hit would.
+
+Usage:
+  python src/codewise/scripts/bench_docstore.py --store vectorstores/flask_store
+  python src/codewise/scripts/bench_docstore.py --store vectorstores/flask_store --replicate 50
+"""
+import argparse
+import multiprocessing as mp
+import os
+import pickle
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.retriever.docstore import DOCSTORE_FILE, PositionMap, SQLiteDocstore
+
+
+def _rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def _open_pickle(store_dir, positions, queue):
+    base = _rss_mb()
+    start = time.perf_counter()
+    with open(os.path.join(store_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    opened = time.perf_counter() - start
+    docs = [docstore.search(index_to_docstore_id[p]) for p in positions]
+    queue.put((opened, time.perf_counter() - start, _rss_mb() - base, len(docs)))
+
+
+def _open_sqlite(store_dir, positions, queue):
+    base = _rss_mb()
+    start = time.perf_counter()
+    docstore = SQLiteDocstore(os.path.join(store_dir, DOCSTORE_FILE), readonly=True)
+    index_to_docstore_id = PositionMap(docstore)
+    opened = time.perf_counter() - start
+    docs = [docstore.search(index_to_docstore_id[p]) for p in positions]
+    queue.put((opened, time.perf_counter() - start, _rss_mb() - base, len(docs)))
+
+
+def measure(target, store_dir, positions):
+    queue = mp.Queue()
+    proc = mp.Process(target=target, args=(store_dir, positions, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default="vectorstores/flask_store", help="Store with a legacy index.pkl")
+    parser.add_argument("--replicate", type=int, default=1, help="Repeat every document N times")
+    args = parser.parse_args()
+
+    # Langchain classes must be importable before the children unpickle
+    import langchain_community.docstore.in_memory  # noqa: F401
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    with open(os.path.join(args.store, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    ordered = [docstore.search(index_to_docstore_id[i]) for i in range(len(index_to_docstore_id))]
+
+    tmp = tempfile.mkdtemp()
+    try:
+        docs, ids = {}, {}
+        for r in range(args.replicate):
+            for doc in ordered:
+                doc_id = f"{r}-{doc.id}"
+                ids[len(ids)] = doc_id
+                # distinct strings, so pickle can't share them between copies
+                content = doc.page_content if r == 0 else f"{doc.page_content}\n# copy {r}"
+                metadata = {k: v for k, v in doc.metadata.items() if k != "text"}
+                docs[doc_id] = doc.model_copy(update={"id": doc_id, "page_content": content, "metadata": metadata})
+        with open(os.path.join(tmp, "index.pkl"), "wb") as f:
+            pickle.dump((InMemoryDocstore(docs), ids), f)
+        SQLiteDocstore.write(os.path.join(tmp, DOCSTORE_FILE), ((ids[i], docs[ids[i]]) for i in range(len(ids))))
+
+        positions = random.Random(0).sample(range(len(ids)), 5)
+        pkl_mb = os.path.getsize(os.path.join(tmp, "index.pkl")) / 1e6
+        sql_mb = os.path.getsize(os.path.join(tmp, DOCSTORE_FILE)) / 1e6
+        print(f"{len(ids)} documents  (index.pkl {pkl_mb:.1f} MB, docstore.sqlite {sql_mb:.1f} MB)\n")
+        print(f"{'':8}{'open (ms)':>12}{'open+5 hits (ms)':>18}{'RSS delta (MB)':>16}")
+        for label, target in (("pickle", _open_pickle), ("sqlite", _open_sqlite)):
+            opened, total, rss, _ = measure(target, tmp, positions)
+            print(f"{label:8}{opened * 1000:>12.1f}{total * 1000:>18.1f}{rss:>16.1f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Memory of N concurrent retrieval workers: private index copies
+(RETRIEVER_MMAP=0) vs memory-mapped indexes shared through the page cache.
+
+A synthetic flat store of `--size` random vectors is written to a temporary
+directory. For each worker count, N fresh processes (spawned, so nothing is
+inherited through fork) each `load_store` it and run `--queries` searches,
+which touch every vector. All N stay alive until every one has measured:
+
+  load ms    time to open the store (after imports)
+  RSS        resident set, counting shared file pages in full in every process
+  private    anonymous memory owned by that process alone (RssAnon)
+  PSS sum    proportional set size summed over the workers: the real total,
+             with shared pages split between the processes mapping them
+
+Usage:
+  python src/codewise/scripts/bench_mmap_workers.py
+  python src/codewise/scripts/bench_mmap_workers.py --size 200000 --dim 768 --workers 1,4,16
+"""
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.retriever.embeddings import LocalHashEmbeddings
+
+
+def _memory_mb() -> dict:
+    """RSS / RssAnon from /proc/self/status and Pss from smaps_rollup (Linux)."""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon"):
+                values[key] = int(rest.split()[0]) / 1024
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                values["Pss"] = int(line.split()[1]) / 1024
+    return values
+
+
+def _worker(store_dir, dim, mmap, queries, barrier, results):
+    import faiss  # noqa: F401  (imports are not part of the load time)
+    from langchain_community.vectorstores import FAISS  # noqa: F401
+
+    from codewise.retriever.store import load_store
+
+    start = time.perf_counter()
+    store = load_store(store_dir, LocalHashEmbeddings(dimensions=dim), mmap=mmap)
+    loaded = time.perf_counter() - start
+    rng = np.random.default_rng(os.getpid())
+    store.index.search(rng.standard_normal((queries, dim), dtype=np.float32), 5)
+    barrier.wait()  # every worker is loaded and has searched
+    results.put(dict(_memory_mb(), load=loaded))
+    barrier.wait()  # keep the mappings alive until all have measured
+
+
+def build_store(store_dir, size, dim):
+    from langchain_community.vectorstores import FAISS
+
+    from codewise.retriever.store import save_store
+
+    vectors = np.random.default_rng(0).standard_normal((size, dim), dtype=np.float32)
+    pairs = ((f"chunk {i}", vectors[i]) for i in range(size))
+    save_store(FAISS.from_embeddings(pairs, LocalHashEmbeddings(dimensions=dim)), store_dir)
+    return os.path.getsize(os.path.join(store_dir, "index.faiss")) / 1024 / 1024
+
+
+def run(store_dir, dim, mmap, workers, queries):
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(store_dir, dim, mmap, queries, barrier, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    stats = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="vectors in the store")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", default="1,4,16", help="comma-separated worker counts")
+    parser.add_argument("--queries", type=int, default=8, help="searches per worker")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_mb = build_store(tmp, args.size, args.dim)
+        print(f"flat store: {args.size} x {args.dim} float32, index.faiss {index_mb:.0f} MB\n")
+        print(f"{'workers':>7} {'mode':<6} {'load ms':>8} {'RSS MB':>8} {'private MB':>11} {'PSS sum MB':>11}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            for mode, mmap in (("read", False), ("mmap", True)):
+                stats = run(tmp, args.dim, mmap, workers, args.queries)
+                print(f"{workers:>7} {mode:<6} "
+                      f"{statistics.median(s['load'] for s in stats) * 1000:>8.1f} "
+                      f"{statistics.median(s['VmRSS'] for s in stats):>8.0f} "
+                      f"{statistics.median(s['RssAnon'] for s in stats):>11.0f} "
+                      f"{sum(s['Pss'] for s in stats):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
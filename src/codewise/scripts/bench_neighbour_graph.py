@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Retrieval for a PR's changed nodes from the precomputed neighbour graph
+(retriever/neighbours.py) vs live search.
+
+Stores are built as in bench_batch_retrieval.py (code from `--repo-root`,
+comment texts from `--comments`, offline "local" embeddings) and the graph
+is built from them; its build time is reported. A simulated PR changes
+`--nodes` indexed functions and methods: each gets a line added to its body, a
+`--new` share is also renamed, as new code would be. The node sources come
+from `analyze_file_changes` of the edited file, as in the review pipeline.
+Every embedding call sleeps `--latency-ms`.
+
+Reported per mode: wall time, embedding calls, dense queries (over both
+stores), `index.search` calls and how many nodes were answered from the
+graph, then how many of the graph's code and comment hits a live search of
+the edited source also returns.
+
+Usage:
+  python src/codewise/scripts/bench_neighbour_graph.py --repo-root data/flask/src/flask
+  python src/codewise/scripts/bench_neighbour_graph.py --repo-root data/flask/src/flask --nodes 50 --new 0.5
+"""
+import argparse
+import ast
+import os
+import random
+import sys
+import tempfile
+import time
+
+from langchain_community.vectorstores import FAISS
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.core.static_analyzer import analyze_file_changes
+from codewise.indexing.scanner import scan_repo
+from codewise.retriever import retriever_client
+from codewise.retriever.lexical import LexicalIndex
+from codewise.retriever.neighbours import build_neighbour_graph
+from codewise.retriever.store import load_store, save_store
+from codewise.scripts.bench_batch_retrieval import CountingIndex, SlowEmbeddings, comment_texts
+
+
+def changed_nodes(docs, repo_root, count, new_share):
+    """
+    (source, name, path) of `count` edited functions and methods (a method as
+    its whole class, as the review pipeline sends it); a `new_share` of them renamed.
+    """
+    functions = [d for d in docs if d.get("kind") in ("function", "method")]
+    nodes = []
+    for doc in random.Random(0).sample(functions, len(functions)):
+        if len(nodes) == count:
+            break
+        with open(doc["source"], encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        defs = [n for n in ast.walk(ast.parse("\n".join(lines)))
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name == doc["name"]]
+        if not defs:
+            continue
+        node, name = defs[0], doc["name"]
+        if len(nodes) < new_share * count:
+            name += "_v2"
+            lines[node.lineno - 1] = lines[node.lineno - 1].replace(f"def {doc['name']}(", f"def {name}(", 1)
+        added = " " * node.body[0].col_offset + 'log.debug("edited")'
+        lines.insert(node.end_lineno, added)
+        patch = f"@@ -{node.end_lineno + 1},0 +{node.end_lineno + 1},1 @@\n+{added}"
+        changed = analyze_file_changes("\n".join(lines), patch)
+        node_name = doc["qualname"].split(".")[0] if doc["parent"] else name  # a method comes as its class
+        if node_name in changed:  # else another definition of that name came first
+            nodes.append((changed[node_name]["source_code"], node_name, os.path.relpath(doc["source"], repo_root)))
+    return nodes
+
+
+def run(nodes, top_k, graph):
+    retriever_client.neighbour_graph = graph
+    retriever_client.search_stats.clear()
+    SlowEmbeddings.calls = CountingIndex.searches = 0
+    snippets, names, paths = (list(x) for x in zip(*nodes))
+    start = time.perf_counter()
+    matches = retriever_client._retrieve(snippets, top_k, names, paths, [None] * len(nodes),
+                                         lambda s, fs: retriever_client._search_batch(s, top_k, fs), {})
+    wall = time.perf_counter() - start
+    stats = retriever_client.search_stats
+    return (matches, wall, SlowEmbeddings.calls, stats["hybrid"] + stats["dense_only"], CountingIndex.searches,
+            stats["precomputed"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo-root", required=True, help="Python sources for the code store")
+    parser.add_argument("--comments", default="vectorstores/pr_comments_store", help="store to take comment texts from")
+    parser.add_argument("--nodes", type=int, default=20, help="changed functions in the simulated PR")
+    parser.add_argument("--new", type=float, default=0.25, help="share of the nodes that are new code")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="simulated latency per embedding call")
+    args = parser.parse_args()
+
+    embeddings = SlowEmbeddings()
+    docs = scan_repo(args.repo_root)
+    comments = comment_texts(args.comments)
+    nodes = changed_nodes(docs, args.repo_root, args.nodes, args.new)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code_dir, comments_dir = os.path.join(tmp, "code"), os.path.join(tmp, "comments")
+        save_store(FAISS.from_texts([d["text"] for d in docs], embeddings,
+                                    metadatas=[{k: v for k, v in d.items() if k != "text"} for d in docs]), code_dir)
+        save_store(FAISS.from_texts(comments, embeddings, metadatas=[{} for _ in comments]), comments_dir)
+        start = time.perf_counter()
+        graph = build_neighbour_graph(code_dir, comments_dir, embeddings, k=args.top_k)
+        build_seconds = time.perf_counter() - start
+
+        retriever_client.embeddings = embeddings
+        retriever_client.code_store = load_store(code_dir, embeddings)
+        retriever_client.comments_store = load_store(comments_dir, embeddings)
+        for store in (retriever_client.code_store, retriever_client.comments_store):
+            store.index = CountingIndex(store.index)
+        retriever_client.code_lexical = LexicalIndex.load(code_dir)
+        retriever_client.comments_lexical = LexicalIndex.load(comments_dir)
+        retriever_client.code_partitions = retriever_client.comments_partitions = None
+        retriever_client.retrieval_cache = None
+
+        print(f"{len(docs)} code chunks, {len(comments)} comments, top_k={args.top_k}; neighbour graph built in "
+              f"{build_seconds:.2f} s without embedding calls")
+        print(f"{len(nodes)} changed nodes ({int(args.new * args.nodes)} new), "
+              f"{args.latency_ms:g} ms per embedding call\n")
+        SlowEmbeddings.latency = 0.0
+        run(nodes, args.top_k, None)  # warm-up (lexical postings, docstore pages)
+        SlowEmbeddings.latency = args.latency_ms / 1000
+
+        results = {}
+        print(f"{'mode':<6} {'wall ms':>9} {'embed calls':>12} {'dense':>6} {'searches':>9} {'from graph':>11}")
+        for mode, mode_graph in (("live", None), ("graph", graph)):
+            matches, wall, calls, dense, searches, precomputed = run(nodes, args.top_k, mode_graph)
+            results[mode] = matches
+            print(f"{mode:<6} {wall * 1000:>9.1f} {calls:>12} {dense:>6} {searches:>9} {precomputed:>11}")
+
+        snippets, names, paths = (list(x) for x in zip(*nodes))
+        answered = graph.lookup(retriever_client.code_store.docstore, snippets, names, paths)
+        agree = total = 0
+        for i in answered:
+            (live_code, live_comments), (code, comments) = results["live"][i], results["graph"][i]
+            for live_hits, hits in ((live_code, code), (live_comments, comments)):
+                live_ids = {d.id for d in live_hits}
+                agree += sum(d.id in live_ids for d in hits)
+                total += len(hits)
+        print(f"\ngraph hits also returned by a live search of the edited source: {agree}/{total}")
+
+
+if __name__ == "__main__":
+    main()
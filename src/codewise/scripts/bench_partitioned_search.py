@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Directory-filtered retrieval: the partition pre-filter
+(retriever/partitions.py) vs a separate index per partition and vs a global
+search that is post-filtered.
+
+A synthetic store of `--size` random vectors is saved with `save_store`.
+Chunks are spread over `--dirs` directories (in shuffled order, so the save
+has to cluster them). Each of `--queries` queries is restricted to one
+directory. Reported per strategy are the milliseconds per query batch (one
+`index.search` per directory group) and how many of the k results per query
+lie in the directory:
+
+  global       unfiltered search (the cost baseline)
+  post-filter  global search for 10*k, then the hits outside the directory dropped
+  partition    one flat index per directory, built up front (the ideal)
+  pre-filter   the saved store searched over the directory's row range
+
+Usage:
+  python src/codewise/scripts/bench_partitioned_search.py
+  python src/codewise/scripts/bench_partitioned_search.py --size 200000 --dim 384 --dirs 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.partitions import PartitionTable, RetrievalFilter, in_directory, search_rows
+from codewise.retriever.store import load_store, save_store
+
+
+def timed(fn, repeat=10):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="vectors in the store")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--dirs", type=int, default=50, help="directories the chunks are spread over")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    faiss.omp_set_num_threads(1)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.size, args.dim), dtype=np.float32)
+    dirs = rng.integers(0, args.dirs, args.size)
+    sources = [f"repo/pkg/dir{d}/mod{i % 7}.py" for i, d in enumerate(dirs)]
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    wanted = [f"pkg/dir{d}" for d in rng.integers(0, args.dirs, args.queries)]
+    groups = defaultdict(list)
+    for i, directory in enumerate(wanted):
+        groups[directory].append(i)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pairs = ((f"chunk {i}", vectors[i]) for i in range(args.size))
+        start = time.perf_counter()
+        save_store(FAISS.from_embeddings(pairs, LocalHashEmbeddings(dimensions=args.dim),
+                                         metadatas=[{"source": s} for s in sources]), tmp)
+        print(f"{args.size} x {args.dim} flat store, {args.dirs} directories, {args.queries} queries, "
+              f"k={args.k}; saved (clustered) in {time.perf_counter() - start:.1f} s\n")
+        store = load_store(tmp, LocalHashEmbeddings(dimensions=args.dim))
+        table = PartitionTable.load(tmp)
+        rows = {d: table.rows(RetrievalFilter(d)) for d in groups}
+        row_source = {}  # FAISS row -> directory, to check the results
+        for d, ranges in rows.items():
+            for s, e in ranges:
+                row_source.update(dict.fromkeys(range(s, e), d))
+
+        partitions = {}
+        for d in groups:
+            members = np.array([i for i, s in enumerate(sources) if in_directory(s, d)])
+            index = faiss.IndexFlatL2(args.dim)
+            index.add(vectors[members])
+            partitions[d] = (index, members)
+
+        def run_global():
+            return {i: row for i, row in enumerate(store.index.search(queries, args.k)[1])}
+
+        def run_post_filter():
+            labels = store.index.search(queries, 10 * args.k)[1]
+            return {i: [r for r in labels[i] if row_source.get(int(r)) == wanted[i]][:args.k]
+                    for i in range(args.queries)}
+
+        def run_partition():
+            out = {}
+            for d, idx in groups.items():
+                index, members = partitions[d]
+                for i, row in zip(idx, index.search(queries[idx], args.k)[1]):
+                    out[i] = members[row]
+            return out
+
+        def run_pre_filter():
+            out = {}
+            for d, idx in groups.items():
+                out.update(zip(idx, search_rows(store.index, queries[idx], args.k, rows[d])[1]))
+            return out
+
+        print(f"{'strategy':<12} {'ms':>8} {'in-directory hits':>18}")
+        for name, fn, check_rows in (("global", run_global, True), ("post-filter", run_post_filter, True),
+                                     ("partition", run_partition, False), ("pre-filter", run_pre_filter, True)):
+            result, ms = timed(fn)
+            if check_rows:
+                hits = sum(row_source.get(int(r)) == wanted[i] for i, labels in result.items() for r in labels)
+            else:
+                hits = sum(len(labels) for labels in result.values())
+            print(f"{name:<12} {ms:>8.2f} {hits:>12}/{args.queries * args.k}")
+
+
+if __name__ == "__main__":
+    main()
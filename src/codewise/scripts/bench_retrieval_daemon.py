@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Cold-process vs warm-daemon retrieval latency.
+
+Builds a code store from `--repo-root` and a comments store from the texts of
+`--comments` with the offline "local" embeddings, in a temporary directory.
+Then it runs `--runs` fresh Python processes that each retrieve contexts for
+`--nodes` snippets with `get_retrieval_contexts`, as one pipeline step would:
+
+  cold  DISABLE_RETRIEVAL_DAEMON=1: import LangChain/FAISS, load both stores, search
+  warm  with `codewise retrieval serve` running: one HTTP request to the daemon
+
+Per mode we report the median wall time of the whole process and of the
+retrieval call inside it. The retrieval cache is disabled, so every request
+searches.
+
+Usage:
+  python src/codewise/scripts/bench_retrieval_daemon.py --repo-root data/flask/src/flask
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(SRC)
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+from codewise.retriever import retriever_client
+retriever_client.CODE_STORE_PATH = {code!r}
+retriever_client.COMMENTS_STORE_PATH = {comments!r}
+with open({snippets!r}) as f:
+    snippets = json.load(f)
+call = time.perf_counter()
+contexts = retriever_client.get_retrieval_contexts(snippets, top_k=5)
+done = time.perf_counter()
+print(json.dumps({{"call": done - call, "total": done - start, "contexts": contexts}}))
+"""
+
+
+def build_stores(tmp, repo_root, comments_dir):
+    from langchain_community.vectorstores import FAISS
+
+    from codewise.indexing.scanner import scan_repo
+    from codewise.retriever.embeddings import get_embeddings
+    from codewise.retriever.store import save_store
+    from bench_batch_retrieval import comment_texts
+
+    embeddings = get_embeddings("local")
+    docs = scan_repo(repo_root)
+    comments = comment_texts(comments_dir)
+    code_dir, comments_store = os.path.join(tmp, "code"), os.path.join(tmp, "comments")
+    save_store(FAISS.from_texts([d["text"] for d in docs], embeddings,
+                                metadatas=[{"name": d["name"]} for d in docs]), code_dir)
+    save_store(FAISS.from_texts(comments, embeddings), comments_store)
+    return docs, code_dir, comments_store
+
+
+def run_child(script, env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", script], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo-root", required=True, help="Python sources for the code store")
+    parser.add_argument("--comments", default="vectorstores/pr_comments_store", help="store to take comment texts from")
+    parser.add_argument("--nodes", type=int, default=10, help="snippets per retrieval call")
+    parser.add_argument("--runs", type=int, default=5, help="processes per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs, code_dir, comments_dir = build_stores(tmp, args.repo_root, args.comments)
+        snippets_path = os.path.join(tmp, "snippets.json")
+        with open(snippets_path, "w") as f:
+            json.dump([d["text"] for d in random.Random(0).sample(docs, min(args.nodes, len(docs)))], f)
+        script = CHILD.format(src=SRC, code=code_dir, comments=comments_dir, snippets=snippets_path)
+
+        env = dict(os.environ, EMBEDDINGS_BACKEND="local", DISABLE_RETRIEVAL_CACHE="1",
+                   RETRIEVAL_DAEMON_FILE=os.path.join(tmp, "daemon.json"))
+        daemon = subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-m", "codewise.cli", "retrieval", "serve", "--port", "0",
+             "--code-store", code_dir, "--comments-store", comments_dir],
+            cwd=SRC, env=env, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            print(daemon.stdout.readline().strip())
+            results = {}
+            for mode, extra in (("cold", {"DISABLE_RETRIEVAL_DAEMON": "1"}), ("warm", {})):
+                results[mode] = [run_child(script, dict(env, **extra)) for _ in range(args.runs)]
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(f"\n{len(docs)} code chunks, {args.nodes} snippets per call, median of {args.runs} processes\n")
+    print(f"{'mode':<6} {'process ms':>11} {'retrieval ms':>13}")
+    for mode, runs in results.items():
+        print(f"{mode:<6} {statistics.median(r['process'] for r in runs) * 1000:>11.1f} "
+              f"{statistics.median(r['call'] for r in runs) * 1000:>13.1f}")
+    same = all(r["contexts"] == results["cold"][0]["contexts"] for runs in results.values() for r in runs)
+    print(f"\nidentical contexts: {same}")
+
+
+if __name__ == "__main__":
+    main()
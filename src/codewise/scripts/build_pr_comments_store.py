@@ -1,8 +1,42 @@
+import argparse
 import os
-from github import Github, Auth # type: ignore
+import sys
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+
+# Make `codewise` importable when this file is run directly as a script.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.github.http_cache import cached_github, http_cache_stats
+from codewise.indexing.comment_dedup import MinHashIndex, drop_bot_comments
+from codewise.indexing.comment_harvester import harvest_comments
+from codewise.indexing.embedding_scheduler import EmbeddingScheduler
+from codewise.retriever.embedding_cache import cache_stats
+from codewise.retriever.embeddings import BACKENDS, EmbeddingsMismatchError, get_embeddings
+from codewise.retriever.index_factory import COMPRESSIONS, INDEX_TYPES
+from codewise.retriever.neighbours import refresh_neighbour_graph
+from codewise.retriever.settings import HYBRID
+from codewise.retriever.store import has_store, load_store, save_store
+from codewise.retriever.store_meta import load_meta, update_meta
+
+STORE_DIR = "vectorstores/pr_comments_store"
+
+parser = argparse.ArgumentParser(
+    description="Build the PR comment vectorstore, or append comments made since the last run."
+)
+parser.add_argument("--repo", default="pallets/flask", help="GitHub repository (owner/name) to harvest.")
+parser.add_argument("--full", action="store_true", help="Ignore the harvest cursors and rebuild from the full history.")
+parser.add_argument("--embeddings", choices=sorted(BACKENDS),
+                    help="Embeddings backend (default: EMBEDDINGS_BACKEND, else openai).")
+parser.add_argument("--index-type", choices=INDEX_TYPES,
+                    help="FAISS index to build; 'auto' picks by vector count (default: keep the store's current type).")
+parser.add_argument("--compression", choices=COMPRESSIONS, help="Store vectors as fp16, sq8 or pq codes.")
+parser.add_argument("--nlist", type=int, help="Inverted lists for IVF indexes.")
+parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers for ivf-pq.")
+parser.add_argument("--hnsw-m", type=int, help="Graph neighbours per node for hnsw.")
+parser.add_argument("--code-store", default="vectorstores/flask_store",
+                    help="Code store whose precomputed neighbours (neighbours.npz) are refreshed.")
+args = parser.parse_args()
 
 load_dotenv()
 token = os.getenv("GITHUB_TOKEN")
@@ -10,45 +44,79 @@ if not token:
     raise ValueError("Missing GITHUB_TOKEN in .env!")
 
 # Connect to GitHub
-g = Github(auth=Auth.Token(token))
-repo = g.get_repo("pallets/flask")
+g = cached_github(token, per_page=100)
+repo = g.get_repo(args.repo)
 print("Connected to:", repo.full_name)
 
-# ---------- Step 1: Fetch historical PR comments ----------
-comments_data = []
-
-print("Fetching PR review comments...")
-for pr in repo.get_pulls(state="all")[:50]:
-    for review_comment in pr.get_review_comments():
-        if review_comment.body and review_comment.body.strip():
-            comments_data.append({
-                "text": review_comment.body,
-                "type": "review_comment",
-                "file": review_comment.path,
-                "repo": repo.full_name
-            })
-
-print("Fetching issue comments (PR discussions)...")
-for issue_comment in repo.get_issues_comments()[:50]:
-    if '/pull/' in issue_comment.html_url and issue_comment.body and issue_comment.body.strip():
-        comments_data.append({
-            "text": issue_comment.body,
-            "type": "issue_comment",
-            "file": None,
-            "repo": repo.full_name
-        })
-
+# ---------- Step 1: Fetch comments since the last harvest ----------
+meta = load_meta(STORE_DIR)
+appending = not args.full and has_store(STORE_DIR) and "harvest" in meta
+if appending:
+    print("Fetching PR review and issue comments updated since the last harvest...")
+else:
+    print("Fetching the full PR review and issue comment history...")
+comments_data, cursors = harvest_comments(repo, meta.get("harvest") if appending else None)
 print(f"Total comments fetched: {len(comments_data)}")
+http_stats = http_cache_stats()
+if http_stats:
+    print(f"GitHub HTTP cache: {http_stats['revalidated']} not modified (304), {http_stats['hits']} served "
+          f"from cache, {http_stats['misses']} fetched")
 
-# ---------- Step 2: Create embeddings ----------
-emb = OpenAIEmbeddings()
-vectorstore = FAISS.from_texts(
-    [c["text"] for c in comments_data],
-    emb,
-    metadatas=comments_data
-)
+harvested_ids = [c["id"] for c in comments_data]
+
+# ---------- Step 2: Drop bots, collapse near-duplicates ----------
+comments_data, bots = drop_bot_comments(comments_data)
+minhash = MinHashIndex.load(STORE_DIR) if appending else MinHashIndex()
+comments_data, bumped = minhash.add(comments_data)  # edits keep their cluster and count
+print(f"Dropped {bots} bot comments; {len(comments_data)} unique comments to embed, "
+      f"{len(bumped)} stored comments repeated")
+
+if not comments_data and not bumped:
+    if appending:
+        update_meta(STORE_DIR, harvest=cursors)
+    print("No new comments; the PR comment store is up to date.")
+    sys.exit(0)
+
+# ---------- Step 3: Create embeddings ----------
+emb = get_embeddings(args.embeddings)
+scheduler = EmbeddingScheduler(emb, checkpoint_dir=os.path.join(STORE_DIR, ".checkpoints"))
+texts = [c["text"] for c in comments_data]
+ids = [c["id"] for c in comments_data]
+metadatas = [{k: v for k, v in c.items() if k not in ("id", "text")} for c in comments_data]
+vectors = scheduler.embed(texts).tolist() if texts else []
+
+# ---------- Step 4: Append to (or create) the vector store ----------
+if appending:
+    try:
+        vectorstore = load_store(STORE_DIR, emb, writable=True)
+    except EmbeddingsMismatchError as e:
+        raise SystemExit(f"{e} Pass --full to rebuild with the new backend.")
+    # Edited comments come back with the same id; drop their old vectors.
+    stored = set(vectorstore.index_to_docstore_id.values())
+    edited = [i for i in harvested_ids if i in stored]
+    if edited:
+        vectorstore.delete(edited)
+    if bumped:
+        vectorstore.docstore.update_metadata({i: {"occurrences": n} for i, n in bumped.items()})
+    if ids:
+        vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+    print(f"Appending {len(ids)} comments ({len(edited)} edited ones replaced)")
+else:
+    vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), emb, metadatas=metadatas, ids=ids)
 
-# ---------- Step 3: Save vector store ----------
 os.makedirs("vectorstores", exist_ok=True)
-vectorstore.save_local("vectorstores/pr_comments_store")
-print("PR comment embedding store saved at vectorstores/pr_comments_store")
+save_store(vectorstore, STORE_DIR, args.index_type, args.compression,
+           nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+# Advance the cursors only once the comments are safely stored.
+minhash.save(STORE_DIR)
+update_meta(STORE_DIR, harvest=cursors)
+scheduler.clear_checkpoints()
+print(f"PR comment embedding store saved at {STORE_DIR} ({len(vectorstore.index_to_docstore_id)} comments)")
+if has_store(args.code_store):
+    # The code chunks' precomputed comment hits are stale now.
+    graph = refresh_neighbour_graph(args.code_store, STORE_DIR, emb, hybrid=HYBRID)
+    if graph is not None:
+        print(f"Neighbour graph of {args.code_store} refreshed ({len(graph.doc_ids)} chunks)")
+stats = cache_stats(emb)
+if stats:
+    print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses (embedded)")
@@ -1,12 +1,32 @@
 # scripts/build_vectorstore.py
 
-import glob
-import ast
+import argparse
 import os
+import shutil
+import sys
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 
+# Make `codewise` importable when this file is run directly as a script.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from codewise.indexing.chunker import chunk_source
+from codewise.indexing.embedding_scheduler import DEFAULT_BATCH_TOKENS, DEFAULT_CONCURRENCY, EmbeddingScheduler
+from codewise.indexing.git_delta import changed_python_files, head_commit, is_dirty
+from codewise.indexing.manifest import ChunkManifest, vector_id
+from codewise.indexing.scanner import default_workers, iter_documents, list_python_files, scan_repo
+from codewise.indexing.shards import DEFAULT_SHARD_SIZE, SHARD_DIR, ShardWriter, merge_shards
+from codewise.indexing.symbol_graph import save_symbol_graph
+from codewise.retriever.embedding_cache import cache_stats
+from codewise.retriever.embeddings import BACKENDS, backend_id, get_embeddings
+from codewise.retriever.index_factory import COMPRESSIONS, INDEX_TYPES
+from codewise.retriever.lexical import build_lexical_index
+from codewise.retriever.neighbours import refresh_neighbour_graph
+from codewise.retriever.partitions import build_partitions
+from codewise.retriever.settings import HYBRID
+from codewise.retriever.store import convert_index, has_store, load_store, save_store
+from codewise.retriever.store_meta import load_meta, update_meta
+
 load_dotenv()
 
 
@@ -14,29 +34,23 @@ load_dotenv()
 
 def extract_functions(source_code):
     """
-    Extract function and class definitions from source code.
-    Returns a list of dicts: {'name': ..., 'code': ...}
+    Extract function, method and class-header chunks from source code.
+    Returns a list of dicts: {'name': ..., 'qualname': ..., 'kind': ..., 'parent': ..., 'code': ...}
+    See `codewise.indexing.chunker.chunk_source` for the chunking rules.
     """
-    items = []
-    try:
-        tree = ast.parse(source_code)
-    except SyntaxError:
-        return items  # return empty list if parsing fails
-
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-            start = getattr(node, "lineno", 0)
-            end = getattr(node, "end_lineno", start)
-            name = getattr(node, "name", "<anon>")
-            code_lines = source_code.splitlines()
-            code = "\n".join(code_lines[start-1:end])
-            items.append({"name": name, "code": code})
-    return items
+    return chunk_source(source_code)
 
-# ---------- MAIN SCRIPT ----------
+def collect_documents(repo_root, workers=1):
+    """
+    Read every Python file under `repo_root` and split it into chunks.
+    With workers > 1 files are parsed in a process pool; the document order is
+    the same as a serial scan.
+    """
+    return scan_repo(repo_root, workers=workers)
 
-def main():
-    # Try to auto-discover the Flask package directory inside the repository.
+
+def find_repo_root():
+    """Auto-discover the Flask package directory inside the repository."""
     # Common layout: <repo>/data/flask/src/flask
     from pathlib import Path
     script_dir = Path(__file__).resolve().parent
@@ -64,50 +78,314 @@ def main():
     if repo_root is None:
         # Last resort: use a relative default and let the later check fail clearly
         repo_root = "data/flask/src/flask"
-    vectorstore_output = "vectorstores/flask_store"
-    os.makedirs(vectorstore_output, exist_ok=True)
+    return repo_root
 
-    print("Scanning Python files in:", repo_root)
-    documents = []
-
-    for path in glob.glob(f"{repo_root}/**/*.py", recursive=True):
-        with open(path, "r", encoding="utf-8") as f:
-            text = f.read()
-
-        funcs = extract_functions(text)
-        if funcs:
-            for func in funcs:
-                documents.append({
-                    "text": func["code"],
-                    "source": path,
-                    "name": func["name"]
-                })
-        else:
-            # fallback: use full file if no functions/classes
-            documents.append({
-                "text": text,
-                "source": path,
-                "name": None
-            })
-
-    print(f"Total documents/chunks to embed: {len(documents)}")
-    if len(documents) == 0:
-        raise SystemExit(
-            f"No Python files found under {repo_root}.\n"
-            "Please set `repo_root` to the correct package path or place the repository at the expected layout."
-        )
+
+def create_embeddings(backend=None):
+    """Embeddings client for `backend` (default: EMBEDDINGS_BACKEND, else OpenAI; needs OPENAI_API_KEY)."""
+    embeddings = get_embeddings(backend)
+    print(f"Creating embeddings using {backend_id(embeddings)}...")
+    return embeddings
+
+
+def update_vectorstore(documents, repo_root, vectorstore_output, full=False,
+                       batch_tokens=DEFAULT_BATCH_TOKENS, concurrency=DEFAULT_CONCURRENCY, embeddings=None,
+                       scope=None, commit=None, index_type=None, index_params=None):
+    """
+    Bring the store at `vectorstore_output` in line with `documents`.
+
+    Only chunks whose (path, name, content hash) key is missing from the
+    manifest are embedded; vectors of chunks that disappeared are deleted and
+    everything else is left untouched. Falls back to a full build when there is
+    no usable manifest or store yet, when `full` is set, or when the store was
+    embedded with a different backend than `embeddings`.
+
+    New chunks are embedded by an EmbeddingScheduler (token-bounded concurrent
+    batches, 429 backoff) that checkpoints into `<output>/.checkpoints`, so an
+    interrupted run picks up where it stopped.
+
+    With `scope` (a set of paths relative to `repo_root`), `documents` only
+    cover those files and the rest of the store is not touched. `commit` is
+    recorded in the store metadata as the commit the index reflects.
+
+    `index_type` ("auto", "flat", "ivf-flat", "ivf-pq", "hnsw"; None keeps the
+    store's current setting) and `index_params` (compression / nlist / pq_m /
+    hnsw_m) pick the FAISS index the store is saved with, see
+    `store.convert_index`.
+    """
+    index_params = index_params or {}
+    embeddings = embeddings or create_embeddings()
+    keys = ChunkManifest.keys_for(documents, repo_root)
+    manifest = None if full else ChunkManifest.load(vectorstore_output)
+    incremental = manifest is not None and has_store(vectorstore_output)
+    recorded = load_meta(vectorstore_output).get("embeddings")
+    if incremental and recorded and recorded != backend_id(embeddings):
+        if scope is not None:
+            raise SystemExit(f"Store was embedded with {recorded}; run a full build to switch backends.")
+        print(f"Store was embedded with {recorded}, switching to {backend_id(embeddings)}.")
+        incremental = False
+    if not incremental:
+        if scope is not None:
+            raise ValueError("A scoped update needs an existing store and manifest.")
+        print("No manifest found (or --full given); embedding every chunk.")
+        manifest = ChunkManifest()
+
+    added, removed, unchanged = manifest.plan(keys, scope)
+    print(f"Chunks: {len(added)} new/changed, {len(removed)} removed, {len(unchanged)} unchanged")
+
+    if incremental and not added and not removed:
+        print("Vector store is up to date; nothing to embed.")
+        current = load_meta(vectorstore_output).get("index", {})
+        compression = index_params.get("compression")
+        if (index_type and index_type != current.get("requested")) or \
+                (compression and compression != (current.get("compression") or "none")):
+            print(f"Re-indexing as {index_type or current.get('requested', 'flat')} "
+                  f"({compression or 'no'} compression)...")
+            convert_index(vectorstore_output, index_type, **index_params)
+        _save_symbols(repo_root, vectorstore_output)
+        update_meta(vectorstore_output, commit=commit)
+        return
 
     # ---------- CREATE EMBEDDINGS ----------
-    print("Creating embeddings using OpenAIEmbeddings...")
-    embeddings = OpenAIEmbeddings()  # make sure OPENAI_API_KEY is set
+    by_key = dict(zip(keys, documents))
+    new_docs = [by_key[k] for k in added]
+    new_meta = [{k: v for k, v in d.items() if k != "text"} for d in new_docs]
+    new_ids = [vector_id(k) for k in added]
+
+    scheduler = EmbeddingScheduler(
+        embeddings,
+        max_batch_tokens=batch_tokens,
+        concurrency=concurrency,
+        checkpoint_dir=os.path.join(vectorstore_output, ".checkpoints"),
+    )
+    texts = [d["text"] for d in new_docs]
+    vectors = scheduler.embed(texts).tolist() if texts else []
+    if scheduler.resumed_batches:
+        print(f"Resumed {scheduler.resumed_batches} batches from checkpoints")
+    if scheduler.rate_limited:
+        print(f"Backed off {scheduler.rate_limited} times on rate limits")
 
-    # ---------- BUILD FAISS VECTOR STORE ----------
-    print("Building FAISS vector store...")
-    vectorstore = FAISS.from_texts([d["text"] for d in documents], embeddings, metadatas=documents)
+    # ---------- BUILD / UPDATE FAISS VECTOR STORE ----------
+    if not incremental:
+        print("Building FAISS vector store...")
+        vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=new_meta, ids=new_ids)
+    else:
+        print("Updating FAISS vector store in place...")
+        vectorstore = load_store(vectorstore_output, embeddings, writable=True)
+        if removed:
+            vectorstore.delete([manifest.entries[k] for k in removed])
+        if new_docs:
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=new_meta, ids=new_ids)
+
+    for k in removed:
+        del manifest.entries[k]
+    for k, vid in zip(added, new_ids):
+        manifest.entries[k] = vid
 
     # ---------- SAVE VECTOR STORE ----------
-    vectorstore.save_local(vectorstore_output)
-    print(f"Vector store saved at {vectorstore_output}")
+    save_store(vectorstore, vectorstore_output, index_type, **index_params)
+    manifest.save(vectorstore_output)
+    _save_symbols(repo_root, vectorstore_output)
+    update_meta(vectorstore_output, commit=commit)
+    scheduler.clear_checkpoints()
+    print(f"Vector store saved at {vectorstore_output} ({_describe_index(vectorstore_output)})")
+    stats = cache_stats(embeddings)
+    if stats:
+        print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses (embedded)")
+
+
+def stream_build(repo_root, vectorstore_output, workers=1, shard_size=DEFAULT_SHARD_SIZE,
+                 batch_tokens=DEFAULT_BATCH_TOKENS, concurrency=DEFAULT_CONCURRENCY, embeddings=None,
+                 index_type=None, index_params=None):
+    """
+    Full rebuild with bounded memory.
+
+    Chunks flow from the scanner through the embedding scheduler into
+    fixed-size index shards under `<output>/shards`; only one shard's worth of
+    documents and vectors is in memory at a time. The shards are merged into
+    `index.faiss` / `docstore.sqlite` at the end (the vectors are streamed to
+    disk) and then converted to `index_type` from the memory-mapped vectors;
+    the BM25 index is built from the docstore last.
+    """
+    embeddings = embeddings or create_embeddings()
+    scheduler = EmbeddingScheduler(
+        embeddings,
+        max_batch_tokens=batch_tokens,
+        concurrency=concurrency,
+        checkpoint_dir=os.path.join(vectorstore_output, ".checkpoints"),
+    )
+    writer = ShardWriter(os.path.join(vectorstore_output, SHARD_DIR), shard_size)
+    manifest = ChunkManifest()
+    seen = {}
+    done = 0
+
+    def flush(batch):
+        nonlocal done
+        keys = ChunkManifest.keys_for(batch, repo_root, seen)
+        ids = [vector_id(k) for k in keys]
+        vectors = scheduler.embed([d["text"] for d in batch])
+        records = [
+            {"id": vid, "page_content": d["text"], "metadata": {k: v for k, v in d.items() if k != "text"}}
+            for vid, d in zip(ids, batch)
+        ]
+        writer.add(records, vectors)
+        manifest.entries.update(zip(keys, ids))
+        done += len(batch)
+        print(f"  embedded {done} chunks")
+
+    batch = []
+    for doc in iter_documents(list_python_files(repo_root), workers=workers):
+        batch.append(doc)
+        if len(batch) >= shard_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    shards = writer.close()
+    if not shards:
+        raise SystemExit(f"No Python files found under {repo_root}.")
+    print(f"Merging {len(shards)} shards ({writer.total} vectors)...")
+    merge_shards(shards, vectorstore_output, writer.dim, writer.total)
+    shutil.rmtree(writer.shard_dir)
+    convert_index(vectorstore_output, index_type, **(index_params or {}))
+    build_lexical_index(vectorstore_output)
+    build_partitions(vectorstore_output)  # rows are in scan order, i.e. grouped by path
+    _save_symbols(repo_root, vectorstore_output, workers)
+    manifest.save(vectorstore_output)
+    update_meta(vectorstore_output, commit=head_commit(repo_root), embeddings=backend_id(embeddings))
+    scheduler.clear_checkpoints()
+    print(f"Vector store saved at {vectorstore_output} ({_describe_index(vectorstore_output)})")
+
+
+def _save_symbols(repo_root, vectorstore_output, workers=1):
+    """
+    Rewrite the symbol / call graph (`symbols.json`) from the whole tree.
+
+    Parsing without embedding is cheap, so even scoped updates rebuild it
+    rather than patching edges whose callers live in unchanged files.
+    """
+    graph = save_symbol_graph(repo_root, vectorstore_output, workers=workers)
+    edges = sum(len(v) for v in graph["callees"].values())
+    print(f"Symbol graph: {len(graph['symbols'])} symbols, {edges} call edges")
+
+
+def _save_neighbours(vectorstore_output, comments_store, embeddings):
+    """
+    Precompute every chunk's code and PR comment hits (`neighbours.npz`) so
+    reviews of already indexed functions skip the search. Needs the PR
+    comment store; kept as is when neither store changed.
+    """
+    graph = refresh_neighbour_graph(vectorstore_output, comments_store, embeddings, hybrid=HYBRID)
+    if graph is None:
+        print(f"No neighbour graph: needs the PR comment store at {comments_store} (and a SQLite docstore).")
+    else:
+        print(f"Neighbour graph: top {graph.k} code and comment hits for {len(graph.doc_ids)} chunks")
+
+
+def _describe_index(vectorstore_output):
+    params = load_meta(vectorstore_output).get("index", {})
+    extra = ", ".join(f"{k}={v}" for k, v in sorted(params.items())
+                      if k not in ("index_type", "requested") and v is not None)
+    return params.get("index_type", "flat") + (f": {extra}" if extra else "")
+
+
+def git_update(repo_root, vectorstore_output, workers=1, **kwargs):
+    """
+    Re-chunk only the files touched since the commit the index was built from.
+
+    Uses `git diff --name-status <indexed_sha>..HEAD`. Falls back to a regular
+    manifest-based update (full scan, still embedding only changed chunks)
+    when the store has no recorded commit or the diff can't be computed.
+    Files are read from the working tree.
+    """
+    indexed = load_meta(vectorstore_output).get("commit")
+    head = head_commit(repo_root)
+    if head is None:
+        raise SystemExit(f"--update needs a git checkout; {repo_root} is not inside one.")
+    if is_dirty(repo_root):
+        print("Warning: uncommitted changes are not part of the git diff; run without --update to pick them up.")
+
+    delta = changed_python_files(repo_root, indexed) if indexed else None
+    if delta is None or ChunkManifest.load(vectorstore_output) is None:
+        print("No usable indexed commit; falling back to a full scan.")
+        documents = collect_documents(repo_root, workers=workers)
+        update_vectorstore(documents, repo_root, vectorstore_output, commit=head, **kwargs)
+        return
+
+    changed, deleted = delta
+    print(f"Index is at {indexed[:12]}, HEAD is {head[:12]}: "
+          f"{len(changed)} changed and {len(deleted)} deleted Python files")
+    scope = {os.path.relpath(p, repo_root) for p in changed + deleted}
+    documents = list(iter_documents([p for p in changed if os.path.exists(p)], workers=workers))
+    update_vectorstore(documents, repo_root, vectorstore_output, scope=scope, commit=head, **kwargs)
+
+
+# ---------- MAIN SCRIPT ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or incrementally update the code vectorstore.")
+    parser.add_argument("--repo-root", help="Package directory to index (auto-discovered by default).")
+    parser.add_argument("--output", default="vectorstores/flask_store", help="Vectorstore directory.")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-embed every chunk.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to read, parse and chunk files (1 = serial, 0 = one per spare core).")
+    parser.add_argument("--batch-tokens", type=int, default=DEFAULT_BATCH_TOKENS,
+                        help="Approximate token budget of one embeddings request.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum embeddings requests in flight (halved on rate limits).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Full rebuild that streams chunks into on-disk shards (bounded memory).")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="Documents per shard in --stream mode.")
+    parser.add_argument("--update", action="store_true",
+                        help="Only re-chunk files changed (git diff) since the commit the index was built from.")
+    parser.add_argument("--embeddings", choices=sorted(BACKENDS),
+                        help="Embeddings backend (default: EMBEDDINGS_BACKEND, else openai). 'local' runs offline.")
+    parser.add_argument("--index-type", choices=INDEX_TYPES,
+                        help="FAISS index to build; 'auto' picks by vector count (default: keep the store's "
+                             "current type, flat for new stores).")
+    parser.add_argument("--compression", choices=COMPRESSIONS,
+                        help="Store vectors as fp16, 8-bit scalar-quantized (sq8) or product-quantized (pq) codes.")
+    parser.add_argument("--nlist", type=int, help="Inverted lists for IVF indexes (default ~4*sqrt(n)).")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers / bytes per vector (must divide the dimension).")
+    parser.add_argument("--hnsw-m", type=int, help="Graph neighbours per node for hnsw (default 32).")
+    parser.add_argument("--comments-store", default="vectorstores/pr_comments_store",
+                        help="PR comment store the precomputed neighbours (neighbours.npz) are searched in.")
+    args = parser.parse_args()
+    build_options = {
+        "embeddings": create_embeddings(args.embeddings),
+        "index_type": args.index_type,
+        "index_params": {"compression": args.compression, "nlist": args.nlist, "pq_m": args.pq_m, "hnsw_m": args.hnsw_m},
+    }
+
+    repo_root = args.repo_root or find_repo_root()
+    vectorstore_output = args.output
+    os.makedirs(vectorstore_output, exist_ok=True)
+
+    print("Scanning Python files in:", repo_root)
+    workers = args.workers if args.workers > 0 else default_workers()
+    if args.stream:
+        stream_build(repo_root, vectorstore_output, workers=workers, shard_size=args.shard_size,
+                     batch_tokens=args.batch_tokens, concurrency=args.concurrency, **build_options)
+    elif args.update:
+        git_update(repo_root, vectorstore_output, workers=workers,
+                   batch_tokens=args.batch_tokens, concurrency=args.concurrency, **build_options)
+    else:
+        documents = collect_documents(repo_root, workers=workers)
+
+        print(f"Total documents/chunks found: {len(documents)}")
+        if len(documents) == 0:
+            raise SystemExit(
+                f"No Python files found under {repo_root}.\n"
+                "Please set `repo_root` to the correct package path or place the repository at the "
+                "expected layout."
+            )
+
+        update_vectorstore(documents, repo_root, vectorstore_output, full=args.full,
+                           batch_tokens=args.batch_tokens, concurrency=args.concurrency,
+                           commit=head_commit(repo_root), **build_options)
+    _save_neighbours(vectorstore_output, args.comments_store, build_options["embeddings"])
 
 if __name__ == "__main__":
     main()
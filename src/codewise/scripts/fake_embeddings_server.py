@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI embeddings endpoint, for exercising the build
+scripts and the embedding scheduler without network access or API spend.
+
+Vectors are deterministic (seeded by the text's hash). With --rate-limit-every N
+every Nth request is answered with HTTP 429 to exercise the backoff path.
+
+Usage:
+  python src/codewise/scripts/fake_embeddings_server.py --port 8765
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake \\
+      python src/codewise/scripts/build_vectorstore.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def make_server(port: int = 0, dim: int = 1536, rate_limit_every: int = 0) -> ThreadingHTTPServer:
+    """Create (but don't start) the server; port 0 picks a free port."""
+    state = {"requests": 0, "inputs": 0, "rate_limited": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            with lock:
+                state["requests"] += 1
+                throttle = rate_limit_every and state["requests"] % rate_limit_every == 0
+                if throttle:
+                    state["rate_limited"] += 1
+            if throttle:
+                self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            {"retry-after": "0.05"})
+                return
+
+            inputs = body.get("input", [])
+            if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            with lock:
+                state["inputs"] += len(inputs)
+            data = []
+            for i, text in enumerate(inputs):
+                vec = fake_vector(text if isinstance(text, str) else json.dumps(text), dim)
+                if body.get("encoding_format") == "base64":
+                    emb = base64.b64encode(vec.tobytes()).decode("ascii")
+                else:
+                    emb = vec.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": emb})
+            self._reply(200, {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "fake"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+
+        def _reply(self, status, payload, headers=None):
+            raw = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.stats = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.dim, args.rate_limit_every)
+    print(f"Fake embeddings server on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
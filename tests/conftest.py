@@ -0,0 +1,34 @@
+import sys
+import os
+from collections import Counter
+from unittest import mock
+
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.retriever import retriever_client
+
+# Every global RetrievalDaemon.load() / _ensure_stores_loaded() can set.
+LOADED_STATE = ("code_store", "comments_store", "code_lexical", "comments_lexical", "code_partitions",
+                "comments_partitions", "neighbour_graph", "symbol_graph", "embeddings", "retrieval_cache")
+# Settings a test may override; restored along with the loaded state.
+SETTINGS = ("CODE_STORE_PATH", "COMMENTS_STORE_PATH", "RETRIEVAL_CACHE_PATH", "HYBRID", "NEIGHBOUR_GRAPH",
+            "CONTEXT_PACKING", "COMMENT_TYPE", "NPROBE", "EF_SEARCH")
+
+
+@pytest.fixture
+def retriever_globals():
+    """
+    A fresh `retriever_client` for one test: nothing loaded, no daemon, no
+    on-disk retrieval cache, global scope, empty stats. Tests point it at their
+    stores by assigning the module globals (e.g. in setUp); every global is
+    restored afterwards, so no loaded store or setting leaks into other tests.
+    """
+    patches = mock.patch.multiple(
+        retriever_client, USE_DAEMON=False, RETRIEVAL_CACHE=False, SCOPE="global", search_stats=Counter(),
+        pack_stats=Counter(), **{name: None for name in LOADED_STATE},
+        **{name: getattr(retriever_client, name) for name in SETTINGS})
+    with patches, mock.patch.dict(os.environ, {"DISABLE_RETRIEVER": "0"}):
+        yield retriever_client
@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+import textwrap
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.indexing.chunker import chunk_source
+from codewise.indexing.scanner import scan_repo
+
+SOURCE = textwrap.dedent('''
+    import os
+
+    def helper(x):
+        def inner():
+            return x
+        return inner()
+
+    class Greeter:
+        """Says hello."""
+        greeting = "hi"
+
+        @property
+        def name(self):
+            return "world"
+
+        def greet(self):
+            return f"{self.greeting} {self.name}"
+''')
+
+
+class TestChunker(unittest.TestCase):
+
+    def test_methods_are_chunked_once_with_parent(self):
+        chunks = {c["qualname"]: c for c in chunk_source(SOURCE)}
+        self.assertEqual(set(chunks), {"helper", "Greeter", "Greeter.name", "Greeter.greet"})
+        self.assertEqual(chunks["Greeter.greet"]["parent"], "Greeter")
+        self.assertEqual(chunks["Greeter.greet"]["kind"], "method")
+        self.assertTrue(chunks["Greeter.name"]["code"].lstrip().startswith("@property"))
+
+    def test_class_header_leaves_out_method_bodies(self):
+        header = next(c for c in chunk_source(SOURCE) if c["kind"] == "class")["code"]
+        self.assertIn('"""Says hello."""', header)
+        self.assertIn('greeting = "hi"', header)
+        self.assertIn("def greet(self):", header)
+        self.assertNotIn("return f", header)
+
+    def test_class_header_keeps_one_line_methods_and_collapses_guarded_ones(self):
+        source = textwrap.dedent('''
+            class Config:
+                @staticmethod
+                def default(): return {}
+
+                if sys.version_info >= (3, 11):
+                    def load(self, path):
+                        return tomllib.load(path)
+                else:
+                    def load(self, path):
+                        return toml.load(path)
+        ''')
+        chunks = chunk_source(source)
+        header = next(c for c in chunks if c["kind"] == "class")["code"]
+        self.assertIn("@staticmethod\n    def default(): return {}", header)
+        self.assertIn("if sys.version_info >= (3, 11):\n        def load(self, path):\n            ...", header)
+        self.assertIn("else:\n        def load(self, path):\n            ...", header)
+        self.assertNotIn("tomllib.load", header)
+        self.assertEqual([c["qualname"] for c in chunks],
+                         ["Config", "Config.default", "Config.load", "Config.load"])
+
+    def test_class_header_keeps_bodies_on_a_multi_line_signature(self):
+        source = textwrap.dedent('''
+            class Point:
+                def move(self, dx,
+                         dy): return Point(self.x + dx, self.y + dy)
+
+                def scale(self,
+                          factor):
+                    return Point(self.x * factor, self.y * factor)
+        ''')
+        header = chunk_source(source)[0]["code"]
+        self.assertIn("def move(self, dx,\n             dy): return Point(self.x + dx, self.y + dy)", header)
+        self.assertIn("def scale(self,\n              factor):\n        ...", header)
+        self.assertNotIn("self.x * factor", header)
+
+    def test_class_header_keeps_nested_class_decorators_and_signature(self):
+        source = textwrap.dedent('''
+            class Model:
+                @dataclass(frozen=True)
+                class Meta(Base,
+                           Mixin):
+                    table = "model"
+
+                class Empty(Exception): pass
+        ''')
+        header = chunk_source(source)[0]["code"]
+        self.assertIn("    @dataclass(frozen=True)\n    class Meta(Base,\n               Mixin):\n        ...", header)
+        self.assertNotIn('table = "model"', header)
+        self.assertTrue(header.endswith("    class Empty(Exception): pass"))
+
+    def test_nested_functions_stay_in_enclosing_chunk(self):
+        chunks = chunk_source(SOURCE)
+        self.assertNotIn("inner", [c["name"] for c in chunks])
+        self.assertIn("def inner():", chunks[0]["code"])
+
+    def test_syntax_error_returns_empty(self):
+        self.assertEqual(chunk_source("def broken(:"), [])
+
+
+class TestScanner(unittest.TestCase):
+
+    def test_parallel_scan_matches_serial_order(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(6):
+                os.makedirs(os.path.join(tmp, f"pkg{i}"))
+                with open(os.path.join(tmp, f"pkg{i}", "mod.py"), "w") as f:
+                    f.write(SOURCE.replace("helper", f"helper{i}"))
+            serial = scan_repo(tmp, workers=1)
+            self.assertEqual(len(serial), 24)
+            self.assertEqual(scan_repo(tmp, workers=2), serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
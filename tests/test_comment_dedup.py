@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.indexing.comment_dedup import MinHashIndex, drop_bot_comments, lsh_clusters, minhash_signatures
+
+SUGGESTION = ("Please use a context manager here so the file handle is closed even when the "
+              "request fails halfway through streaming the response body to the client.")
+
+
+def rec(i, text, author="dev"):
+    return {"id": f"c{i}", "text": text, "author": author}
+
+
+class TestCommentDedup(unittest.TestCase):
+
+    def test_near_duplicates_share_a_cluster(self):
+        texts = [SUGGESTION, SUGGESTION.upper() + " Thanks!", "LGTM", "lgtm!",
+                 "Why does this need a lock? The registry is only written during setup."]
+        labels = lsh_clusters(minhash_signatures(texts)).tolist()
+        self.assertEqual(labels[0], labels[1])
+        self.assertEqual(labels[2], labels[3])
+        self.assertEqual(len(set(labels)), 3)
+
+    def test_bots_are_dropped(self):
+        kept, dropped = drop_bot_comments([rec(1, "x", "codecov[bot]"), rec(2, "y", "pre-commit-ci"), rec(3, "z")])
+        self.assertEqual(([r["id"] for r in kept], dropped), (["c3"], 2))
+
+    def test_representatives_and_counts_across_runs(self):
+        index = MinHashIndex()
+        reps, bumped = index.add([rec(1, "LGTM"), rec(2, SUGGESTION), rec(3, "lgtm!!")])
+        self.assertEqual(sorted((r["id"], r["occurrences"]) for r in reps), [("c2", 1), ("c3", 2)])
+        self.assertEqual(bumped, {})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            index = MinHashIndex.load(tmp)
+        reps, bumped = index.add([rec(4, "LGTM 👍"), rec(5, "Could this be a classmethod instead?")])
+        self.assertEqual([r["id"] for r in reps], ["c5"])
+        self.assertEqual(bumped, {"c3": 3})
+        self.assertEqual(len(index), 3)
+
+    def test_edits_keep_occurrences(self):
+        index = MinHashIndex()
+        index.add([rec(1, "LGTM"), rec(2, "lgtm!!"), rec(3, SUGGESTION)])
+        with tempfile.TemporaryDirectory() as tmp:
+            index.save(tmp)
+            index = MinHashIndex.load(tmp)
+
+        # c2 represents {c1, c2}; both are edited and harvested again.
+        reps, bumped = index.add([rec(1, "LGTM."), rec(2, "lgtm!!!")])
+        self.assertEqual([(r["id"], r["text"], r["occurrences"]) for r in reps], [("c2", "lgtm!!!", 2)])
+        self.assertEqual(bumped, {})
+        reps, bumped = index.add([rec(2, "lgtm!!!"), rec(4, "LGTM 👍")])
+        self.assertEqual([(r["id"], r["occurrences"]) for r in reps], [("c2", 3)])
+        self.assertEqual(bumped, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
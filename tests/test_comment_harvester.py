@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.indexing.comment_harvester import harvest_comments
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def review(cid, minutes, body="looks off", pr=7):
+    return SimpleNamespace(id=cid, body=body, path="src/app.py", user=SimpleNamespace(login="dev"),
+                           updated_at=T0 + timedelta(minutes=minutes),
+                           pull_request_url=f"https://api.github.com/repos/o/r/pulls/{pr}")
+
+
+def issue(cid, minutes, kind="pull"):
+    return SimpleNamespace(id=cid, body="please add a test", user=None,
+                           updated_at=T0 + timedelta(minutes=minutes),
+                           html_url=f"https://github.com/o/r/{kind}/3#issuecomment-{cid}",
+                           issue_url="https://api.github.com/repos/o/r/issues/3")
+
+
+class FakeRepo:
+    """Repo-level comment listings with GitHub's inclusive `since` filter."""
+
+    full_name = "o/r"
+
+    def __init__(self):
+        self.reviews, self.issues, self.calls = [], [], []
+
+    def _list(self, items, since=None, **kwargs):
+        self.calls.append(since)
+        return sorted((c for c in items if since is None or c.updated_at >= since), key=lambda c: c.updated_at)
+
+    def get_pulls_review_comments(self, **kwargs):
+        return self._list(self.reviews, **kwargs)
+
+    def get_issues_comments(self, **kwargs):
+        return self._list(self.issues, **kwargs)
+
+
+class TestCommentHarvester(unittest.TestCase):
+
+    def test_cursor_advances_and_skips_seen_comments(self):
+        repo = FakeRepo()
+        repo.reviews = [review(1, 0), review(2, 5), review(3, 5, body="  ")]
+        repo.issues = [issue(10, 1), issue(11, 2, kind="issues")]
+
+        records, cursors = harvest_comments(repo)
+        self.assertEqual(sorted(r["id"] for r in records), ["issue_comment:10", "review_comment:1", "review_comment:2"])
+        first = next(r for r in records if r["id"] == "review_comment:1")
+        self.assertEqual((first["pr"], first["file"], first["author"]), (7, "src/app.py", "dev"))
+        self.assertEqual(cursors["review_comment"], {"since": (T0 + timedelta(minutes=5)).isoformat(), "ids": [2, 3]})
+
+        # Nothing new: the boundary comments returned by the inclusive `since` are skipped.
+        records, cursors = harvest_comments(repo, cursors)
+        self.assertEqual(records, [])
+        self.assertEqual(repo.calls[-1], T0 + timedelta(minutes=2))
+
+        # A new comment and an edit to an old one are both picked up.
+        repo.reviews[0] = review(1, 9, body="edited")
+        repo.reviews.append(review(4, 8))
+        records, cursors = harvest_comments(repo, cursors)
+        self.assertEqual([(r["id"], r["text"]) for r in records],
+                         [("review_comment:4", "looks off"), ("review_comment:1", "edited")])
+        self.assertEqual(cursors["review_comment"]["ids"], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
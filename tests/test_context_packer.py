@@ -0,0 +1,151 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from codewise.retriever import retriever_client
+from codewise.retriever.context_packer import TRUNCATION_MARKER, ContextPacker, count_tokens, mmr
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.neighbours import build_neighbour_graph
+from codewise.retriever.store import save_store
+
+SNIPPET = "def send_file(path, mimetype):\n    return open_file(path, mimetype)"
+SEND_FILE = "def send_file(path, mimetype=None):\n    fp = open_file(path)\n    return Response(fp, mimetype)"
+BIG_CLASS = "class Flask:\n" + "".join(f"    def send_file_{i}(self, path, mimetype):\n        return open_file(path)\n"
+                                      for i in range(200))
+UNRELATED = "Please bump the copyright year in the licence header."
+
+
+def docs(*texts):
+    return [Document(id=f"{t[:12]}-{i}", page_content=t, metadata={"i": i}) for i, t in enumerate(texts)]
+
+
+class TestContextPacker(unittest.TestCase):
+
+    def setUp(self):
+        self.packer = ContextPacker(budget=400, min_score=0.2)
+        self.emb = LocalHashEmbeddings(dimensions=256)
+
+    def pack(self, matches, query=SNIPPET):
+        """Pack one node's matches with the vectors a store would hold for them."""
+        hits = [d for code, comments in matches for d in (*code, *comments)]
+        hit_vectors = dict(zip([d.id for d in hits], self.emb.embed_documents([d.page_content for d in hits])))
+        query_vector = self.emb.embed_query(query) if query else None
+        return self.packer.pack(matches, [query_vector], hit_vectors)
+
+    def test_mmr_prefers_diverse_hits_and_drops_copies(self):
+        query = np.array([1.0, 0.0, 0.0])
+        near = np.array([0.9, 0.436, 0.0])
+        other = np.array([0.8, 0.0, 0.6])
+        order, duplicates = mmr(query, np.stack([near, near, other]), lambda_mult=0.5)
+        self.assertEqual((order, duplicates), ([0, 2], [1]))
+
+    def test_cut_off_budget_and_truncation(self):
+        code, comments = docs(SEND_FILE, SEND_FILE, BIG_CLASS), docs(UNRELATED, "Close the file opened by open_file.")
+        (kept_code, kept_comments), = self.pack([(code, comments)])
+        stats = self.packer.stats
+
+        self.assertEqual(kept_code[0].page_content, SEND_FILE)
+        self.assertEqual(stats["duplicate"], 1)
+        self.assertEqual([d.page_content for d in kept_comments], ["Close the file opened by open_file."])
+        self.assertEqual(stats["below_min_score"], 1)
+
+        big = kept_code[1]
+        self.assertTrue(big.metadata["truncated"])
+        self.assertEqual(big.id, code[2].id)
+        self.assertTrue(big.page_content.endswith(TRUNCATION_MARKER))
+        self.assertTrue(BIG_CLASS.startswith(big.page_content[:-len(TRUNCATION_MARKER)]))
+        packed = sum(count_tokens(d.page_content) for d in (*kept_code, *kept_comments))
+        self.assertEqual(stats["packed_tokens"], packed)
+        self.assertLessEqual(packed, 400)
+        self.assertEqual(stats["retrieved_tokens"],
+                         sum(count_tokens(d.page_content) for d in (*code, *comments)))
+
+    def test_hits_that_do_not_fit_are_skipped(self):
+        self.packer.budget = 40
+        comment = "Close the file opened by open_file."
+        (kept_code, kept_comments), = self.pack([(docs(BIG_CLASS), docs(comment))])
+        self.assertEqual((kept_code, [d.page_content for d in kept_comments]), ([], [comment]))
+        self.assertEqual(self.packer.stats["over_budget"], 1)
+
+    def test_without_query_vector_keeps_retrieval_order(self):
+        code, comments = docs(UNRELATED, SEND_FILE, SEND_FILE), docs(UNRELATED)
+        (kept_code, kept_comments), = self.pack([(code, comments)], query=None)
+        self.assertEqual([d.page_content for d in kept_code], [UNRELATED, SEND_FILE])
+        self.assertEqual([d.page_content for d in kept_comments], [UNRELATED])  # no score to cut on
+        self.assertEqual((self.packer.stats["unscored"], self.packer.stats["duplicate"]), (1, 1))
+
+    def test_hits_without_stored_vectors_keep_retrieval_order(self):
+        code, comments = docs(UNRELATED, SEND_FILE), docs("Close the file opened by open_file.")
+        hit_vectors = {d.id: self.emb.embed_query(d.page_content) for d in (code[1], *comments)}
+        (kept_code, kept_comments), = self.packer.pack([(code, comments)], [self.emb.embed_query(SNIPPET)],
+                                                       hit_vectors)
+        self.assertEqual(kept_code, code)  # not scored, so the unrelated hit isn't cut
+        self.assertEqual(kept_comments, comments)
+        self.assertEqual((self.packer.stats["missing_vectors"], self.packer.stats["below_min_score"]), (1, 0))
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    calls = 0
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        CountingEmbeddings.calls += 1
+        return super().embed_query(text)
+
+
+@pytest.mark.usefixtures("retriever_globals")
+class TestPackedRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.emb = CountingEmbeddings(dimensions=64)
+        code_dir, comments_dir = os.path.join(tmp.name, "code"), os.path.join(tmp.name, "comments")
+        save_store(FAISS.from_texts([SEND_FILE, "def url_for(endpoint):\n    return build(endpoint)"], self.emb,
+                                    metadatas=[{"source": "src/flask/helpers.py", "name": n}
+                                               for n in ("send_file", "url_for")]), code_dir)
+        save_store(FAISS.from_texts(["Close the file opened by open_file.", "url_for needs the endpoint name."],
+                                    self.emb), comments_dir)
+        build_neighbour_graph(code_dir, comments_dir, self.emb, k=2)
+        retriever_client.CODE_STORE_PATH, retriever_client.COMMENTS_STORE_PATH = code_dir, comments_dir
+        retriever_client.RETRIEVAL_CACHE_PATH = os.path.join(tmp.name, "cache.sqlite")
+        retriever_client.RETRIEVAL_CACHE = retriever_client.CONTEXT_PACKING = retriever_client.NEIGHBOUR_GRAPH = True
+        for patcher in (mock.patch("codewise.retriever.embeddings.get_embeddings", return_value=self.emb),
+                        mock.patch("codewise.retriever.lexical.CONFIDENT_SCORE", 0.1)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_packing_needs_no_embedding_calls(self):
+        retrieve = retriever_client.get_retrieval_contexts
+        first = retrieve([SNIPPET], top_k=1)  # dense search: the one embedding call
+        CountingEmbeddings.calls = 0
+        retriever_client.search_stats.clear()
+
+        lexical = retrieve(["url_for"], top_k=1)  # confident BM25 hits in both stores
+        precomputed = retrieve([SEND_FILE], top_k=2, node_names=["send_file"], file_paths=["src/flask/helpers.py"])
+        retriever_client.code_store = retriever_client.comments_store = retriever_client.retrieval_cache = None
+        self.assertEqual(retrieve([SNIPPET], top_k=1), first)  # a re-run: cached, packed as before
+
+        self.assertEqual(CountingEmbeddings.calls, 0)
+        stats = retriever_client.search_stats
+        self.assertEqual((stats["lexical_only"], stats["precomputed"]), (2, 1))
+        self.assertEqual(retriever_client.retrieval_cache.hits, 1)
+        self.assertIn("def url_for", lexical[0])
+        self.assertIn(SEND_FILE, precomputed[0])
+        self.assertGreater(retriever_client.pack_stats["nodes"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
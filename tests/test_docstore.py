@@ -0,0 +1,47 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from codewise.retriever.docstore import PositionMap, SQLiteDocstore
+from codewise.retriever.store import load_store, save_store
+
+
+class TestSQLiteDocstore(unittest.TestCase):
+
+    def setUp(self):
+        self.emb = DeterministicFakeEmbedding(size=8)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        texts = ["def a(): pass", "def b(): pass", "def c(): pass"]
+        store = FAISS.from_texts(texts, self.emb, metadatas=[{"name": t[4], "text": t} for t in texts],
+                                 ids=["a", "b", "c"])
+        save_store(store, self.tmp.name)
+
+    def test_lazy_load_fetches_documents_by_id(self):
+        store = load_store(self.tmp.name, self.emb)
+        self.assertIsInstance(store.docstore, SQLiteDocstore)
+        self.assertIsInstance(store.index_to_docstore_id, PositionMap)
+        hit = store.similarity_search("def b(): pass", k=1)[0]
+        self.assertEqual(hit.metadata, {"name": "b"})  # duplicated `text` is dropped
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "index.pkl")))
+
+    def test_in_place_update_rewrites_positions(self):
+        store = load_store(self.tmp.name, self.emb, writable=True)
+        store.delete(["a"])
+        store.add_texts(["def d(): pass"], metadatas=[{"name": "d"}], ids=["d"])
+        save_store(store, self.tmp.name)
+
+        store = load_store(self.tmp.name, self.emb)
+        self.assertEqual(list(store.index_to_docstore_id.values()), ["b", "c", "d"])
+        self.assertEqual(store.similarity_search("def d(): pass", k=1)[0].metadata["name"], "d")
+        self.assertEqual(store.docstore.search("a"), "ID a not found.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_core.embeddings import Embeddings
+from codewise.retriever.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    model = "counting"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(t)), float(sum(map(ord, t)) % 97), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_repeated_texts_are_embedded_once_across_instances(self):
+        inner = CountingEmbeddings()
+        first = CachedEmbeddings(inner, cache_dir=self.tmp.name).embed_documents(["a", "bb", "a"])
+        self.assertEqual(inner.embedded, ["a", "bb"])
+
+        cache = CachedEmbeddings(inner, cache_dir=self.tmp.name)
+        again = cache.embed_documents(["bb", "a"])
+        self.assertEqual(again, [first[1], first[0]])
+        self.assertEqual(cache.embed_query("a"), first[0])
+        self.assertEqual(inner.embedded, ["a", "bb"])
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 0)
+
+    def test_instance_opened_on_empty_cache_reads_vectors_written_by_another(self):
+        inner = CountingEmbeddings()
+        reader = CachedEmbeddings(inner, cache_dir=self.tmp.name)  # e.g. the daemon, before any build
+        writer = CachedEmbeddings(inner, cache_dir=self.tmp.name)
+        vector = writer.embed_query("a")
+        self.assertEqual(reader.embed_documents(["a"]), [vector])
+        self.assertEqual(inner.embedded, ["a"])
+
+    def test_lru_eviction_reuses_rows(self):
+        inner = CountingEmbeddings()
+        cache = CachedEmbeddings(inner, cache_dir=self.tmp.name, max_entries=2)
+        cache.embed_documents(["a", "bb"])
+        cache.embed_query("a")             # "bb" is now least recently used
+        cache.embed_query("ccc")           # evicts "bb"
+        self.assertEqual(cache.stats()["entries"], 2)
+
+        inner.embedded.clear()
+        self.assertEqual(cache.embed_documents(["a", "ccc", "bb"])[1], [3.0, float(297 % 97), 1.0])
+        self.assertEqual(inner.embedded, ["bb"])
+        self.assertEqual(os.path.getsize(cache._vectors_path), 2 * 3 * 4)
+
+    def test_concurrent_processes_never_share_rows(self):
+        # Two writers (e.g. the retrieval daemon and a build) interleave
+        # small inserts into one cache directory.
+        writer = (
+            "import sys\n"
+            "from codewise.retriever.embedding_cache import CachedEmbeddings\n"
+            "from codewise.retriever.embeddings import LocalHashEmbeddings\n"
+            "cache = CachedEmbeddings(LocalHashEmbeddings(dimensions=16), cache_dir=sys.argv[1], model='shared')\n"
+            "for i in range(150):\n"
+            "    cache.embed_documents([f'{sys.argv[2]} {i} {j}' for j in range(3)])\n"
+        )
+        src = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+        procs = [subprocess.Popen([sys.executable, "-c", writer, self.tmp.name, name], cwd=src)
+                 for name in ("daemon", "build")]
+        self.assertEqual([p.wait() for p in procs], [0, 0])
+
+        from codewise.retriever.embeddings import LocalHashEmbeddings
+        plain = LocalHashEmbeddings(dimensions=16)
+        texts = [f"{name} {i} {j}" for name in ("daemon", "build") for i in range(150) for j in range(3)]
+        cache = CachedEmbeddings(CountingEmbeddings(), cache_dir=self.tmp.name, model="shared")
+        self.assertEqual(cache.embed_documents(texts), [list(map(float, v)) for v in plain.embed_documents(texts)])
+        self.assertEqual(cache.stats()["misses"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+from codewise.indexing.embedding_scheduler import EmbeddingScheduler, make_batches
+from codewise.scripts.fake_embeddings_server import fake_vector, make_server
+
+
+class TestEmbeddingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        # Every 3rd request gets a 429 from the fake server
+        self.server = make_server(port=0, dim=16, rate_limit_every=3)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.shutdown)
+
+    def _client(self):
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(
+            base_url=f"http://127.0.0.1:{self.server.server_port}/v1",
+            api_key="fake",
+            max_retries=0,
+            check_embedding_ctx_length=False,
+        )
+
+    def test_batches_respect_token_budget(self):
+        batches = make_batches(["a" * 40] * 10, max_tokens=25, count_tokens=lambda t: len(t) // 4)
+        self.assertEqual(batches, [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)])
+
+    def test_embeds_in_order_and_recovers_from_rate_limits(self):
+        texts = [f"def f{i}(): return {i}" for i in range(40)]
+        scheduler = EmbeddingScheduler(self._client(), max_batch_tokens=20, concurrency=4, base_delay=0.01)
+        vectors = scheduler.embed(texts)
+
+        self.assertEqual(vectors.shape, (40, 16))
+        np.testing.assert_allclose(vectors[7], fake_vector(texts[7], 16), rtol=1e-6)
+        self.assertGreater(scheduler.rate_limited, 0)
+
+    def test_resumes_from_checkpoints(self):
+        texts = [f"chunk {i}" for i in range(12)]
+        with tempfile.TemporaryDirectory() as tmp:
+            first = EmbeddingScheduler(self._client(), max_batch_tokens=10, checkpoint_dir=tmp, base_delay=0.01)
+            expected = first.embed(texts)
+            served = self.server.stats["inputs"]
+
+            second = EmbeddingScheduler(self._client(), max_batch_tokens=10, checkpoint_dir=tmp)
+            np.testing.assert_array_equal(second.embed(texts), expected)
+            self.assertEqual(self.server.stats["inputs"], served)
+            self.assertGreater(second.resumed_batches, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from codewise.retriever.code_tokens import code_tokens
+from codewise.retriever.embeddings import (
+    EmbeddingsMismatchError, LocalHashEmbeddings, backend_id, get_embeddings
+)
+from codewise.retriever.store import load_store, save_store
+from codewise.retriever.store_meta import load_meta
+
+
+class TestLocalEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.emb = LocalHashEmbeddings(dimensions=256)
+
+    def test_code_tokens_split_identifiers(self):
+        self.assertEqual(code_tokens("send_file(sendFile)"), ["send_file", "send", "file", "sendfile", "send", "file"])
+
+    def test_vectors_are_stable_and_normalised(self):
+        a = np.array(self.emb.embed_documents(["def url_for(endpoint): pass", ""]))
+        self.assertEqual(a.shape, (2, 256))
+        self.assertAlmostEqual(float(np.linalg.norm(a[0])), 1.0, places=5)
+        self.assertEqual(float(np.linalg.norm(a[1])), 0.0)
+        # no per-process salt: a fresh instance gives the same vector
+        b = LocalHashEmbeddings(dimensions=256).embed_query("def url_for(endpoint): pass")
+        np.testing.assert_allclose(a[0], b)
+
+    def test_ranks_by_shared_identifiers(self):
+        docs = [
+            "def send_file(path, mimetype=None):\n    return make_response(open(path).read())",
+            "def url_for(endpoint, **values):\n    return current_app.url_for(endpoint, **values)",
+            "class Config(dict):\n    def from_envvar(self, name): ...",
+        ]
+        matrix = np.array(self.emb.embed_documents(docs))
+        query = np.array(self.emb.embed_query("build a url for an endpoint with url_for"))
+        self.assertEqual(int(np.argmax(matrix @ query)), 1)
+
+    def test_backend_selection(self):
+        emb = get_embeddings("local")
+        self.assertIsInstance(emb, LocalHashEmbeddings)
+        self.assertEqual(backend_id(emb), "local-hash-v1-512")
+        with self.assertRaises(ValueError):
+            get_embeddings("nope")
+
+
+class TestBackendRecordedPerStore(unittest.TestCase):
+
+    def test_mismatched_backend_is_refused(self):
+        local = LocalHashEmbeddings(dimensions=16)
+        with tempfile.TemporaryDirectory() as tmp:
+            save_store(FAISS.from_texts(["def a(): pass", "def b(): pass"], local), tmp)
+            self.assertEqual(load_meta(tmp)["embeddings"], "local-hash-v1-16")
+            self.assertEqual(len(load_store(tmp, local).similarity_search("def a", k=1)), 1)
+            with self.assertRaises(EmbeddingsMismatchError):
+                load_store(tmp, DeterministicFakeEmbedding(size=16))
+
+
+if __name__ == '__main__':
+    unittest.main()
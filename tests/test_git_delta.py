@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.indexing.git_delta import changed_python_files, head_commit
+
+
+class TestGitDelta(unittest.TestCase):
+
+    def _git(self, *args):
+        subprocess.run(["git", "-c", "user.email=t@t", "-c", "user.name=t", *args],
+                       cwd=self.repo, check=True, capture_output=True)
+
+    def _write(self, rel, text):
+        path = os.path.join(self.repo, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_name_status_is_mapped_to_package_files(self):
+        with tempfile.TemporaryDirectory() as self.repo:
+            pkg = os.path.join(self.repo, "src", "pkg")
+            self._git("init", "-q")
+            self._write("src/pkg/a.py", "def a(): pass\n")
+            self._write("src/pkg/b.py", "def b(): pass\n")
+            self._write("src/pkg/c.py", "def c(): pass\n")
+            self._write("docs/conf.py", "x = 1\n")
+            self._git("add", "-A")
+            self._git("commit", "-qm", "init")
+            indexed = head_commit(pkg)
+
+            self._write("src/pkg/a.py", "def a(): return 1\n")
+            self._write("docs/conf.py", "x = 2\n")
+            self._git("rm", "-q", "src/pkg/b.py")
+            self._git("mv", "src/pkg/c.py", "src/pkg/d.py")
+            self._git("commit", "-qam", "change")
+
+            changed, deleted = changed_python_files(pkg, indexed)
+            rel = lambda paths: sorted(os.path.relpath(p, pkg) for p in paths)
+            self.assertEqual(rel(changed), ["a.py", "d.py"])
+            self.assertEqual(rel(deleted), ["b.py", "c.py"])
+            self.assertIsNone(changed_python_files(pkg, "0" * 40))
+
+
+if __name__ == '__main__':
+    unittest.main()
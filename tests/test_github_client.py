@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.github_client import PR_QUERY, REVIEW_COMMENTS_QUERY, GitHubClient
+from codewise.review.pr_comments import extract_all_human_comments
+
+PAGE_END = {"hasNextPage": False, "endCursor": None}
+
+
+def inline(cid, body, path="src/app.py"):
+    return {"databaseId": cid, "author": {"login": "rev"}, "body": body, "path": path, "position": None,
+            "originalPosition": 4, "createdAt": "2025-01-01T00:00:00Z", "url": f"u{cid}"}
+
+
+class FakeRequester:
+    """Canned GraphQL / REST answers; records every round-trip."""
+
+    def __init__(self):
+        self.calls = []
+
+    def graphql_query(self, query, variables):
+        self.calls.append(("graphql", variables))
+        if query == PR_QUERY:
+            pr = {"title": "Fix send_file", "headRefOid": "h" * 40, "baseRefOid": "b" * 40}
+            if variables["withReviews"]:
+                pr["reviews"] = {"pageInfo": PAGE_END, "nodes": [{
+                    "id": "R1", "author": {"login": "rev"}, "state": "COMMENTED", "body": "",
+                    "comments": {"pageInfo": {"hasNextPage": True, "endCursor": "c1"}, "nodes": [inline(2, "nit")]},
+                }]}
+            if variables["withComments"]:
+                if variables["commentsAfter"] is None:
+                    pr["comments"] = {"pageInfo": {"hasNextPage": True, "endCursor": "p1"},
+                                      "nodes": [{"author": None, "body": "thanks", "createdAt": "t", "url": "i1"}]}
+                else:
+                    pr["comments"] = {"pageInfo": PAGE_END,
+                                      "nodes": [{"author": {"login": "m"}, "body": "merged", "createdAt": "t", "url": "i2"}]}
+            return {}, {"data": {"repository": {"pullRequest": pr}}}
+        if query == REVIEW_COMMENTS_QUERY:
+            return {}, {"data": {"node": {"comments": {"pageInfo": PAGE_END, "nodes": [inline(1, "typo")]}}}}
+        # aliased blob query
+        self.blob_variables = variables
+        return {}, {"data": {"repository": {"f0": {"text": "def a():\n    pass\n", "isBinary": False,
+                                                   "isTruncated": False}}}}
+
+    def requestJsonAndCheck(self, verb, url, parameters=None):
+        self.calls.append(("rest", url))
+        return {}, [{"filename": "src/app.py", "status": "modified", "patch": "@@ -1 +1 @@\n+pass"},
+                    {"filename": "old.py", "status": "removed", "patch": ""}]
+
+
+class TestPRSnapshot(unittest.TestCase):
+
+    def test_snapshot_in_a_few_round_trips(self):
+        with mock.patch.dict(os.environ, {"GITHUB_TOKEN": "t", "DISABLE_GITHUB_CACHE": "1"}):
+            client = GitHubClient()
+        client.client = mock.Mock(requester=FakeRequester())
+        snapshot = client.get_pr_snapshot("o/r", 7)
+        requester = client.client.requester
+
+        # 2 PR pages (discussion comments paginate), 1 review-comment page, 1 REST files page, 1 blob query
+        self.assertEqual([kind for kind, _ in requester.calls], ["graphql"] * 3 + ["rest", "graphql"])
+        self.assertFalse(requester.calls[1][1]["withReviews"])
+        self.assertEqual(requester.blob_variables["e0"], "h" * 40 + ":src/app.py")
+
+        self.assertEqual(snapshot.title, "Fix send_file")
+        self.assertEqual([(f.filename, f.content) for f in snapshot.files],
+                         [("src/app.py", "def a():\n    pass\n"), ("old.py", None)])
+        self.assertEqual([c.body for c in snapshot.review_comments], ["typo", "nit"])
+        self.assertEqual(snapshot.review_comments[0].position, 4)
+        self.assertEqual([(c.author, c.body) for c in snapshot.issue_comments], [(None, "thanks"), ("m", "merged")])
+        self.assertEqual(snapshot.diff, "@@ -1 +1 @@\n+pass")
+
+        comments, count = extract_all_human_comments(snapshot)
+        self.assertEqual(count, 6)
+        self.assertEqual(comments["7"][0], {"path": "src/app.py", "line": 4, "body": "typo", "severity": "Low"})
+        self.assertEqual(comments["7"][2], {"path": None, "line": None, "body": "thanks", "severity": "Low"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+from unittest import mock
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import requests
+from github.Requester import Requester
+from codewise.github.http_cache import (
+    CachingHTTPSConnection, HTTPCache, cached_github, install_http_cache, is_immutable
+)
+
+SHA = "a" * 40
+
+
+class FakeGitHub:
+    """Stands in for `requests.Session.get`: serves JSON with ETags and honours If-None-Match."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, session, url, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        path = url.split(":443", 1)[1]
+        body = {"full_name": "o/r", "name": "r", "url": "https://api.github.com/repos/o/r"}
+        if "/contents/" in path:
+            body = {"type": "file", "encoding": "base64", "content": "cHJpbnQoMSkK", "path": "a.py", "sha": SHA}
+        etag = '"v1"'
+        response = requests.Response()
+        response.url = url
+        response.headers["X-RateLimit-Remaining"] = "4999"
+        if (headers or {}).get("If-None-Match") == etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.headers.update({"ETag": etag, "Content-Type": "application/json"})
+            response._content = json.dumps(body).encode()
+        return response
+
+
+class TestHTTPCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(Requester.resetConnectionClasses)
+        self.addCleanup(setattr, CachingHTTPSConnection, "cache", None)
+
+    def test_revalidates_mutable_and_serves_immutable_from_cache(self):
+        server = FakeGitHub()
+        with mock.patch.dict(os.environ, {"DISABLE_GITHUB_CACHE": "0"}), \
+                mock.patch.object(requests.Session, "get", autospec=True, side_effect=server):
+            cache = install_http_cache(os.path.join(self.tmp.name, "c.sqlite"))
+            g = cached_github("token")
+            for _ in range(2):
+                repo = g.get_repo("o/r")
+                self.assertEqual(repo.full_name, "o/r")
+                self.assertEqual(repo.get_contents("a.py", ref=SHA).decoded_content, b"print(1)\n")
+
+        self.assertEqual((cache.misses, cache.revalidated, cache.hits), (2, 1, 1))
+        # The repeat repo lookup was conditional; the contents at a SHA were never re-requested.
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.requests[2][1].get("If-None-Match"), '"v1"')
+
+    def test_lru_eviction_by_size(self):
+        cache = HTTPCache(os.path.join(self.tmp.name, "c.sqlite"), max_bytes=25)
+        for i in range(3):
+            cache.put(f"k{i}", f"/u{i}", 200, {"ETag": f'"{i}"'}, "x" * 10)
+            if i == 1:
+                cache.get("k0")  # k0 is now more recent than k1
+        self.assertIsNone(cache.get("k1"))
+        self.assertEqual(cache.get("k0").headers, {"etag": '"0"'})
+        self.assertEqual(cache.size_bytes(), 20)
+
+    def test_immutable_urls(self):
+        self.assertTrue(is_immutable(f"/repos/o/r/contents/a.py?ref={SHA}"))
+        self.assertTrue(is_immutable(f"/repos/o/r/git/blobs/{SHA}"))
+        self.assertFalse(is_immutable("/repos/o/r/contents/a.py?ref=main"))
+        self.assertFalse(is_immutable(f"/repos/o/r/commits/{SHA}/status"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from codewise.retriever.index_factory import build_index, choose_index_type, flat_vectors, index_type_of
+from codewise.retriever.store import VECTORS_FILE, convert_index, load_store, save_store
+from codewise.retriever.store_meta import load_meta
+
+
+class TestIndexFactory(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.vectors = rng.standard_normal((2000, 32)).astype(np.float32)
+
+    def test_heuristic_by_corpus_size(self):
+        self.assertEqual(choose_index_type(450), "flat")
+        self.assertEqual(choose_index_type(200_000), "hnsw")
+        self.assertEqual(choose_index_type(5_000_000), "ivf-pq")
+
+    def test_approximate_indexes_find_exact_neighbours(self):
+        exact = faiss.IndexFlatL2(32)
+        exact.add(self.vectors)
+        queries = self.vectors[:50] + 0.01
+        _, truth = exact.search(queries, 1)
+        for kind in ("ivf-flat", "ivf-pq", "hnsw"):
+            index, params = build_index(self.vectors, kind)
+            self.assertEqual(index_type_of(index), kind)
+            self.assertEqual(params["index_type"], kind)
+            _, found = index.search(queries, 5)
+            recall = np.mean([truth[i, 0] in found[i] for i in range(len(queries))])
+            self.assertGreaterEqual(recall, 0.9, kind)
+
+    def test_compressed_vectors_are_smaller(self):
+        sizes = {}
+        for compression in ("none", "fp16", "sq8", "pq"):
+            index, params = build_index(self.vectors, "flat", compression, pq_m=8)
+            sizes[compression] = len(faiss.serialize_index(index))
+        self.assertLess(sizes["fp16"], sizes["none"] * 0.6)
+        self.assertLess(sizes["sq8"], sizes["fp16"] * 0.6)
+        self.assertLess(sizes["pq"], sizes["sq8"])
+        self.assertEqual(params["pq_m"], 8)
+        with self.assertRaises(ValueError):
+            build_index(self.vectors, "ivf-pq", "sq8")
+
+    def test_flat_vectors_maps_index_file(self):
+        index = faiss.IndexFlatL2(32)
+        index.add(self.vectors)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.faiss")
+            faiss.write_index(index, path)
+            np.testing.assert_array_equal(flat_vectors(path), self.vectors)
+            faiss.write_index(build_index(self.vectors, "hnsw")[0], path)
+            self.assertIsNone(flat_vectors(path))
+
+
+class TestStoreIndexType(unittest.TestCase):
+
+    def setUp(self):
+        self.emb = DeterministicFakeEmbedding(size=16)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.texts = [f"def f{i}(): return {i}" for i in range(300)]
+        store = FAISS.from_texts(self.texts, self.emb, ids=[str(i) for i in range(300)])
+        save_store(store, self.tmp.name, "ivf-flat", nlist=4)
+
+    def test_saved_as_requested_type(self):
+        self.assertEqual(load_meta(self.tmp.name)["index"]["index_type"], "ivf-flat")
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, VECTORS_FILE)))
+        store = load_store(self.tmp.name, self.emb)
+        self.assertEqual(index_type_of(store.index), "ivf-flat")
+        self.assertEqual(faiss.extract_index_ivf(store.index).nprobe, 4)
+        self.assertEqual(store.similarity_search(self.texts[7], k=1)[0].id, "7")
+
+    def test_update_keeps_type_and_back_to_flat(self):
+        store = load_store(self.tmp.name, self.emb, writable=True)
+        self.assertEqual(index_type_of(store.index), "flat")
+        store.delete(["7"])
+        save_store(store, self.tmp.name)
+        store = load_store(self.tmp.name, self.emb)
+        self.assertEqual(index_type_of(store.index), "ivf-flat")
+        self.assertEqual(store.index.ntotal, 299)
+
+        convert_index(self.tmp.name, "flat")
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, VECTORS_FILE)))
+        store = load_store(self.tmp.name, self.emb)
+        self.assertEqual(index_type_of(store.index), "flat")
+        self.assertEqual(store.similarity_search(self.texts[8], k=1)[0].id, "8")
+
+    def test_compressed_store(self):
+        convert_index(self.tmp.name, "flat", "sq8")
+        meta = load_meta(self.tmp.name)["index"]
+        self.assertEqual((meta["index_type"], meta["compression"]), ("flat", "sq8"))
+        store = load_store(self.tmp.name, self.emb)
+        self.assertIsInstance(store.index, faiss.IndexScalarQuantizer)
+        self.assertEqual(store.similarity_search(self.texts[9], k=1)[0].id, "9")
+        # updates go through the exact vectors, and keep the compression
+        store = load_store(self.tmp.name, self.emb, writable=True)
+        self.assertIsInstance(store.index, faiss.IndexFlatL2)
+        save_store(store, self.tmp.name)
+        self.assertEqual(load_meta(self.tmp.name)["index"]["compression"], "sq8")
+
+    def test_mmap_load_outlives_rebuild(self):
+        convert_index(self.tmp.name, "flat")
+        mapped = load_store(self.tmp.name, self.emb)
+        private = load_store(self.tmp.name, self.emb, mmap=False)
+        self.assertEqual(mapped.similarity_search(self.texts[3], k=3), private.similarity_search(self.texts[3], k=3))
+        # The rebuild replaces index.faiss; the open mapping keeps reading the old file.
+        query = np.array([self.emb.embed_query(self.texts[3])], dtype=np.float32)
+        before = mapped.index.search(query, 3)
+        store = load_store(self.tmp.name, self.emb, writable=True)
+        store.delete(["3"])
+        save_store(store, self.tmp.name)
+        np.testing.assert_array_equal(mapped.index.search(query, 3)[1], before[1])
+        self.assertEqual(mapped.index.ntotal, 300)
+        self.assertNotEqual(load_store(self.tmp.name, self.emb).similarity_search(self.texts[3], k=1)[0].id, "3")
+
+    def test_legacy_pickled_store(self):
+        legacy = os.path.join(self.tmp.name, "legacy")
+        FAISS.from_texts(self.texts[:20], self.emb, ids=[str(i) for i in range(20)]).save_local(legacy)
+        store = load_store(legacy, self.emb)
+        self.assertEqual(store.similarity_search(self.texts[5], k=1)[0].id, "5")
+
+
+if __name__ == '__main__':
+    unittest.main()
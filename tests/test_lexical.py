@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from unittest import mock
+from langchain_community.vectorstores import FAISS
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever import retriever_client
+from codewise.retriever.lexical import LEXICAL_FILE, LexicalIndex, index_tokens, rrf_fuse
+from codewise.retriever.store import load_store, save_store
+
+DOCS = {
+    "send_file": "def send_file(path, mimetype=None):\n    \"\"\"Send the contents of a file to the client.\"\"\"\n    ...",
+    "send_from_directory": "def send_from_directory(directory, path):\n    return send_file(safe_join(directory, path))",
+    "url_for": "def url_for(endpoint, **values):\n    # Generate a URL to the given endpoint\n    return build(endpoint)",
+    "Config.from_envvar": "def from_envvar(self, variable_name):\n    return self.from_pyfile(os.environ[variable_name])",
+    "render_template": "def render_template(template_name_or_list, **context):\n    return _render(template, context)",
+    "jsonify": "def jsonify(*args, **kwargs):\n    return current_app.json.response(*args, **kwargs)",
+}
+
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    calls = 0
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.calls += 1
+        return super().embed_documents(texts)
+
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LexicalIndex.build((name, text, name.split(".")[-1]) for name, text in DOCS.items())
+
+    def test_index_tokens_split_identifiers_and_drop_stopwords(self):
+        self.assertEqual(index_tokens("def getUserName(self): return user_id"),
+                         ["getusername", "get", "user", "name", "user_id", "user", "id"])
+
+    def test_definition_ranks_above_callers(self):
+        hits = self.index.search("send_file", k=3)
+        self.assertEqual([h.doc_id for h in hits[:2]], ["send_file", "send_from_directory"])
+        self.assertTrue(hits[0].name_match)
+        self.assertEqual(self.index.search("nothing matches this", k=3), [])
+
+    def test_comment_tokens_are_indexed(self):
+        self.assertEqual(self.index.search("generate url", k=1)[0].doc_id, "url_for")
+
+    def test_rrf_fuse(self):
+        self.assertEqual(rrf_fuse([["a", "b", "c"], ["c", "a"]]), ["a", "c", "b"])
+
+
+@pytest.mark.usefixtures("retriever_globals")
+class TestHybridSearch(unittest.TestCase):
+    """`retriever_client._search_batch`, with the same store and index on the code and comments side."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.emb = CountingEmbeddings(dimensions=64)
+        store = FAISS.from_texts(list(DOCS.values()), self.emb, ids=list(DOCS),
+                                 metadatas=[{"name": n.split(".")[-1]} for n in DOCS])
+        save_store(store, self.tmp.name)
+        self.store = load_store(self.tmp.name, self.emb)
+        self.lexical = LexicalIndex.load(self.tmp.name)
+        retriever_client.code_store = retriever_client.comments_store = self.store
+        retriever_client.code_lexical = retriever_client.comments_lexical = self.lexical
+        retriever_client.embeddings = self.emb
+        CountingEmbeddings.calls = 0
+
+    def search(self, queries, k):
+        return [[d.id for d in code] for code, _ in retriever_client._search_batch(queries, k, [None] * len(queries))]
+
+    def test_built_with_store(self):
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, LEXICAL_FILE)))
+        self.assertEqual(len(self.lexical), len(DOCS))
+
+    def test_confident_lookup_skips_embedding(self):
+        # BM25 scores on a six-document corpus are small; lower the bar
+        with mock.patch("codewise.retriever.lexical.CONFIDENT_SCORE", 5.0):
+            self.assertEqual(self.search(["url_for"], k=1), [["url_for"]])
+        stats = retriever_client.search_stats
+        self.assertEqual(CountingEmbeddings.calls, 0)
+        self.assertEqual((stats["lexical_only"], stats["embeddings_skipped"]), (2, 1))
+
+    def test_vague_query_fuses_dense_hits(self):
+        ids = self.search(["template context rendering"], k=3)[0]
+        self.assertEqual(CountingEmbeddings.calls, 1)
+        self.assertEqual(retriever_client.search_stats["hybrid"], 2)
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids[0], "render_template")
+
+    def test_without_lexical_index(self):
+        retriever_client.code_lexical = retriever_client.comments_lexical = None
+        self.assertEqual([len(ids) for ids in self.search(["url_for"], k=2)], [2])
+        self.assertEqual(retriever_client.search_stats["dense_only"], 2)
+
+    def test_dense_search_only_in_the_store_that_needs_it(self):
+        retriever_client.comments_lexical = None
+        with mock.patch("codewise.retriever.lexical.CONFIDENT_SCORE", 5.0):
+            self.search(["url_for", "template context rendering"], k=1)
+        stats = retriever_client.search_stats
+        self.assertEqual(CountingEmbeddings.calls, 1)  # both snippets, for the comments store
+        self.assertEqual((stats["lexical_only"], stats["hybrid"], stats["dense_only"]), (1, 1, 2))
+        self.assertEqual((stats["code_dense_skipped"], stats["comments_dense_skipped"], stats["queries"]), (1, 0, 2))
+
+    def test_batch_matches_per_query_search(self):
+        queries = ["send_file", "template context rendering", "send a file from a directory", "json response"]
+        with mock.patch("codewise.retriever.lexical.CONFIDENT_SCORE", 5.0):
+            expected = [self.search([q], k=2)[0] for q in queries]
+            loop_stats = retriever_client.search_stats.copy()
+            retriever_client.search_stats.clear()
+            CountingEmbeddings.calls = 0
+            self.assertEqual(self.search(queries, k=2), expected)
+        self.assertEqual(retriever_client.search_stats, loop_stats)  # per store: one lexical-only, three hybrid
+        self.assertEqual(CountingEmbeddings.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys
+import os
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.indexing.manifest import ChunkManifest, vector_id
+
+
+class TestChunkManifest(unittest.TestCase):
+
+    def _docs(self, **bodies):
+        return [{"text": text, "source": "/repo/pkg/mod.py", "name": name} for name, text in bodies.items()]
+
+    def test_plan_detects_added_changed_and_removed_chunks(self):
+        old_docs = self._docs(a="def a(): pass", b="def b(): pass", c="def c(): pass")
+        old_keys = ChunkManifest.keys_for(old_docs, "/repo")
+        manifest = ChunkManifest({k: vector_id(k) for k in old_keys})
+
+        # `b` changed, `c` removed, `d` added, `a` untouched
+        new_docs = self._docs(a="def a(): pass", b="def b(): return 1", d="def d(): pass")
+        new_keys = ChunkManifest.keys_for(new_docs, "/repo")
+        added, removed, unchanged = manifest.plan(new_keys)
+
+        self.assertEqual(len(added), 2)
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(unchanged, [new_keys[0]])
+        self.assertTrue(all(k.startswith("pkg/mod.py::") for k in new_keys))
+
+    def test_identical_chunks_get_distinct_keys(self):
+        docs = [{"text": "x = 1", "source": "/repo/m.py", "name": None}] * 2
+        keys = ChunkManifest.keys_for(docs, "/repo")
+        self.assertEqual(len(set(keys)), 2)
+
+    def test_roundtrip(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(ChunkManifest.load(tmp))
+            ChunkManifest({"k": "v"}).save(tmp)
+            self.assertEqual(ChunkManifest.load(tmp).entries, {"k": "v"})
+
+
+if __name__ == '__main__':
+    unittest.main()
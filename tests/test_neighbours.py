@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_community.vectorstores import FAISS
+from codewise.core.static_analyzer import analyze_file_changes
+from codewise.indexing.chunker import chunk_source
+from codewise.retriever import retriever_client
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.neighbours import NeighbourGraph, build_neighbour_graph, normalize_source, similarity
+from codewise.retriever.store import save_store
+
+ROOT = "data/flask/src/flask"
+PROVIDER = '''import json
+
+
+def dumps(obj, **kwargs):
+    # sort the keys for a stable session cookie
+    kwargs.setdefault("default", str)
+    kwargs.setdefault("sort_keys", True)
+    return json.dumps(obj, **kwargs)
+
+
+class JSONProvider:
+    def __init__(self, app):
+        self._app = app
+
+    def loads(self, s, **kwargs):
+        kwargs.setdefault("parse_float", float)
+        obj = json.loads(s, **kwargs)
+        return obj
+'''
+CODE = [
+    *((f"{ROOT}/json/provider.py", c["name"], c["code"]) for c in chunk_source(PROVIDER)),
+    (f"{ROOT}/json/tag.py", "tag", "def tag(value):\n    for t in TAGS:\n        if t.check(value):\n"
+                                   "            return t.tag(value)\n    return value"),
+    (f"{ROOT}/helpers.py", "send_file", "def send_file(path, mimetype=None):\n    return open(path, 'rb')"),
+    (f"{ROOT}/app.py", "run", "def run(self, host=None, port=None):\n    server = make_server(host, port)\n"
+                              "    server.serve_forever()"),
+]
+PARENTS = {c["code"]: c["parent"] for c in chunk_source(PROVIDER)}  # the class of each method chunk
+COMMENTS = ["dumps should sort the keys", "tag values before dumping them", "send_file must close the file"]
+
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    def __init__(self):
+        super().__init__(dimensions=64)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.mark.usefixtures("retriever_globals")
+class TestNeighbourGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.emb = CountingEmbeddings()
+        self.code_dir = os.path.join(self.tmp.name, "code")
+        self.comments_dir = os.path.join(self.tmp.name, "comments")
+        save_store(FAISS.from_texts([t for _, _, t in CODE], self.emb,
+                                    metadatas=[{"source": s, "name": n, "parent": PARENTS.get(t)} for s, n, t in CODE]),
+                   self.code_dir)
+        self.save_comments(COMMENTS)
+        self.graph = build_neighbour_graph(self.code_dir, self.comments_dir, self.emb, k=3)
+        self.emb.embedded.clear()
+        retriever_client.CODE_STORE_PATH = self.code_dir
+        retriever_client.COMMENTS_STORE_PATH = self.comments_dir
+        get = mock.patch("codewise.retriever.embeddings.get_embeddings", return_value=self.emb)
+        get.start()
+        self.addCleanup(get.stop)
+
+    def save_comments(self, comments):
+        save_store(FAISS.from_texts(comments, self.emb, metadatas=[{"type": "review_comment"}] * len(comments)),
+                   self.comments_dir)
+
+    def test_graph_saved_per_chunk(self):
+        loaded = NeighbourGraph.load(self.code_dir)
+        self.assertEqual(loaded.code.shape, (7, 3))
+        [row] = loaded.candidates("dumps", "src/flask/json/provider.py")
+        self.assertEqual(loaded.candidates("dumps", "src/flask/app.py"), [])
+        self.assertEqual(str(loaded.code[row][0]), str(loaded.doc_ids[row]))  # a chunk is its own best hit
+        self.assertGreater(similarity(CODE[0][2].replace("True", "False"), CODE[0][2]), 0.7)
+        self.assertLess(similarity("def dumps(obj):\n    return None", CODE[0][2]), 0.5)
+        self.assertEqual(normalize_source(CODE[0][2]), "def dumps(obj, **kwargs):\n    kwargs.setdefault('default', str)"
+                         "\n    kwargs.setdefault('sort_keys', True)\n    return json.dumps(obj, **kwargs)")
+
+    @mock.patch("codewise.retriever.context_packer.MIN_SCORE", 0.0)  # keep every hit of the tiny stores
+    def test_indexed_node_is_a_lookup(self):
+        # The PR edits `dumps` and the `loads` method and adds `dumps_pretty`.
+        lines = PROVIDER.splitlines()
+        lines.insert(7, '    kwargs.setdefault("ensure_ascii", False)')
+        lines.insert(18, '        kwargs.setdefault("object_hook", None)')
+        lines[10:10] = ["def dumps_pretty(obj):", "    return pickle.dumps(obj, protocol=4)", "", ""]
+        added = (8, 11, 12, 23)
+        patch = "".join(f"@@ -{n},0 +{n},1 @@\n+{lines[n - 1]}\n" for n in added)
+        nodes = analyze_file_changes("\n".join(lines), patch)
+        self.assertEqual(list(nodes), ["dumps", "dumps_pretty", "JSONProvider"])  # a method comes as its class
+
+        path = "src/flask/json/provider.py"
+        contexts = retriever_client.get_retrieval_contexts(
+            [n["source_code"] for n in nodes.values()], top_k=3, node_names=list(nodes), file_paths=[path] * len(nodes))
+        self.assertEqual(retriever_client.search_stats["precomputed"], 2)  # dumps, and JSONProvider via loads
+        self.assertEqual(self.emb.embedded, [nodes["dumps_pretty"]["source_code"]])  # only the new function
+        graph, docstore = retriever_client.neighbour_graph, retriever_client.code_store.docstore
+        [row] = graph.lookup(docstore, [nodes["JSONProvider"]["source_code"]], ["JSONProvider"], [path]).values()
+        self.assertEqual(str(graph.names[row]), "loads")
+
+        # The lookup returns what a live search of the indexed text returns.
+        retriever_client.neighbour_graph = None
+        live = retriever_client.get_retrieval_contexts([CODE[0][2]], top_k=3)
+        self.assertEqual(contexts[0], live[0])
+        self.assertIn("dumps should sort the keys", contexts[0].split("# Relevant PR Comments:")[1])
+
+    def test_rebuilt_store_invalidates_graph(self):
+        self.save_comments(COMMENTS + ["use a context manager in send_file"])
+        retriever_client.get_retrieval_contexts([CODE[2][2]], top_k=3, node_names=["send_file"],
+                                                file_paths=["src/flask/helpers.py"])
+        self.assertIsNone(retriever_client.neighbour_graph)
+        self.assertEqual(retriever_client.search_stats["precomputed"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
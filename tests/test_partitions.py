@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import faiss
+from langchain_community.vectorstores import FAISS
+from codewise.retriever import retriever_client
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.index_factory import build_index
+from codewise.retriever.partitions import PartitionTable, RetrievalFilter, in_directory, search_rows
+from codewise.retriever.store import load_store, save_store
+
+ROOT = "data/flask/src/flask"
+CODE = [
+    (f"{ROOT}/json/tag.py", "def tag(value):\n    return dumps(value)"),
+    (f"{ROOT}/app.py", "def run(app):\n    return dumps(app.config)"),
+    (f"{ROOT}/json/provider.py", "def dumps(obj):\n    return json.dumps(obj)"),
+    (f"{ROOT}/helpers.py", "def send_file(path):\n    return open(path)"),
+    (f"{ROOT}/json/__init__.py", "def loads(text):\n    return json.loads(text)"),
+]
+COMMENTS = [  # harvest order: types and files interleaved
+    ("review_comment", "src/flask/json/tag.py", "dumps should sort the keys here"),
+    ("issue_comment", None, "Thanks, dumps looks good to me"),
+    ("review_comment", "src/flask/app.py", "run should not dumps the whole config"),
+    ("issue_comment", None, "Can we dumps this differently?"),
+    ("review_comment", "src/flask/json/provider.py", "Pass default=str to json dumps"),
+]
+
+
+class TestPartitions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.emb = LocalHashEmbeddings(dimensions=64)
+        self.code_dir = os.path.join(self.tmp.name, "code")
+        self.comments_dir = os.path.join(self.tmp.name, "comments")
+        save_store(FAISS.from_texts([t for _, t in CODE], self.emb, metadatas=[{"source": s} for s, _ in CODE]),
+                   self.code_dir)
+        save_store(FAISS.from_texts([t for _, _, t in COMMENTS], self.emb,
+                                    metadatas=[{"type": k, "file": f} for k, f, _ in COMMENTS]), self.comments_dir)
+
+    def test_save_clusters_rows_into_ranges(self):
+        table = PartitionTable.load(self.comments_dir)
+        self.assertEqual(table.rows(RetrievalFilter(comment_type="review_comment")), ((2, 5),))
+        self.assertEqual(table.rows(RetrievalFilter("src/flask/json", "review_comment")), ((3, 5),))
+        self.assertEqual(table.rows(RetrievalFilter("src/flask/missing")), ())
+        self.assertIsNone(PartitionTable.load(self.code_dir).rows(RetrievalFilter(comment_type="review_comment")))
+
+        store = load_store(self.comments_dir, self.emb)
+        types = [store.docstore.search(store.index_to_docstore_id[row]).metadata["type"] for row in range(5)]
+        self.assertEqual(types, ["issue_comment"] * 2 + ["review_comment"] * 3)
+        self.assertEqual(PartitionTable.load(self.code_dir).rows(RetrievalFilter("src/flask/json")), ((2, 5),))
+
+    def test_in_directory(self):
+        self.assertTrue(in_directory(f"{ROOT}/json/tag.py", "src/flask/json"))
+        self.assertTrue(in_directory("src/flask/json/tag.py", "src/flask/"))
+        self.assertFalse(in_directory(f"{ROOT}/json.py", "src/flask/json"))
+        self.assertFalse(in_directory("src/flask/jsonify/x.py", "src/flask/json"))
+
+    def test_range_search_equals_partition_search(self):
+        vectors = np.random.default_rng(0).standard_normal((3000, 16), dtype=np.float32)
+        queries = vectors[[5, 1500]]
+        flat = faiss.IndexFlatL2(16)
+        flat.add(vectors)
+        partition = faiss.IndexFlatL2(16)
+        partition.add(np.vstack([vectors[100:400], vectors[2000:2100]]))
+        expected = partition.search(queries, 5)[1]
+        expected = np.where(expected < 300, expected + 100, expected - 300 + 2000)
+        np.testing.assert_array_equal(search_rows(flat, queries, 5, ((100, 400), (2000, 2100)))[1], expected)
+
+        for kind, compression in (("hnsw", None), ("ivf-flat", None), ("flat", "pq")):
+            index, _ = build_index(vectors, kind, compression)
+            labels = search_rows(index, queries, 5, ((100, 400), (2000, 2100)))[1]
+            self.assertTrue(all(100 <= r < 400 or 2000 <= r < 2100 for r in labels.ravel()), kind)
+
+    @pytest.mark.usefixtures("retriever_globals")
+    def test_filtered_retrieval_context(self):
+        retriever_client.CODE_STORE_PATH = self.code_dir
+        retriever_client.COMMENTS_STORE_PATH = self.comments_dir
+        retriever_client.SCOPE = "directory"
+        retriever_client.COMMENT_TYPE = None
+        with mock.patch("codewise.retriever.embeddings.get_embeddings", return_value=self.emb):
+            scoped = retriever_client.get_retrieval_context("dumps the value", top_k=5,
+                                                            file_path="src/flask/json/tag.py")
+            code, comments = scoped.split("# Relevant PR Comments:")
+            self.assertIn("def dumps(obj)", code)
+            self.assertNotIn("def run(app)", code)
+            self.assertNotIn("def send_file", code)
+            self.assertIn("sort the keys", comments)
+            self.assertNotIn("Thanks", comments)
+
+            contexts = retriever_client.get_retrieval_contexts(
+                ["dumps the value"] * 2, top_k=5, path_prefixes=["src/flask", None], comment_type="issue_comment")
+            self.assertIn("def run(app)", contexts[0])
+            self.assertNotIn("sort the keys", contexts[0].split("# Relevant PR Comments:")[1])
+            self.assertIn("Thanks", contexts[1])
+            # An issue comment has no file, so nothing is under src/flask.
+            self.assertNotIn("Thanks", contexts[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from codewise.retriever import retriever_client
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.retrieval_cache import RetrievalCache
+from codewise.retriever.store import save_store
+from codewise.retriever.store_meta import store_version
+
+CODE = ["def send_file(path):\n    return open(path)", "def url_for(endpoint):\n    return build(endpoint)"]
+COMMENTS = ["Close the file handle here.", "Endpoint names should be validated."]
+
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    calls = 0
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        CountingEmbeddings.calls += 1
+        return super().embed_query(text)
+
+
+class TestRetrievalCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "cache.sqlite")
+
+    def test_lru_eviction(self):
+        cache = RetrievalCache("v1", self.path, max_entries=2)
+        docs = ([Document(id="a", page_content="x", metadata={"name": "a"})], [])
+        keys = [cache.key(f"snippet {i}", 5) for i in range(3)]
+        cache.put_many({keys[0]: docs})
+        cache.put_many({keys[1]: docs})
+        cache.get_many([keys[0]])  # keys[0] is now more recent than keys[1]
+        cache.put_many({keys[2]: docs})
+        self.assertEqual(sorted(cache.get_many(keys)), sorted([keys[0], keys[2]]))
+        code, _ = cache.get_many([keys[0]])[keys[0]]
+        self.assertEqual((code[0].id, code[0].metadata), ("a", {"name": "a"}))
+
+    def test_versions_coexist_until_evicted(self):
+        old = RetrievalCache("v1", self.path, max_entries=3)
+        old.put_many({old.key("s", 5): ([], []), old.key("t", 5): ([], [])})
+        new = RetrievalCache("v2", self.path, max_entries=3)
+        self.assertEqual((len(new), len(old)), (0, 2))
+        self.assertEqual(new.get_many([new.key("s", 5)]), {})  # never answered from another build
+
+        # A process still on v1 keeps its entries; past the cap they are evicted first.
+        self.assertEqual(len(old.get_many([old.key("s", 5)])), 1)
+        new.put_many({new.key(f"u{i}", 5): ([], []) for i in range(2)})
+        self.assertEqual((len(new), len(old)), (2, 1))
+        new.put_many({new.key("v", 5): ([], [])})
+        self.assertEqual((len(new), len(old)), (3, 0))
+
+
+@pytest.mark.usefixtures("retriever_globals")
+class TestCachedRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.emb = CountingEmbeddings(dimensions=64)
+        self.code_dir = os.path.join(self.tmp.name, "code")
+        self.comments_dir = os.path.join(self.tmp.name, "comments")
+        self.build()
+        retriever_client.CODE_STORE_PATH = self.code_dir
+        retriever_client.COMMENTS_STORE_PATH = self.comments_dir
+        retriever_client.RETRIEVAL_CACHE_PATH = os.path.join(self.tmp.name, "cache.sqlite")
+        retriever_client.RETRIEVAL_CACHE = True
+        get = mock.patch("codewise.retriever.embeddings.get_embeddings", return_value=self.emb)
+        get.start()
+        self.addCleanup(get.stop)
+
+    def build(self):
+        save_store(FAISS.from_texts(CODE, self.emb), self.code_dir)
+        save_store(FAISS.from_texts(COMMENTS, self.emb), self.comments_dir)
+
+    def reload(self):
+        retriever_client.code_store = retriever_client.comments_store = retriever_client.retrieval_cache = None
+
+    def test_repeat_queries_skip_embedding_until_rebuild(self):
+        snippets = ["open the file and stream it", "build a url for the endpoint"]
+        first = retriever_client.get_retrieval_contexts(snippets, top_k=1)
+        CountingEmbeddings.calls = 0
+
+        self.reload()  # a new process, e.g. a re-run of the same PR
+        self.assertEqual(retriever_client.get_retrieval_contexts(snippets, top_k=1), first)
+        self.assertEqual(retriever_client.get_retrieval_context(snippets[0], top_k=1), first[0])
+        self.assertEqual(CountingEmbeddings.calls, 0)
+        self.assertEqual(retriever_client.retrieval_cache.hits, 3)
+
+        version = store_version(self.code_dir)
+        self.build()
+        self.assertNotEqual(store_version(self.code_dir), version)
+        self.reload()
+        CountingEmbeddings.calls = 0
+        retriever_client.get_retrieval_contexts(snippets, top_k=1)
+        self.assertEqual(CountingEmbeddings.calls, 1)
+        self.assertEqual(retriever_client.retrieval_cache.misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+from collections import Counter
+from unittest import mock
+
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_community.vectorstores import FAISS
+from codewise.retriever import daemon, retriever_client
+from codewise.retriever.embeddings import LocalHashEmbeddings
+from codewise.retriever.store import save_store
+
+CODE = ["def send_file(path):\n    return open(path)", "def url_for(endpoint):\n    return build(endpoint)"]
+COMMENTS = ["Close the file handle here.", "Endpoint names should be validated."]
+SNIPPETS = ["open the file and stream it", "build a url for the endpoint"]
+
+
+@pytest.mark.usefixtures("retriever_globals")
+class TestRetrievalDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.emb = LocalHashEmbeddings(dimensions=64)
+        self.code_dir = os.path.join(self.tmp.name, "code")
+        self.comments_dir = os.path.join(self.tmp.name, "comments")
+        self.daemon_file = os.path.join(self.tmp.name, "daemon.json")
+        save_store(FAISS.from_texts(CODE, self.emb), self.code_dir)
+        save_store(FAISS.from_texts(COMMENTS, self.emb), self.comments_dir)
+        retriever_client.CODE_STORE_PATH = self.code_dir
+        retriever_client.COMMENTS_STORE_PATH = self.comments_dir
+        patches = [
+            mock.patch.object(daemon, "DAEMON_FILE", self.daemon_file),
+            mock.patch("codewise.retriever.embeddings.get_embeddings", return_value=self.emb),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_server(self):
+        server = daemon.RetrievalServer(("127.0.0.1", 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with open(self.daemon_file, "w") as f:
+            json.dump({"pid": os.getpid(), "host": "127.0.0.1", "port": server.server_address[1],
+                       "code_store": os.path.abspath(self.code_dir),
+                       "comments_store": os.path.abspath(self.comments_dir)}, f)
+        return server
+
+    def test_daemon_answers_like_in_process_retrieval(self):
+        expected = retriever_client.get_retrieval_contexts(SNIPPETS, top_k=1)
+        expected_matches = retriever_client.get_retrieval_matches(SNIPPETS, top_k=1)
+        server = self.start_server()
+        url = daemon.daemon_url(self.code_dir, self.comments_dir)
+        self.assertEqual(url, f"http://127.0.0.1:{server.server_address[1]}")
+        self.assertIsNone(daemon.daemon_url(self.code_dir, self.tmp.name))
+
+        stats = Counter()
+        self.assertEqual(daemon.request_contexts(url, SNIPPETS, top_k=1, stats=stats), expected)
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(daemon.health(url)["requests"], 1)
+        self.assertEqual(stats["nodes"], 2)  # the request's context packing stats
+        matches = daemon.request_matches(url, SNIPPETS, top_k=1)
+        self.assertEqual([[(d.id, d.page_content) for d in docs] for m in matches for docs in m],
+                         [[(d.id, d.page_content) for d in docs] for m in expected_matches for docs in m])
+
+        # A rebuilt store is picked up before the next request.
+        version = server.version
+        save_store(FAISS.from_texts(CODE[:1], self.emb), self.code_dir)
+        daemon.request_contexts(url, SNIPPETS[:1], top_k=1)
+        self.assertNotEqual(server.version, version)
+
+    def test_client_forwards_to_running_daemon(self):
+        with mock.patch.object(daemon, "request_contexts", return_value=["from daemon"]) as request:
+            with mock.patch.object(retriever_client, "USE_DAEMON", True):
+                # No daemon file yet: retrieved in-process
+                self.assertIn("# Relevant Code Snippets:", retriever_client.get_retrieval_context("x"))
+                request.assert_not_called()
+                self.start_server()
+                self.assertEqual(retriever_client.get_retrieval_context("x", node_name="f"), "from daemon")
+        request.assert_called_once()
+        self.assertEqual(request.call_args.args[1:], (["x"], 5, ["f"], [None]))
+
+
+if __name__ == '__main__':
+    unittest.main()
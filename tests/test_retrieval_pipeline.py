@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import subprocess
+
+import pytest
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from langchain_community.vectorstores import FAISS
+from codewise.github_client import PRFile, PRSnapshot
+from codewise.retrieval import RetrievalPipeline, RetrievalStores, affected_nodes
+from codewise.retriever import retriever_client
+from codewise.retriever.embeddings import LocalHashEmbeddings
+
+APP = "class App:\n    def run(self, host):\n        return serve(host)\n\n\ndef helper():\n    return 1\n"
+PATCH = "@@ -1,6 +1,7 @@\n class App:\n     def run(self, host):\n+        return serve(host)\n \n \n def helper():\n+    return 1\n"
+
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    calls = 0
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.calls += 1
+        return super().embed_documents(texts)
+
+
+class FakeGitHub:
+    def get_pr_snapshot(self, repo_name, pr_number):
+        files = [PRFile("src/app.py", "modified", PATCH, APP), PRFile("README.md", "modified", "+x", "x"),
+                 PRFile("src/gone.py", "removed", "", None)]
+        return PRSnapshot(repo_name, pr_number, f"PR {pr_number}", "h", "b", files, [], [], [])
+
+
+@pytest.mark.usefixtures("retriever_globals")
+class TestRetrievalPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.emb = CountingEmbeddings(dimensions=64)
+        code = FAISS.from_texts(["def serve(host):\n    bind(host)", "def helper():\n    return 1"], self.emb)
+        comments = FAISS.from_texts(["Validate the host first.", "Why return a constant?"], self.emb,
+                                    metadatas=[{"file": "src/app.py"}, {"file": "src/util.py"}])
+        self.stores = RetrievalStores(embeddings=self.emb, code_store=code, comments_store=comments)
+
+    def test_affected_nodes(self):
+        self.assertEqual(affected_nodes(APP, PATCH),
+                         {"App": [(3, "        return serve(host)")], "helper": [(7, "    return 1")]})
+
+    def test_run_is_reusable_and_batched(self):
+        pipeline = RetrievalPipeline(self.stores, FakeGitHub(), top_k=1)
+        CountingEmbeddings.calls = 0
+        first, second = pipeline.run(1), pipeline.run(2)
+        self.assertEqual(CountingEmbeddings.calls, 2)  # one batch per PR, no reloads
+
+        self.assertEqual(list(first.files), ["src/app.py"])
+        self.assertEqual([n.node_name for n in first.nodes], ["App", "helper"])
+        data = second.to_json()
+        self.assertEqual((data["pr_number"], data["pr_title"]), (2, "PR 2"))
+        node = data["files"][0]["nodes"][1]
+        self.assertEqual((node["start_line"], node["end_line"], node["added_lines"]), (7, 7, ["+7:     return 1"]))
+        self.assertEqual(node["top_code_matches"][0]["content"], "def helper():\n    return 1")
+        # Retrieved and packed by retriever_client: the unrelated comment is below the score cut-off.
+        self.assertEqual(node["top_pr_comments"], [])
+        self.assertEqual([d.page_content for d in second.nodes[0].comment_matches], ["Validate the host first."])
+        self.assertEqual(retriever_client.pack_stats["nodes"], 4)
+        self.assertEqual(retriever_client.search_stats["dense_only"], 8)
+
+    def test_import_has_no_side_effects(self):
+        env = dict(os.environ, GITHUB_TOKEN="", OPENAI_API_KEY="")
+        code = "import sys; import codewise.retrieval; sys.exit('faiss' in sys.modules or 'github' in sys.modules)"
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        self.assertEqual(subprocess.run([sys.executable, "-c", code], cwd=src, env=env).returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
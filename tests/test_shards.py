@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import faiss
+import numpy as np
+from codewise.indexing.shards import ShardWriter, merge_shards, write_flat_index
+
+
+class TestShards(unittest.TestCase):
+
+    def test_streamed_index_matches_faiss_writer(self):
+        x = np.random.default_rng(0).random((7, 4), dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = faiss.IndexFlatL2(4)
+            index.add(x)
+            faiss.write_index(index, os.path.join(tmp, "ref.faiss"))
+            write_flat_index(os.path.join(tmp, "streamed.faiss"), 4, 7, [x[:3], x[3:]])
+            with open(os.path.join(tmp, "ref.faiss"), "rb") as a, open(os.path.join(tmp, "streamed.faiss"), "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_shards_merge_into_lazy_sqlite_store(self):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from codewise.retriever.store import load_store
+
+        emb = DeterministicFakeEmbedding(size=8)
+        texts = [f"def f{i}(): pass" for i in range(5)]
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = ShardWriter(os.path.join(tmp, "shards"), shard_size=2)
+            records = [{"id": str(i), "page_content": t, "metadata": {"name": f"f{i}"}} for i, t in enumerate(texts)]
+            writer.add(records, np.asarray(emb.embed_documents(texts), dtype=np.float32))
+            shards = writer.close()
+            self.assertEqual(len(shards), 3)
+
+            merge_shards(shards, tmp, writer.dim, writer.total)
+            store = load_store(tmp, emb)
+            hit = store.similarity_search(texts[3], k=1)[0]
+            self.assertEqual(hit.metadata["name"], "f3")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import tempfile
+import textwrap
+
+# Add the 'src' directory to the Python path to allow `codewise` imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from codewise.indexing.symbol_graph import SymbolGraph, build_symbol_graph, save_symbol_graph
+
+FILES = {
+    "__init__.py": "from .helpers import send_file as send_file\n",
+    "helpers.py": """
+        import os
+
+        def _prepare(path):
+            return os.path.abspath(path)
+
+        def send_file(path):
+            return _prepare(path)
+    """,
+    "base.py": """
+        class Base:
+            def open(self, name):
+                return name
+
+            def setup(self):
+                pass
+    """,
+    "app.py": """
+        import pkg
+        from . import helpers as h
+        from .base import Base
+
+        class App(Base):
+            def setup(self):
+                super().setup()
+
+            def serve(self, path):
+                self.open(path)
+                h._prepare(path)
+                return pkg.send_file(path)
+    """,
+}
+
+
+class TestSymbolGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "pkg")
+        os.makedirs(self.root)
+        for name, text in FILES.items():
+            with open(os.path.join(self.root, name), "w", encoding="utf-8") as f:
+                f.write(textwrap.dedent(text))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_calls_resolve_through_aliases_and_classes(self):
+        graph = build_symbol_graph(self.root)
+        self.assertEqual(graph["symbols"]["pkg.app.App.serve"]["kind"], "method")
+        self.assertEqual(graph["callees"]["pkg.app.App.serve"],
+                         ["pkg.base.Base.open", "pkg.helpers._prepare", "pkg.helpers.send_file"])
+        self.assertEqual(graph["callees"]["pkg.app.App.setup"], ["pkg.base.Base.setup"])
+        self.assertEqual(graph["callers"]["pkg.helpers._prepare"], ["pkg.app.App.serve", "pkg.helpers.send_file"])
+        self.assertEqual(graph["aliases"]["pkg"]["send_file"], "pkg.helpers.send_file")
+
+    def test_lookup_by_pr_path_after_save(self):
+        save_symbol_graph(self.root, self.tmp.name)
+        graph = SymbolGraph.load(self.tmp.name)
+        self.assertEqual(graph.lookup("send_file", "src/pkg/helpers.py"), ["pkg.helpers.send_file"])
+        self.assertEqual(graph.lookup("send_file", "helpers.py"), ["pkg.helpers.send_file"])
+        self.assertEqual(graph.lookup("send_file", "src/pkg/app.py"), [])
+        self.assertEqual(graph.lookup("setup"), ["pkg.app.App.setup", "pkg.base.Base.setup"])
+        context = graph.context_for("send_file", "src/pkg/helpers.py")
+        self.assertIn("# Called by (pkg.helpers.send_file):\npkg.app.App.serve: def serve(self, path)", context)
+        self.assertIn("pkg.helpers._prepare: def _prepare(path)  (helpers.py:", context)
+        self.assertEqual(graph.context_for("missing"), "")
+        self.assertIsNone(SymbolGraph.load(self.root))
+
+
+if __name__ == '__main__':
+    unittest.main()